@@ -1,19 +1,207 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy import create_engine, exc
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool, StaticPool
+from functools import lru_cache
 import os
+import threading
+import time
 
-DATABASE_URL = os.getenv("DATABASE_URL")
-print("DATABASE_URL:", DATABASE_URL)
-engine = create_engine(
-    DATABASE_URL,
-    pool_size=5,
-    max_overflow=10,
-    pool_timeout=30,
-    pool_recycle=1800,
-    pool_pre_ping=True,
-    connect_args={"sslmode": "require"}
-)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Engines are created lazily from the environment on first use, so importing the app (or the
+# models, from Alembic) never opens a connection and the pool can be tuned per deployment:
+#   DATABASE_URL             any SQLAlchemy URL; sqlite:///file.db works for local benchmarking
+#   DB_POOL_SIZE             5
+#   DB_MAX_OVERFLOW          10
+#   DB_POOL_TIMEOUT          30 (seconds to wait for a free connection)
+#   DB_POOL_RECYCLE          1800
+#   DB_STATEMENT_TIMEOUT_MS  0 = no server-side statement timeout
+#   DB_SSLMODE               require (Postgres only; "disable" for local containers)
+#   DB_ECHO                  false
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+def _env_bool(name: str, default: bool = False) -> bool:
+    value = os.getenv(name)
+    return value.lower() in ("1", "true", "yes", "on") if value else default
+
+def database_url() -> str:
+    url = os.getenv("DATABASE_URL")
+    if not url:
+        raise RuntimeError("DATABASE_URL is not set")
+    return url
+
+# Async drivers for the same databases the sync URL points at
+ASYNC_DRIVERS = {
+    "postgres": "postgresql+asyncpg",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+    "mysql": "mysql+aiomysql",
+    "mysql+pymysql": "mysql+aiomysql",
+}
+
+def to_async_url(url: str) -> str:
+    scheme, sep, rest = url.partition("://")
+    return ASYNC_DRIVERS.get(scheme, scheme) + sep + rest
+
+# --- Pool telemetry ---
+
+class PoolStats:
+    """Counters for time spent waiting on a pool checkout. Shared by all threads using the pool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.waits = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.timeouts = 0
+
+    def record_wait(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            self.waits += 1
+            self.wait_seconds_total += seconds
+            if seconds > self.wait_seconds_max:
+                self.wait_seconds_max = seconds
+            if timed_out:
+                self.timeouts += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "waits": self.waits,
+                "wait_seconds_total": round(self.wait_seconds_total, 6),
+                "wait_seconds_max": round(self.wait_seconds_max, 6),
+                "timeouts": self.timeouts,
+            }
+
+class _InstrumentedPoolMixin:
+    stats: PoolStats
+
+    def _do_get(self):
+        start = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            self.stats.record_wait(time.perf_counter() - start, timed_out)
+
+    def recreate(self):
+        # engine.dispose() swaps in a fresh pool; keep counting into the same stats
+        new_pool = super().recreate()
+        new_pool.stats = self.stats
+        return new_pool
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+# --- Engine factory ---
+
+def engine_options(url: str, is_async: bool = False) -> dict:
+    """create_engine/create_async_engine keyword arguments for the URL's dialect and the environment."""
+    options = {"echo": _env_bool("DB_ECHO")}
+    statement_timeout_ms = _env_int("DB_STATEMENT_TIMEOUT_MS", 0)
+
+    if url.startswith("sqlite"):
+        connect_args = {"check_same_thread": False}
+        if ":memory:" in url or url.rstrip("/").endswith("sqlite:"):
+            # One shared connection, otherwise every checkout sees a fresh empty database
+            options.update(poolclass=StaticPool, connect_args=connect_args)
+            return options
+        options["connect_args"] = connect_args
+    elif url.startswith("postgresql+asyncpg"):
+        server_settings = {"statement_timeout": str(statement_timeout_ms)} if statement_timeout_ms else {}
+        # asyncpg takes the libpq sslmode names through its "ssl" argument
+        options["connect_args"] = {"ssl": os.getenv("DB_SSLMODE", "require"), "server_settings": server_settings}
+    elif url.startswith("postgres"):
+        connect_args = {"sslmode": os.getenv("DB_SSLMODE", "require")}
+        if statement_timeout_ms:
+            connect_args["options"] = f"-c statement_timeout={statement_timeout_ms}"
+        options["connect_args"] = connect_args
+    elif url.startswith("mysql"):
+        if statement_timeout_ms:
+            options["connect_args"] = {"init_command": f"SET SESSION max_execution_time={statement_timeout_ms}"}
+
+    options.update(
+        poolclass=InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool,
+        pool_size=_env_int("DB_POOL_SIZE", 5),
+        max_overflow=_env_int("DB_MAX_OVERFLOW", 10),
+        pool_timeout=_env_int("DB_POOL_TIMEOUT", 30),
+        pool_recycle=_env_int("DB_POOL_RECYCLE", 1800),
+        pool_pre_ping=True,
+    )
+    return options
+
+def _attach_stats(engine):
+    if isinstance(engine.pool, _InstrumentedPoolMixin):
+        engine.pool.stats = PoolStats()
+    return engine
+
+@lru_cache(maxsize=None)
+def get_engine():
+    url = database_url()
+    return _attach_stats(create_engine(url, **engine_options(url)))
+
+@lru_cache(maxsize=None)
+def get_async_engine():
+    url = to_async_url(database_url())
+    engine = create_async_engine(url, **engine_options(url, is_async=True))
+    _attach_stats(engine.sync_engine)
+    return engine
+
+def dispose_engines():
+    """
+    Closes the sync pool and forgets both engines; the next get_engine() re-reads the environment.
+    Pooled async connections are left to be closed when garbage collected.
+    """
+    if get_engine.cache_info().currsize:
+        get_engine().dispose()
+    get_engine.cache_clear()
+    get_async_engine.cache_clear()
+
+def pool_status() -> dict:
+    """Pool gauges and checkout wait counters for the engines created so far."""
+    engines = {}
+    if get_engine.cache_info().currsize:
+        engines["sync"] = get_engine()
+    if get_async_engine.cache_info().currsize:
+        engines["async"] = get_async_engine().sync_engine
+    out = {}
+    for name, engine in engines.items():
+        pool = engine.pool
+        status = {"pool_class": type(pool).__name__}
+        if isinstance(pool, QueuePool):
+            status.update(
+                size=pool.size(),
+                checked_out=pool.checkedout(),
+                checked_in=pool.checkedin(),
+                overflow=max(0, pool.overflow()),
+            )
+        if isinstance(pool, _InstrumentedPoolMixin):
+            status.update(pool.stats.snapshot())
+        out[name] = status
+    return out
+
+# Sessions bind to the engine when they are constructed, so the engine is only created once a
+# session is first needed
+class _LazyBindSession(Session):
+    def __init__(self, bind=None, **kwargs):
+        super().__init__(bind=bind if bind is not None else get_engine(), **kwargs)
+
+class _LazyBindAsyncSession(AsyncSession):
+    def __init__(self, bind=None, **kwargs):
+        super().__init__(bind=bind if bind is not None else get_async_engine(), **kwargs)
+
+SessionLocal = sessionmaker(class_=_LazyBindSession, autocommit=False, autoflush=False)
+# expire_on_commit=False so ORM objects stay readable after commit without an implicit (sync) refresh
+AsyncSessionLocal = async_sessionmaker(class_=_LazyBindAsyncSession, autoflush=False, expire_on_commit=False)
 Base = declarative_base()
 
 def get_db():
@@ -22,3 +210,7 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,28 +1,44 @@
 import uvicorn
 import os
 import logging # Import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles # Import StaticFiles
-from db import Base, engine
+from db import Base
 # import models so SQLAlchemy sees them (models define Base subclasses)
 from models import models  # noqa: F401
-from routers import auth, employees, attendance, settings as settings_router, reports, admin, healthcheck # Import admin router
+from routers import auth, employees, attendance, settings as settings_router, reports, admin, healthcheck, metrics, dashboard, punches, shifts # Import admin router
 from dotenv import load_dotenv
+from utils.metrics import MetricsMiddleware
+from utils.profiling import PROFILING_ENABLED, ProfilingMiddleware
+from utils.logging_config import RequestIdMiddleware, configure_logging
+from utils.compression import CompressionMiddleware
+from utils.jobs import scheduler
+from utils.scheduler import SCHEDULER_ENABLED
 
 load_dotenv()
 
-# Configure basic logging
-logging.basicConfig(level=logging.INFO) # Configure logging to show INFO level and above
+# Queue-backed JSON logging for the whole process (LOG_LEVEL, LOG_FORMAT)
+configure_logging()
+logger = logging.getLogger(__name__)
 
-app = FastAPI(title=os.getenv("PROJECT_NAME", "Attendance & Salary API"), version=os.getenv("VERSION", "0.1.0"), redirect_slashes=False) # Use os.getenv values
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Nightly maintenance (holiday horizon, reset token purge, ledger refresh); see utils/jobs.py
+    if SCHEDULER_ENABLED:
+        scheduler.start()
+    yield
+    await scheduler.stop()
+
+app = FastAPI(title=os.getenv("PROJECT_NAME", "Attendance & Salary API"), version=os.getenv("VERSION", "0.1.0"), redirect_slashes=False, lifespan=lifespan) # Use os.getenv values
 
 
 # Get allowed origins from an environment variable
 # Example value: "https://your-vercel-app.vercel.app,http://localhost:3000"
-allowed_origins_str = os.getenv("CORS_ORIGINS")
+allowed_origins_str = os.getenv("CORS_ORIGINS", "")
 origins = [origin.strip() for origin in allowed_origins_str.split(",") if origin]
-print("Origins:", origins)
+logger.info("CORS origins: %s", origins)
 # If no origins are specified in the environment, default to localhost for development
 if not origins:
     origins = [
@@ -30,6 +46,20 @@ if not origins:
         "http://localhost:8000",
     ]
 
+# Opt-in single-request profiling for admins; added first so it runs inside MetricsMiddleware
+if PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+
+# gzip/brotli for large JSON and CSV bodies (COMPRESSION_* settings); inside the metrics
+# middleware so the recorded latency includes compression
+app.add_middleware(CompressionMiddleware)
+
+# Per-route latency, status and SQL statement metrics, served at /metrics
+app.add_middleware(MetricsMiddleware)
+
+# Outermost of ours, so every log line of a request carries its id
+app.add_middleware(RequestIdMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
@@ -39,7 +69,7 @@ app.add_middleware(
 )
 
 # Create database tables (SQLite or configured DB) if they don't exist
-# Base.metadata.create_all(bind=engine)
+# Base.metadata.create_all(bind=get_engine())
 #app.mount("/static", StaticFiles(directory="static"), name="static") # Mount static files
 
 # Routers
@@ -48,8 +78,12 @@ app.include_router(employees.router)
 app.include_router(attendance.router)
 app.include_router(settings_router.router)
 app.include_router(reports.router)
+app.include_router(dashboard.router)
+app.include_router(punches.router)
+app.include_router(shifts.router)
 app.include_router(admin.router)
 app.include_router(healthcheck.router) # Include the new admin router
+app.include_router(metrics.router)
 
 @app.get("/")
 def root():
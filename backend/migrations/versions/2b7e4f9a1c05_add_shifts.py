@@ -0,0 +1,59 @@
+"""Add shifts, shift_weekdays, employees.shift_id and attendance check-in/out times
+
+Revision ID: 2b7e4f9a1c05
+Revises: 9c4f1d6a8e23
+Create Date: 2026-10-19 20:41:07.203114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2b7e4f9a1c05'
+down_revision: Union[str, None] = '9c4f1d6a8e23'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('shifts',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('start_time', sa.Time(), nullable=False),
+    sa.Column('end_time', sa.Time(), nullable=False),
+    sa.Column('grace_minutes', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'name', name='_uniq_shift_owner_name')
+    )
+    op.create_index(op.f('ix_shifts_id'), 'shifts', ['id'], unique=False)
+    op.create_index(op.f('ix_shifts_user_id'), 'shifts', ['user_id'], unique=False)
+    op.create_table('shift_weekdays',
+    sa.Column('shift_id', sa.Integer(), nullable=False),
+    sa.Column('weekday', sa.Integer(), nullable=False),
+    sa.Column('start_time', sa.Time(), nullable=True),
+    sa.Column('end_time', sa.Time(), nullable=True),
+    sa.Column('day_off', sa.Boolean(), nullable=False, server_default=sa.false()),
+    sa.ForeignKeyConstraint(['shift_id'], ['shifts.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('shift_id', 'weekday')
+    )
+    op.add_column('employees', sa.Column('shift_id', sa.Integer(), nullable=True))
+    op.create_foreign_key('fk_employees_shift_id', 'employees', 'shifts', ['shift_id'], ['id'], ondelete='SET NULL')
+    op.add_column('attendance_records', sa.Column('check_in', sa.Time(), nullable=True))
+    op.add_column('attendance_records', sa.Column('check_out', sa.Time(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('attendance_records', 'check_out')
+    op.drop_column('attendance_records', 'check_in')
+    op.drop_constraint('fk_employees_shift_id', 'employees', type_='foreignkey')
+    op.drop_column('employees', 'shift_id')
+    op.drop_table('shift_weekdays')
+    op.drop_index(op.f('ix_shifts_user_id'), table_name='shifts')
+    op.drop_index(op.f('ix_shifts_id'), table_name='shifts')
+    op.drop_table('shifts')
@@ -0,0 +1,26 @@
+"""Add auto_mark_absent to settings
+
+Revision ID: 5d2a9e7c4b18
+Revises: 0b8e5c2d7f61
+Create Date: 2026-10-19 17:21:05.904113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d2a9e7c4b18'
+down_revision: Union[str, None] = '0b8e5c2d7f61'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('settings', sa.Column('auto_mark_absent', sa.Boolean(), nullable=False, server_default=sa.false()))
+
+
+def downgrade() -> None:
+    op.drop_column('settings', 'auto_mark_absent')
@@ -0,0 +1,28 @@
+"""Add holiday_work_multiplier and late_deduction_policy to settings
+
+Revision ID: 7a1d3e5b9f20
+Revises: 2b7e4f9a1c05
+Create Date: 2026-10-19 22:15:48.907311
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7a1d3e5b9f20'
+down_revision: Union[str, None] = '2b7e4f9a1c05'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('settings', sa.Column('holiday_work_multiplier', sa.Float(), nullable=False, server_default='1.0'))
+    op.add_column('settings', sa.Column('late_deduction_policy', sa.String(length=20), nullable=False, server_default='hourly'))
+
+
+def downgrade() -> None:
+    op.drop_column('settings', 'late_deduction_policy')
+    op.drop_column('settings', 'holiday_work_multiplier')
@@ -0,0 +1,100 @@
+"""Partition attendance_records by month on Postgres
+
+Revision ID: 8f2a6c4d1b97
+Revises: 5d9b2c7e4a18
+Create Date: 2026-10-20 14:03:27.540116
+
+"""
+from datetime import date
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8f2a6c4d1b97'
+down_revision: Union[str, None] = '5d9b2c7e4a18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Postgres only; other databases keep the plain table. The table is rebuilt and every row copied
+# inside the migration's transaction, so attendance is unavailable while it runs: plan a window
+# sized to the table (or archive old months first, see tools/archive.py).
+#
+# A primary key or unique constraint of a partitioned table must contain the partition key, so
+# the primary key becomes (id, date); id stays unique as it still comes from the same sequence.
+# _uniq_employee_date is (date, employee_id) and carries over unchanged, so the ON CONFLICT
+# (date, employee_id) upserts keep working. Months are named attendance_records_yYYYYmMM and a
+# DEFAULT partition catches dates without one; the create_attendance_partitions job
+# (utils/partitions.py) keeps creating months ahead and moves stranded rows out of the default.
+
+MONTHS_AHEAD = 3
+
+
+def _add_months(month: date, n: int) -> date:
+    index = month.year * 12 + (month.month - 1) + n
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _rename_indexes(bind, table: str, suffix: str) -> None:
+    # Index names are schema wide; renaming the index of a constraint renames the constraint too
+    for (name,) in bind.execute(sa.text(
+        "SELECT indexname FROM pg_indexes WHERE schemaname = current_schema() AND tablename = :table"
+    ), {"table": table}).all():
+        op.execute(f'ALTER INDEX "{name}" RENAME TO "{name}{suffix}"')
+
+
+def _add_keys_and_indexes(primary_key: str) -> None:
+    op.execute(f'ALTER TABLE attendance_records ADD CONSTRAINT attendance_records_pkey PRIMARY KEY ({primary_key})')
+    op.execute('ALTER TABLE attendance_records ADD CONSTRAINT _uniq_employee_date UNIQUE (date, employee_id)')
+    op.execute('ALTER TABLE attendance_records ADD FOREIGN KEY (employee_id) REFERENCES employees (id) ON DELETE CASCADE')
+    op.execute('ALTER TABLE attendance_records ADD FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE SET NULL')
+    op.create_index(op.f('ix_attendance_records_date'), 'attendance_records', ['date'], unique=False)
+    op.create_index(op.f('ix_attendance_records_id'), 'attendance_records', ['id'], unique=False)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return
+    sequence = bind.execute(sa.text("SELECT pg_get_serial_sequence('attendance_records', 'id')")).scalar()
+    first_day = bind.execute(sa.text('SELECT min(date) FROM attendance_records')).scalar()
+
+    op.execute('ALTER TABLE attendance_records RENAME TO attendance_records_unpartitioned')
+    _rename_indexes(bind, 'attendance_records_unpartitioned', '_unpartitioned')
+    # Same columns, types and defaults (the id default still draws from the old sequence)
+    op.execute('CREATE TABLE attendance_records (LIKE attendance_records_unpartitioned INCLUDING DEFAULTS) PARTITION BY RANGE (date)')
+    op.execute('CREATE TABLE attendance_records_default PARTITION OF attendance_records DEFAULT')
+    this_month = date.today().replace(day=1)
+    month = min(first_day.replace(day=1), this_month) if first_day else this_month
+    while month <= _add_months(this_month, MONTHS_AHEAD):
+        op.execute(f"CREATE TABLE attendance_records_y{month.year:04d}m{month.month:02d} PARTITION OF attendance_records "
+                   f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_add_months(month, 1).isoformat()}')")
+        month = _add_months(month, 1)
+
+    op.execute('INSERT INTO attendance_records SELECT * FROM attendance_records_unpartitioned')
+    if sequence:
+        op.execute(f'ALTER SEQUENCE {sequence} OWNED BY attendance_records.id')
+    op.execute('DROP TABLE attendance_records_unpartitioned')
+    # Keys and indexes after the copy, built once per partition instead of row by row
+    _add_keys_and_indexes('id, date')
+    op.execute('ANALYZE attendance_records')
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return
+    sequence = bind.execute(sa.text("SELECT pg_get_serial_sequence('attendance_records', 'id')")).scalar()
+
+    op.execute('ALTER TABLE attendance_records RENAME TO attendance_records_partitioned')
+    _rename_indexes(bind, 'attendance_records_partitioned', '_partitioned')
+    op.execute('CREATE TABLE attendance_records (LIKE attendance_records_partitioned INCLUDING DEFAULTS)')
+    op.execute('INSERT INTO attendance_records SELECT * FROM attendance_records_partitioned')
+    if sequence:
+        op.execute(f'ALTER SEQUENCE {sequence} OWNED BY attendance_records.id')
+    # Drops every partition with it
+    op.execute('DROP TABLE attendance_records_partitioned')
+    _add_keys_and_indexes('id')
+    op.execute('ANALYZE attendance_records')
@@ -0,0 +1,46 @@
+"""Add punch_events and punch_dirty_days tables
+
+Revision ID: 9c4f1d6a8e23
+Revises: 5d2a9e7c4b18
+Create Date: 2026-10-19 18:02:33.518226
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c4f1d6a8e23'
+down_revision: Union[str, None] = '5d2a9e7c4b18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('punch_events',
+    sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), nullable=False),
+    sa.Column('device_id', sa.String(length=64), nullable=False),
+    sa.Column('employee_id', sa.Integer(), nullable=False),
+    sa.Column('punched_at', sa.DateTime(), nullable=False),
+    sa.Column('direction', sa.String(length=3), nullable=True),
+    sa.Column('received_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['employee_id'], ['employees.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('device_id', 'employee_id', 'punched_at', name='_uniq_punch_device_employee_time')
+    )
+    op.create_index('ix_punch_events_employee_time', 'punch_events', ['employee_id', 'punched_at'], unique=False)
+    op.create_table('punch_dirty_days',
+    sa.Column('employee_id', sa.Integer(), nullable=False),
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['employee_id'], ['employees.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('employee_id', 'date')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('punch_dirty_days')
+    op.drop_index('ix_punch_events_employee_time', table_name='punch_events')
+    op.drop_table('punch_events')
@@ -0,0 +1,36 @@
+"""Add employee search indexes
+
+Revision ID: a3f1c9d27e40
+Revises: 52cfec5b69e5
+Create Date: 2026-10-19 10:12:41.118305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3f1c9d27e40'
+down_revision: Union[str, None] = '52cfec5b69e5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_employees_owner_name_id', 'employees', ['last_updated_by', 'name', 'id'], unique=False)
+    op.create_index('ix_employees_owner_created_id', 'employees', ['last_updated_by', 'created_at', 'id'], unique=False)
+    op.create_index('ix_employees_owner_lower_name', 'employees', ['last_updated_by', sa.text('lower(name)')], unique=False)
+    if op.get_bind().dialect.name == 'postgresql':
+        # Substring (ILIKE '%q%') search on Postgres is served by a trigram index
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        op.execute('CREATE INDEX IF NOT EXISTS ix_employees_name_trgm ON employees USING gin (name gin_trgm_ops)')
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute('DROP INDEX IF EXISTS ix_employees_name_trgm')
+    op.drop_index('ix_employees_owner_lower_name', table_name='employees')
+    op.drop_index('ix_employees_owner_created_id', table_name='employees')
+    op.drop_index('ix_employees_owner_name_id', table_name='employees')
@@ -0,0 +1,48 @@
+"""Add payroll_months and salary_snapshots tables
+
+Revision ID: c3e8a2f6d417
+Revises: 7a1d3e5b9f20
+Create Date: 2026-10-19 23:37:12.664830
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3e8a2f6d417'
+down_revision: Union[str, None] = '7a1d3e5b9f20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('payroll_months',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('month', sa.Date(), nullable=False),
+    sa.Column('month_end', sa.Date(), nullable=False),
+    sa.Column('closed_at', sa.DateTime(), nullable=False),
+    sa.Column('closed_by', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['closed_by'], ['users.id'], ondelete='SET NULL'),
+    sa.PrimaryKeyConstraint('user_id', 'month')
+    )
+    op.create_table('salary_snapshots',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('month', sa.Date(), nullable=False),
+    sa.Column('employee_id', sa.Integer(), nullable=False),
+    sa.Column('department', sa.String(length=100), nullable=True),
+    sa.Column('position', sa.String(length=100), nullable=True),
+    sa.Column('salary_row', sa.JSON(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id', 'month'], ['payroll_months.user_id', 'payroll_months.month'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'month', 'employee_id', name='_uniq_salary_snapshot_owner_month_employee')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('salary_snapshots')
+    op.drop_table('payroll_months')
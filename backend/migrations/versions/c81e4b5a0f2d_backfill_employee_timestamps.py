@@ -0,0 +1,45 @@
+"""Backfill NULL employee timestamps
+
+Revision ID: c81e4b5a0f2d
+Revises: a3f1c9d27e40
+Create Date: 2026-10-19 11:02:17.604921
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c81e4b5a0f2d'
+down_revision: Union[str, None] = 'a3f1c9d27e40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # list_employees used to patch these per row on every request; fix the data once instead
+    op.execute(
+        "UPDATE employees SET created_at = COALESCE(last_updated_at, CURRENT_TIMESTAMP) "
+        "WHERE created_at IS NULL"
+    )
+    op.execute(
+        "UPDATE employees SET last_updated_at = created_at "
+        "WHERE last_updated_at IS NULL"
+    )
+    op.alter_column('employees', 'created_at',
+               existing_type=sa.DateTime(),
+               nullable=False)
+    op.alter_column('employees', 'last_updated_at',
+               existing_type=sa.DateTime(),
+               nullable=False)
+
+
+def downgrade() -> None:
+    op.alter_column('employees', 'last_updated_at',
+               existing_type=sa.DateTime(),
+               nullable=True)
+    op.alter_column('employees', 'created_at',
+               existing_type=sa.DateTime(),
+               nullable=True)
@@ -0,0 +1,43 @@
+"""Add salary_history table
+
+Revision ID: d4b7e2a91c36
+Revises: c81e4b5a0f2d
+Create Date: 2026-10-19 12:26:05.417733
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4b7e2a91c36'
+down_revision: Union[str, None] = 'c81e4b5a0f2d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('salary_history',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('employee_id', sa.Integer(), nullable=False),
+    sa.Column('effective_from', sa.Date(), nullable=False),
+    sa.Column('monthly_salary', sa.Float(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['employee_id'], ['employees.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('employee_id', 'effective_from', name='_uniq_salary_employee_effective')
+    )
+    op.create_index(op.f('ix_salary_history_id'), 'salary_history', ['id'], unique=False)
+    # Seed one segment per employee from the single salary the employees table holds today
+    op.execute(
+        "INSERT INTO salary_history (employee_id, effective_from, monthly_salary, created_at) "
+        "SELECT id, COALESCE(salary_effective_from, date_of_joining, CAST(created_at AS DATE)), monthly_salary, CURRENT_TIMESTAMP "
+        "FROM employees"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_salary_history_id'), table_name='salary_history')
+    op.drop_table('salary_history')
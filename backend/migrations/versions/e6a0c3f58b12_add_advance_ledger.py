@@ -0,0 +1,52 @@
+"""Add advance ledger and advance installments
+
+Revision ID: e6a0c3f58b12
+Revises: d4b7e2a91c36
+Create Date: 2026-10-19 13:48:52.902114
+
+"""
+from collections import defaultdict
+from datetime import date
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6a0c3f58b12'
+down_revision: Union[str, None] = 'd4b7e2a91c36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('advance_salaries', sa.Column('installments', sa.Integer(), server_default='1', nullable=False))
+    ledger = op.create_table('advance_ledger',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('employee_id', sa.Integer(), nullable=False),
+    sa.Column('month', sa.Date(), nullable=False),
+    sa.Column('advanced', sa.Float(), nullable=False),
+    sa.Column('deduction', sa.Float(), nullable=False),
+    sa.Column('balance', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['employee_id'], ['employees.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('employee_id', 'month', name='_uniq_advance_ledger_employee_month')
+    )
+    op.create_index(op.f('ix_advance_ledger_id'), 'advance_ledger', ['id'], unique=False)
+
+    # Existing advances were all deducted in full in the month they were given
+    totals = defaultdict(float)
+    for employee_id, adv_date, amount in op.get_bind().execute(sa.text('SELECT employee_id, date, amount FROM advance_salaries')):
+        totals[(employee_id, date(adv_date.year, adv_date.month, 1))] += amount
+    if totals:
+        op.bulk_insert(ledger, [
+            {'employee_id': employee_id, 'month': month, 'advanced': round(amount, 2), 'deduction': round(amount, 2), 'balance': 0.0}
+            for (employee_id, month), amount in totals.items()
+        ])
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_advance_ledger_id'), table_name='advance_ledger')
+    op.drop_table('advance_ledger')
+    op.drop_column('advance_salaries', 'installments')
@@ -1,5 +1,5 @@
 import enum
-from sqlalchemy import Column, Integer, String, Date, Enum as ENUM, ForeignKey, Float, DateTime, UniqueConstraint, Boolean
+from sqlalchemy import BigInteger, Column, Integer, String, Date, Enum as ENUM, ForeignKey, ForeignKeyConstraint, Float, DateTime, Time, JSON, UniqueConstraint, Boolean, Index, func
 from sqlalchemy.orm import relationship
 from db import Base
 from datetime import datetime
@@ -55,6 +55,7 @@ class Employee(Base):
     salary_effective_from = Column(Date, nullable=True)
     inactive_from = Column(Date, nullable=True)
     last_updated_by = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    shift_id = Column(Integer, ForeignKey("shifts.id", ondelete="SET NULL"), nullable=True) # None: standard hours from 09:00
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False) # Added created_at
     last_updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
@@ -66,6 +67,14 @@ class Employee(Base):
     
     attendance = relationship("AttendanceRecord", back_populates="employee", cascade="all,delete")
 
+    # Keyset pagination and tenant-scoped name search for /employees/search. The pg_trgm GIN
+    # index on name lives only in the migration since it is Postgres specific.
+    __table_args__ = (
+        Index("ix_employees_owner_name_id", "last_updated_by", "name", "id"),
+        Index("ix_employees_owner_created_id", "last_updated_by", "created_at", "id"),
+        Index("ix_employees_owner_lower_name", "last_updated_by", func.lower(name)),
+    )
+
 class AttendanceRecord(Base):
     __tablename__ = "attendance_records"
     id = Column(Integer, primary_key=True, index=True)
@@ -87,6 +96,10 @@ class AttendanceRecord(Base):
     # --- END CHANGE ---
     manual_overtime_hours = Column(Float, default=0.0)
     late_hours = Column(Float, default=0.0)
+    # Entered arrival and departure; late and overtime hours are computed from them when set.
+    # A check_out earlier than check_in is on the next day.
+    check_in = Column(Time, nullable=True)
+    check_out = Column(Time, nullable=True)
     employee_id = Column(Integer, ForeignKey("employees.id", ondelete="CASCADE"), nullable=False)
     # The user_id here refers to the user who marked the attendance, not the employee's linked user
     user_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True) # Changed to marked_by_user_id
@@ -94,6 +107,8 @@ class AttendanceRecord(Base):
     employee = relationship("Employee", back_populates="attendance")
     marked_by_user = relationship("User") # Add relationship for who marked it
 
+    # On Postgres the table is range partitioned by month (migration 8f2a6c4d1b97, utils/partitions.py)
+    # and its primary key there is (id, date); create_all still builds the plain table
     __table_args__ = (UniqueConstraint('date', 'employee_id', name='_uniq_employee_date'),)
 
 class Holiday(Base):
@@ -112,10 +127,36 @@ class Settings(Base): # Renamed from CompanySettings
     currency = Column(String(10), default="INR", nullable=False)
     company_name = Column(String(255), nullable=True)
     overtime_multiplier = Column(Float, default=1.5, nullable=False)
+    holiday_work_multiplier = Column(Float, default=1.0, nullable=False) # Pay factor for a day worked on a holiday
+    late_deduction_policy = Column(String(20), default="hourly", nullable=False) # "hourly", "none" or "half_day"; see utils/payrules.py
     mark_sundays_as_holiday = Column(Boolean, default=False, nullable=False)
+    auto_mark_absent = Column(Boolean, default=False, nullable=False) # Nightly job fills unmarked days with Absent
     owner = relationship("User", back_populates="settings") # Update back_populates to "settings"
     company_logo_url = Column(String(255), nullable=True)
 
+class Shift(Base):
+    __tablename__ = "shifts"
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), index=True, nullable=False) # Owning admin
+    name = Column(String(100), nullable=False)
+    start_time = Column(Time, nullable=False)
+    end_time = Column(Time, nullable=False) # Earlier than start_time for a shift ending the next day
+    grace_minutes = Column(Integer, default=0, nullable=False) # Arrivals within this many minutes are not late
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    weekdays = relationship("ShiftWeekday", cascade="all, delete-orphan", order_by="ShiftWeekday.weekday")
+
+    __table_args__ = (UniqueConstraint('user_id', 'name', name='_uniq_shift_owner_name'),)
+
+class ShiftWeekday(Base):
+    __tablename__ = "shift_weekdays"
+    # Per-weekday override of a shift: other hours, or a day off
+    shift_id = Column(Integer, ForeignKey("shifts.id", ondelete="CASCADE"), primary_key=True)
+    weekday = Column(Integer, primary_key=True) # 0 = Monday ... 6 = Sunday
+    start_time = Column(Time, nullable=True) # Ignored on a day off
+    end_time = Column(Time, nullable=True)
+    day_off = Column(Boolean, default=False, nullable=False)
+
 class PasswordReset(Base):
     __tablename__ = "password_resets"
     id = Column(Integer, primary_key=True)
@@ -132,6 +173,126 @@ class AdvanceSalary(Base):
     amount = Column(Float, nullable=False)
     date = Column(Date, index=True, nullable=False)
     reason = Column(String(255), nullable=True)
+    installments = Column(Integer, default=1, nullable=False) # Number of monthly salary deductions the advance is spread over
     
     employee = relationship("Employee", backref="advances")
 
+class AdvanceLedger(Base):
+    __tablename__ = "advance_ledger"
+    id = Column(Integer, primary_key=True, index=True)
+    employee_id = Column(Integer, ForeignKey("employees.id", ondelete="CASCADE"), nullable=False)
+    month = Column(Date, nullable=False) # First day of the month
+    advanced = Column(Float, default=0.0, nullable=False) # Advances handed out in this month
+    deduction = Column(Float, default=0.0, nullable=False) # Installments deducted from this month's salary
+    balance = Column(Float, default=0.0, nullable=False) # Outstanding after this month's deduction
+
+    employee = relationship("Employee", backref="advance_ledger")
+
+    __table_args__ = (UniqueConstraint('employee_id', 'month', name='_uniq_advance_ledger_employee_month'),)
+
+class PayrollMonth(Base):
+    __tablename__ = "payroll_months"
+    # A tenant-month whose payroll is closed: its salary rows are frozen in salary_snapshots and
+    # attendance, advance and holiday writes falling in it are rejected
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True) # Owning admin
+    month = Column(Date, primary_key=True) # First day of the month
+    month_end = Column(Date, nullable=False) # Last day, so "is this date closed" is a plain range check in SQL
+    closed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    closed_by = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+
+class SalarySnapshot(Base):
+    __tablename__ = "salary_snapshots"
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, nullable=False)
+    month = Column(Date, nullable=False)
+    # No foreign key: the snapshot outlives the employee
+    employee_id = Column(Integer, nullable=False)
+    department = Column(String(100), nullable=True) # As of closing, for the rollup
+    position = Column(String(100), nullable=True)
+    salary_row = Column(JSON, nullable=False) # The SalaryRow as computed at closing
+
+    __table_args__ = (
+        ForeignKeyConstraint(["user_id", "month"], ["payroll_months.user_id", "payroll_months.month"], ondelete="CASCADE"),
+        UniqueConstraint('user_id', 'month', 'employee_id', name='_uniq_salary_snapshot_owner_month_employee'),
+    )
+
+class AttendanceArchive(Base):
+    __tablename__ = "attendance_archives"
+    # A closed tenant-month whose attendance_records were moved to a compressed file by
+    # tools/archive.py; reads of the month fall back to the file. Only closed months are
+    # archived, so nothing writes new records into them, and they cannot be reopened.
+    user_id = Column(Integer, primary_key=True)
+    month = Column(Date, primary_key=True) # First day of the month
+    month_end = Column(Date, nullable=False)
+    path = Column(String(255), nullable=False) # Relative to ARCHIVE_DIR
+    row_count = Column(Integer, nullable=False)
+    sha256 = Column(String(64), nullable=False) # Of the file, checked before a restore
+    archived_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        ForeignKeyConstraint(["user_id", "month"], ["payroll_months.user_id", "payroll_months.month"], ondelete="CASCADE"),
+    )
+
+class SalaryHistory(Base):
+    __tablename__ = "salary_history"
+    id = Column(Integer, primary_key=True, index=True)
+    employee_id = Column(Integer, ForeignKey("employees.id", ondelete="CASCADE"), nullable=False)
+    effective_from = Column(Date, nullable=False)
+    monthly_salary = Column(Float, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    employee = relationship("Employee", backref="salary_history")
+
+    # One salary per employee per effective date; also the lookup index for payroll
+    __table_args__ = (UniqueConstraint('employee_id', 'effective_from', name='_uniq_salary_employee_effective'),)
+
+
+class ResourceVersion(Base):
+    __tablename__ = "resource_versions"
+    # Owner of the resource: the admin for employees and holidays, the settings row's user for company
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    resource = Column(String(50), primary_key=True) # "employees", "holidays", "company"
+    version = Column(Integer, default=0, nullable=False) # Bumped in the same transaction as every write
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class ScheduledJob(Base):
+    __tablename__ = "scheduled_jobs"
+    # One row per registered periodic job. It doubles as the lease: a worker runs the job only
+    # after atomically claiming an unleased, due row, so several workers never run it twice.
+    name = Column(String(100), primary_key=True)
+    next_run_at = Column(DateTime, nullable=True) # NULL until the first run
+    lease_owner = Column(String(100), nullable=True)
+    lease_expires_at = Column(DateTime, nullable=True) # A crashed worker's lease lapses here
+    last_started_at = Column(DateTime, nullable=True)
+    last_finished_at = Column(DateTime, nullable=True)
+    last_duration_ms = Column(Float, nullable=True)
+    last_status = Column(String(20), nullable=True) # "ok" or "error"
+    last_result = Column(String(1000), nullable=True) # JSON summary returned by the job, or the error
+    run_count = Column(Integer, default=0, nullable=False)
+
+
+class PunchEvent(Base):
+    __tablename__ = "punch_events"
+    # Append-only clock-in/out events from devices; attendance records are derived from them
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    device_id = Column(String(64), nullable=False)
+    employee_id = Column(Integer, ForeignKey("employees.id", ondelete="CASCADE"), nullable=False)
+    punched_at = Column(DateTime, nullable=False) # Local wall-clock time of the punch
+    direction = Column(String(3), nullable=True) # "in", "out", or NULL when the device does not say
+    received_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        # Devices resend on reconnect; the same punch is stored once
+        UniqueConstraint("device_id", "employee_id", "punched_at", name="_uniq_punch_device_employee_time"),
+        Index("ix_punch_events_employee_time", "employee_id", "punched_at"),
+    )
+
+
+class PunchDirtyDay(Base):
+    __tablename__ = "punch_dirty_days"
+    # (employee, day) pairs that received punches since their attendance was last derived.
+    # version is bumped on every new batch, so the aggregator only clears a day it fully saw.
+    employee_id = Column(Integer, ForeignKey("employees.id", ondelete="CASCADE"), primary_key=True)
+    date = Column(Date, primary_key=True)
+    version = Column(Integer, default=1, nullable=False)
@@ -8,6 +8,7 @@ from datetime import datetime, timedelta, timezone
 import secrets
 import logging
 from typing import List, Optional
+from utils.versions import EMPLOYEES, bump_version
 from sqlalchemy import or_
 
 import os # Import os for environment variables
@@ -69,6 +70,7 @@ async def create_staff(
     # Link the user to the employee
     employee.user_id = user_to_link.id
     db.add(employee)
+    bump_version(db, employee.last_updated_by or current_admin_user.id, EMPLOYEES)
     db.commit()
     db.refresh(user_to_link)
     db.refresh(employee)
@@ -195,6 +197,8 @@ async def delete_staff(
         raise HTTPException(status_code=403, detail="Cannot delete your own Admin account.")
 
     db.delete(user_to_delete)
+    # Deleting the user unlinks its employee (ON DELETE SET NULL)
+    bump_version(db, current_admin_user.id, EMPLOYEES)
     db.commit()
 
     # logger.info(f"Staff user ID: {user_id} deleted successfully.")
@@ -1,92 +1,116 @@
+import asyncio
 import enum
 from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy.orm import Session
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import case, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import date, datetime, timedelta
-from db import get_db
+from db import get_async_db
 from models.models import AttendanceRecord, Employee, Holiday, AttendanceStatus, Settings, User # Changed CompanySettings to Settings
-from schemas.schemas import AttendanceCreate, AttendanceOut
+from schemas.schemas import AbsentFillResult, AttendanceCreate, AttendanceOut, AttendanceSummary
 from routers.auth import require_admin, get_effective_user_id # Import get_effective_user_id
+from utils.absences import MAX_FILL_DAYS, absent_fill_statement
+from utils.archive import archived_months_query, archived_records
+from utils.closing import ensure_open
+from utils.shifts import recompute_timings
+from utils.versions import tenant_owner_id
 from typing import List, Optional
 import logging
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/attendance", tags=["attendance"])
 
 # Helper to get the employee_id from user_id (if user is linked to an employee)
-def get_employee_id_from_user_id(db: Session, user_id: int) -> Optional[int]:
-    employee = db.query(Employee).filter(Employee.user_id == user_id).first()
-    return employee.id if employee else None
+async def get_employee_id_from_user_id(db: AsyncSession, user_id: int) -> Optional[int]:
+    return (await db.execute(select(Employee.id).filter(Employee.user_id == user_id))).scalars().first()
 
 @router.post("/", response_model=AttendanceOut, status_code=status.HTTP_201_CREATED)
-def upsert_attendance(payload: AttendanceCreate, db: Session = Depends(get_db), current_admin_user: User = Depends(require_admin), effective_user_id: User = Depends(get_effective_user_id)):
+async def upsert_attendance(payload: AttendanceCreate, db: AsyncSession = Depends(get_async_db), current_admin_user: User = Depends(require_admin), effective_user_id: User = Depends(get_effective_user_id)):
     # If the effective_user_id is a staff member, ensure they can only mark their own attendance
     if effective_user_id.role == "staff":
-        staff_employee_id = get_employee_id_from_user_id(db, effective_user_id.id)
+        staff_employee_id = await get_employee_id_from_user_id(db, effective_user_id.id)
         if not staff_employee_id or staff_employee_id != payload.employee_id:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Staff can only mark their own attendance.")
 
     # For admin, check if the employee is managed by the current admin
-    employee = db.query(Employee).filter(
+    employee = (await db.execute(select(Employee).filter(
         Employee.id == payload.employee_id,
         Employee.last_updated_by == current_admin_user.id # Admin can mark attendance for employees they manage
-    ).first()
+    ))).scalars().first()
     if not employee or employee.status == "inactive":
         raise HTTPException(status_code=400, detail="Cannot mark attendance for inactive employee or employee not associated with your account")
+    await ensure_open(db, current_admin_user.id, payload.date)
 
     # logger.info(f"Effective user ID {effective_user_id.id} received attendance payload: {payload.model_dump()}")
 
-    auto_ot = 0.0
-    # Check if the date is a holiday
-    is_holiday = db.query(Holiday).filter(
-        Holiday.user_id == current_admin_user.id, Holiday.date == payload.date # Admins only see their own company's holidays
-    ).first()
+    # Automatic overtime marking on holidays was removed, so the holiday lookup that fed it is gone too
     
-    # Removed automatic overtime marking on holidays
-    # if is_holiday and payload.status == "Present":
-    #     # Get standard work hours from Settings
-    #     company_settings = db.query(Settings).filter(Settings.user_id == current_admin_user.id).first()
-    #     auto_ot = company_settings.standard_work_hours_per_day if company_settings else 8.0
-    
-    rec = db.query(AttendanceRecord).filter(AttendanceRecord.employee_id==payload.employee_id, AttendanceRecord.date==payload.date).first()
+    rec = (await db.execute(select(AttendanceRecord).filter(AttendanceRecord.employee_id==payload.employee_id, AttendanceRecord.date==payload.date))).scalars().first()
     if rec:
         rec.status = AttendanceStatus(payload.status)
         rec.manual_overtime_hours = payload.manual_overtime_hours
         # Removed automatic_overtime_hours assignment
         rec.late_hours = payload.late_hours
+        rec.check_in, rec.check_out = payload.check_in, payload.check_out
     else:
         rec = AttendanceRecord(date=payload.date, status=AttendanceStatus(payload.status),
                                manual_overtime_hours=payload.manual_overtime_hours,
                                late_hours=payload.late_hours,
+                               check_in=payload.check_in, check_out=payload.check_out,
                                employee_id=payload.employee_id, user_id=effective_user_id.id)
         db.add(rec)
     try:
-        db.commit()
-        db.refresh(rec)
+        if payload.check_in is not None:
+            # Entered times replace the typed late / overtime hours, measured against the employee's shift
+            await db.flush()
+            await db.run_sync(lambda session: recompute_timings(
+                session, current_admin_user.id, payload.date, payload.date, employee_ids=[payload.employee_id]))
+        await db.commit()
+        await db.refresh(rec)
         # logger.info(f"Successfully upserted attendance record for employee {payload.employee_id} on {payload.date} by effective user ID {effective_user_id.id}")
         return rec
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         # logger.error(f"Failed to upsert attendance record: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Failed to save attendance record")
 
-@router.get("/", response_model=List[AttendanceOut])
-def list_attendance(
+# Columns served by list_attendance. A month of a large tenant is tens of thousands of rows,
+# so they are selected as plain rows and encoded with orjson instead of validated one by one.
+ATTENDANCE_LIST_COLUMNS = (
+    AttendanceRecord.id,
+    AttendanceRecord.date,
+    AttendanceRecord.status,
+    AttendanceRecord.manual_overtime_hours,
+    AttendanceRecord.late_hours,
+    AttendanceRecord.check_in,
+    AttendanceRecord.check_out,
+    AttendanceRecord.employee_id,
+)
+ATTENDANCE_LIST_KEYS = tuple(column.key for column in ATTENDANCE_LIST_COLUMNS)
+
+@router.get("/", response_model=List[AttendanceOut], response_class=ORJSONResponse)
+async def list_attendance(
     employee_id: Optional[int] = Query(None, description="Filter by Employee ID"),
     start_date: Optional[date] = Query(None, description="Start date for filtering (YYYY-MM-DD)"),
     end_date: Optional[date] = Query(None, description="End date for filtering (YYYY-MM-DD)"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_effective_user_id),
 ):
-    query = db.query(AttendanceRecord).join(Employee, AttendanceRecord.employee_id == Employee.id)
+    """
+    Attendance records, optionally of one employee and a date range. Archived months
+    (tools/archive.py) are only read back when start_date is given and the range reaches them;
+    without start_date just the live table is listed, so an unbounded call never decompresses
+    the tenant's whole archive.
+    """
+    query = select(*ATTENDANCE_LIST_COLUMNS).join(Employee, AttendanceRecord.employee_id == Employee.id)
 
     if current_user.role == "staff":
-        staff_employee_id = get_employee_id_from_user_id(db, current_user.id)
+        staff_employee_id = await get_employee_id_from_user_id(db, current_user.id)
         if not staff_employee_id:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Staff user not linked to an employee.")
         query = query.filter(AttendanceRecord.employee_id == staff_employee_id)
+        employee_id = staff_employee_id
     else: # Admin user
         query = query.filter(Employee.last_updated_by == current_user.id) # Admin sees attendance for employees they manage
         if employee_id:
@@ -97,21 +121,155 @@ def list_attendance(
     if end_date:
         query = query.filter(AttendanceRecord.date <= end_date)
 
-    return query.all()
+    rows = [dict(r) for r in (await db.execute(query)).mappings()]
+    archived = (await db.execute(archived_months_query(tenant_owner_id(current_user), start_date, end_date))).all() if start_date else []
+    if archived:
+        # Archived months are read back from their files. A month whose deletes were interrupted
+        # still has rows in the table, so those ids are skipped.
+        seen = {r["id"] for r in rows}
+        records = await asyncio.to_thread(archived_records, [a.path for a in archived], start_date, end_date, employee_id or None)
+        rows.extend({column: r[column] for column in ATTENDANCE_LIST_KEYS} for r in records if r["id"] not in seen)
+    # The rows already match AttendanceOut (orjson writes the status enum as its value)
+    return ORJSONResponse(rows)
+
+@router.post("/fill-absent", response_model=AbsentFillResult)
+async def fill_absent(
+    start_date: date = Query(..., description="First day to fill (YYYY-MM-DD)"),
+    end_date: Optional[date] = Query(None, description="Last day to fill (default: start_date)"),
+    db: AsyncSession = Depends(get_async_db),
+    current_admin_user: User = Depends(require_admin),
+):
+    """
+    Marks Absent every active employee without a record on each non-holiday day of the range,
+    in a single INSERT ... SELECT. Days that already have a record are left as they are.
+    """
+    end_date = end_date or start_date
+    if end_date < start_date:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="end_date must not be before start_date.")
+    if end_date > date.today():
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Future days cannot be marked absent.")
+    if (end_date - start_date).days + 1 > MAX_FILL_DAYS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"At most {MAX_FILL_DAYS} days can be filled at once.")
+    await ensure_open(db, current_admin_user.id, start_date, end_date)
+
+    result = await db.execute(absent_fill_statement(db.bind.dialect.name, start_date, end_date, owner_id=current_admin_user.id))
+    await db.commit()
+    return AbsentFillResult(start_date=start_date, end_date=end_date, inserted=result.rowcount)
+
+# Longest window /weekly_summary aggregates; the per-day part of the payload is days x statuses
+MAX_SUMMARY_DAYS = 366
+STATUS_KEYS = {
+    AttendanceStatus.Present: "present",
+    AttendanceStatus.Absent: "absent",
+    AttendanceStatus.HALF_DAY: "half_day",
+}
+
+# Declared before /{attendance_id}, which would otherwise capture the path
+@router.get("/weekly_summary", response_model=AttendanceSummary, response_class=ORJSONResponse)
+async def get_weekly_attendance_summary(
+    start_date: Optional[date] = Query(None, description="First day of the window (default: Monday of this week)"),
+    end_date: Optional[date] = Query(None, description="Last day of the window (default: start_date + 6 days)"),
+    employee_id: Optional[int] = Query(None, description="Filter by Employee ID"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_effective_user_id),
+):
+    if not start_date:
+        today = date.today()
+        start_date = today - timedelta(days=today.weekday())
+    end_date = end_date or start_date + timedelta(days=6)
+    window_days = (end_date - start_date).days + 1
+    if window_days < 1:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="end_date must not be before start_date.")
+    if window_days > MAX_SUMMARY_DAYS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"The window can be at most {MAX_SUMMARY_DAYS} days.")
+
+    filters = [AttendanceRecord.date >= start_date, AttendanceRecord.date <= end_date]
+    if current_user.role == "staff":
+        staff_employee_id = await get_employee_id_from_user_id(db, current_user.id)
+        if not staff_employee_id:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Staff user not linked to an employee.")
+        filters.append(AttendanceRecord.employee_id == staff_employee_id)
+        employee_id = staff_employee_id
+    else: # Admin user
+        filters.append(Employee.last_updated_by == current_user.id)
+        if employee_id:
+            filters.append(AttendanceRecord.employee_id == employee_id)
+
+    days = {start_date + timedelta(days=i): {"date": start_date + timedelta(days=i), "present": 0, "absent": 0, "half_day": 0}
+            for i in range(window_days)}
+    for day, att_status, count in (await db.execute(
+        select(AttendanceRecord.date, AttendanceRecord.status, func.count(AttendanceRecord.id))
+        .join(Employee, AttendanceRecord.employee_id == Employee.id)
+        .filter(*filters)
+        .group_by(AttendanceRecord.date, AttendanceRecord.status)
+    )).all():
+        days[day][STATUS_KEYS[AttendanceStatus(att_status)]] += count
+
+    employees = (await db.execute(
+        select(
+            AttendanceRecord.employee_id,
+            Employee.name,
+            *(func.sum(case((AttendanceRecord.status == att_status, 1), else_=0)).label(key) for att_status, key in STATUS_KEYS.items()),
+        )
+        .join(Employee, AttendanceRecord.employee_id == Employee.id)
+        .filter(*filters)
+        .group_by(AttendanceRecord.employee_id, Employee.name)
+        .order_by(Employee.name, AttendanceRecord.employee_id)
+    )).mappings().all()
+    employees = [dict(r) for r in employees]
+
+    archived = (await db.execute(archived_months_query(tenant_owner_id(current_user), start_date, end_date))).all()
+    if archived:
+        employees = await _add_archived_counts(db, tenant_owner_id(current_user), archived, filters,
+                                               start_date, end_date, employee_id or None, days, employees)
+
+    return ORJSONResponse({
+        "start_date": start_date,
+        "end_date": end_date,
+        "days": list(days.values()),
+        "employees": employees,
+    })
+
+async def _add_archived_counts(db: AsyncSession, owner_id: int, archived: list, filters: list, start_date: date, end_date: date,
+                               employee_id: Optional[int], days: dict, employees: List[dict]) -> List[dict]:
+    """Adds the records of archived months to the summary's day and employee counts."""
+    records = await asyncio.to_thread(archived_records, [a.path for a in archived], start_date, end_date, employee_id)
+    # A month whose deletes were interrupted still has rows in the table, already counted
+    counted = set((await db.execute(
+        select(AttendanceRecord.id).join(Employee, AttendanceRecord.employee_id == Employee.id)
+        .filter(*filters, AttendanceRecord.date >= archived[0].month, AttendanceRecord.date <= archived[-1].month_end)
+    )).scalars())
+    records = [r for r in records if r["id"] not in counted]
+    by_employee = {e["employee_id"]: e for e in employees}
+    missing = {r["employee_id"] for r in records} - by_employee.keys()
+    if missing:
+        # Like the live rows, records of employees deleted since are left out
+        for emp_id, name in (await db.execute(
+            select(Employee.id, Employee.name).filter(Employee.id.in_(missing), Employee.last_updated_by == owner_id)
+        )).all():
+            by_employee[emp_id] = {"employee_id": emp_id, "name": name, **{key: 0 for key in STATUS_KEYS.values()}}
+    for r in records:
+        employee = by_employee.get(r["employee_id"])
+        if employee is None:
+            continue
+        key = STATUS_KEYS[AttendanceStatus(r["status"])]
+        days[date.fromisoformat(r["date"])][key] += 1
+        employee[key] += 1
+    return sorted(by_employee.values(), key=lambda e: (e["name"], e["employee_id"]))
 
 @router.get("/{attendance_id}", response_model=AttendanceOut)
-def get_attendance_by_id(attendance_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_effective_user_id)):
-    query = db.query(AttendanceRecord).join(Employee, AttendanceRecord.employee_id == Employee.id)
+async def get_attendance_by_id(attendance_id: int, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_effective_user_id)):
+    query = select(AttendanceRecord).join(Employee, AttendanceRecord.employee_id == Employee.id)
 
     if current_user.role == "staff":
-        staff_employee_id = get_employee_id_from_user_id(db, current_user.id)
+        staff_employee_id = await get_employee_id_from_user_id(db, current_user.id)
         if not staff_employee_id:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Staff user not linked to an employee.")
         query = query.filter(AttendanceRecord.employee_id == staff_employee_id)
     else: # Admin user
         query = query.filter(Employee.last_updated_by == current_user.id)
 
-    attendance = query.filter(AttendanceRecord.id == attendance_id).first()
+    attendance = (await db.execute(query.filter(AttendanceRecord.id == attendance_id))).scalars().first()
 
     if not attendance:
         raise HTTPException(status_code=404, detail="Attendance record not found or not authorized")
@@ -119,64 +277,46 @@ def get_attendance_by_id(attendance_id: int, db: Session = Depends(get_db), curr
     return attendance
 
 @router.put("/{attendance_id}", response_model=AttendanceOut)
-def update_attendance(attendance_id: int, payload: AttendanceCreate, db: Session = Depends(get_db), current_user: User = Depends(get_effective_user_id)):
-    query = db.query(AttendanceRecord).join(Employee, AttendanceRecord.employee_id == Employee.id)
+async def update_attendance(attendance_id: int, payload: AttendanceCreate, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_effective_user_id)):
+    query = select(AttendanceRecord).join(Employee, AttendanceRecord.employee_id == Employee.id)
 
     if current_user.role == "staff":
-        staff_employee_id = get_employee_id_from_user_id(db, current_user.id)
+        staff_employee_id = await get_employee_id_from_user_id(db, current_user.id)
         if not staff_employee_id:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Staff user not linked to an employee.")
         query = query.filter(AttendanceRecord.employee_id == staff_employee_id)
     else: # Admin user
         query = query.filter(Employee.last_updated_by == current_user.id)
 
-    attendance_record = query.filter(AttendanceRecord.id == attendance_id).first()
+    attendance_record = (await db.execute(query.filter(AttendanceRecord.id == attendance_id))).scalars().first()
 
     if not attendance_record:
         raise HTTPException(status_code=404, detail="Attendance record not found or not authorized to update.")
+    for day in {attendance_record.date, payload.date}:
+        await ensure_open(db, tenant_owner_id(current_user), day)
 
     for field, value in payload.model_dump(exclude_unset=True).items():
         setattr(attendance_record, field, value)
-    db.commit()
-    db.refresh(attendance_record)
+    if attendance_record.check_in is not None:
+        await db.flush()
+        owner_id, day, employee_id = tenant_owner_id(current_user), attendance_record.date, attendance_record.employee_id
+        await db.run_sync(lambda session: recompute_timings(session, owner_id, day, day, employee_ids=[employee_id]))
+    await db.commit()
+    await db.refresh(attendance_record)
     return attendance_record
 
 @router.delete("/{attendance_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_attendance(attendance_id: int, db: Session = Depends(get_db), current_user: User = Depends(require_admin)): # Only admin can delete
-    query = db.query(AttendanceRecord).join(Employee, AttendanceRecord.employee_id == Employee.id)
+async def delete_attendance(attendance_id: int, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(require_admin)): # Only admin can delete
+    query = select(AttendanceRecord).join(Employee, AttendanceRecord.employee_id == Employee.id)
 
     # Admins can delete attendance for employees they manage
     query = query.filter(Employee.last_updated_by == current_user.id)
 
-    attendance_record = query.filter(AttendanceRecord.id == attendance_id).first()
+    attendance_record = (await db.execute(query.filter(AttendanceRecord.id == attendance_id))).scalars().first()
 
     if not attendance_record:
         raise HTTPException(status_code=404, detail="Attendance record not found or not authorized to delete.")
-    db.delete(attendance_record)
-    db.commit()
+    await ensure_open(db, current_user.id, attendance_record.date)
+    await db.delete(attendance_record)
+    await db.commit()
     return
-
-@router.get("/weekly_summary", response_model=List[dict])
-def get_weekly_attendance_summary(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_effective_user_id),
-):
-    today = date.today()
-    start_of_week = today - timedelta(days=today.weekday())
-    end_of_week = start_of_week + timedelta(days=6)
-
-    query = db.query(AttendanceRecord).join(Employee, AttendanceRecord.employee_id == Employee.id)
-
-    if current_user.role == "staff":
-        staff_employee_id = get_employee_id_from_user_id(db, current_user.id)
-        if not staff_employee_id:
-            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Staff user not linked to an employee.")
-        query = query.filter(AttendanceRecord.employee_id == staff_employee_id)
-    else: # Admin user
-        query = query.filter(Employee.last_updated_by == current_user.id)
-
-    records = query.filter(
-        AttendanceRecord.date >= start_of_week,
-        AttendanceRecord.date <= end_of_week
-    ).all()
-    return records
@@ -1,6 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException, Header, Response, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, select
 from datetime import datetime, timedelta, timezone # Import timezone
 import secrets
 import smtplib
@@ -16,7 +18,7 @@ from dotenv import load_dotenv
 
 load_dotenv() # Ensure .env is loaded in this router as well for debugging
 
-from db import get_db
+from db import get_db, get_async_db
 from models.models import User, PasswordReset, UserRole, Employee, Settings # Changed CompanySettings to Settings
 from schemas.schemas import UserCreate, UserLogin, UserOut, EmailSchema, PasswordResetRequest, TokenData # Import TokenData
 from utils.auth import hash_password, verify_password # Remove create_token, verify_token from here, will redefine
@@ -42,8 +44,8 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/signin") # Define oauth2_scheme
 
 # This dependency ensures only authenticated users can access the route.
-def get_current_user(
-    token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
+async def get_current_user(
+    token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)
 ):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -63,13 +65,16 @@ def get_current_user(
         token_data = TokenData(id=user_id, email=user_email, name=user_name, is_admin=is_admin, employee_id=employee_id)
     except JWTError:
         raise credentials_exception
-    user = db.query(User).filter(User.id == token_data.id).first()
+    user = await db.get(User, token_data.id)
     if user is None:
         raise credentials_exception
+    # End the read transaction so the connection goes back to the pool while the endpoint runs.
+    # Sync endpoints use their own Session; async ones autobegin a new transaction on this one.
+    await db.commit()
     return user
 
 # This dependency requires admin role
-def require_admin(current_user: User = Depends(get_current_user)):
+async def require_admin(current_user: User = Depends(get_current_user)):
     if current_user.role != UserRole.admin: # Check the `role` attribute on the User object
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized. Admin privileges required."
@@ -77,7 +82,7 @@ def require_admin(current_user: User = Depends(get_current_user)):
     return current_user
 
 # This dependency gets the effective user ID for data filtering (admin can act for others, staff for themselves)
-def get_effective_user_id(
+async def get_effective_user_id(
     current_user: User = Depends(get_current_user), # Use get_current_user to get the full user object
 ):
     # If the user is an admin, they can potentially view/manage data for any employee.
@@ -102,8 +107,8 @@ def get_effective_user_id(
 def signup_options():
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 @router.post("/signup", response_model=UserOut)
-def signup(payload: UserCreate, db: Session = Depends(get_db)):
-    existing = db.query(User).filter(User.email == payload.email).first()
+async def signup(payload: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    existing = (await db.execute(select(User).filter(User.email == payload.email))).scalars().first()
     # logger.info(f"Attempting to sign up with email: {payload.email}") # Add logging for debugging
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
@@ -111,26 +116,27 @@ def signup(payload: UserCreate, db: Session = Depends(get_db)):
     user = User(
         name=payload.name,
         email=payload.email,
-        password_hash=hash_password(payload.password),
+        password_hash=await run_in_threadpool(hash_password, payload.password), # Argon2 is CPU bound, keep it off the event loop
         role=role,
     )
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
     return user
 
 # ----------------------------
 # SIGN IN
 # ----------------------------
 @router.post("/signin")
-def signin(payload: UserLogin, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == payload.email).first()
-    if not user or not verify_password(payload.password, user.password_hash):
+async def signin(payload: UserLogin, db: AsyncSession = Depends(get_async_db)):
+    user = (await db.execute(select(User).filter(User.email == payload.email))).scalars().first()
+    # Argon2 verification is CPU bound, keep it off the event loop
+    if not user or not await run_in_threadpool(verify_password, payload.password, user.password_hash):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
-    user.last_login_at = datetime.now(timezone.utc) # Update last_login_at
-    db.commit()
-    db.refresh(user)
+    user.last_login_at = datetime.utcnow() # Naive UTC like the other timestamps; asyncpg rejects aware values for a naive column
+    await db.commit()
+    await db.refresh(user)
 
     # logger.info(f"SignIn: User {user.email} (ID: {user.id}, Role: {user.role.value}) logged in.")
 
@@ -139,16 +145,14 @@ def signin(payload: UserLogin, db: Session = Depends(get_db)):
     # logger.info(f"SignIn: Calculated settings_user_id: {settings_user_id}")
     
     # Fetch company settings for company_logo_url
-    company_settings = db.query(Settings).filter(Settings.user_id == settings_user_id).first()
+    company_settings = (await db.execute(select(Settings).filter(Settings.user_id == settings_user_id))).scalars().first()
     company_logo_url = company_settings.company_logo_url if company_settings else None
     # logger.info(f"SignIn: Fetched company_settings: {company_settings.company_name if company_settings else 'None'} (URL: {company_logo_url})")
 
     # Fetch employee_id if the user is a staff member
     employee_id = None
     if user.role == UserRole.staff:
-        employee = db.query(Employee).filter(Employee.user_id == user.id).first()
-        if employee:
-            employee_id = employee.id
+        employee_id = (await db.execute(select(Employee.id).filter(Employee.user_id == user.id))).scalars().first()
 
     token = create_access_token(
         data={
@@ -179,7 +183,7 @@ def signin(payload: UserLogin, db: Session = Depends(get_db)):
 # CURRENT USER (NEW)
 # ----------------------------
 @router.get("/me", response_model=UserOut)
-def me(current_user: User = Depends(get_current_user)):
+async def me(current_user: User = Depends(get_current_user)):
     return current_user
 
 # ----------------------------
@@ -0,0 +1,138 @@
+import os
+from datetime import date, timedelta
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import case, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db import get_async_db
+from models.models import AttendanceRecord, AttendanceStatus, Employee, User, UserRole
+from routers.attendance import STATUS_KEYS
+from routers.auth import get_effective_user_id
+from schemas.schemas import DashboardSummary
+from utils.cache import TTLCache
+from utils.versions import tenant_owner_id
+
+router = APIRouter(prefix="/dashboard", tags=["dashboard"])
+
+# The summary is a handful of GROUP BY queries; it is cached per viewer scope (the tenant for
+# admins, the linked employee for staff) for DASHBOARD_CACHE_TTL_SECONDS (0 disables it), so
+# a freshly marked attendance can take that long to show up.
+DASHBOARD_CACHE_TTL_SECONDS = float(os.getenv("DASHBOARD_CACHE_TTL_SECONDS", "30"))
+_summary_cache = TTLCache(DASHBOARD_CACHE_TTL_SECONDS)
+
+RECENT_ENTRIES = 10
+TOP_EMPLOYEES = 5
+
+
+def _empty_day(day: date) -> dict:
+    return {"date": day, "present": 0, "absent": 0, "half_day": 0}
+
+
+def _attendance_score(counts) -> float:
+    """Share of an employee's records attended, a half day counting as half."""
+    records = counts["present"] + counts["absent"] + counts["half_day"]
+    return (counts["present"] + counts["half_day"] / 2) / records if records else 0.0
+
+
+@router.get("/summary", response_model=DashboardSummary, response_class=ORJSONResponse)
+async def dashboard_summary(
+    days: int = Query(30, ge=1, le=366, description="Length of the daily trend, ending today"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_effective_user_id),
+):
+    if current_user.role == UserRole.staff:
+        staff_employee_id = (await db.execute(select(Employee.id).filter(Employee.user_id == current_user.id))).scalars().first()
+        if not staff_employee_id:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Staff user not linked to an employee.")
+        cache_key = ("employee", staff_employee_id, days)
+        employee_filter = Employee.id == staff_employee_id
+    else:
+        owner_id = tenant_owner_id(current_user)
+        cache_key = ("tenant", owner_id, days)
+        employee_filter = Employee.last_updated_by == owner_id
+
+    headers = {"Cache-Control": f"private, max-age={int(DASHBOARD_CACHE_TTL_SECONDS)}"}
+    cached = _summary_cache.get(cache_key)
+    if cached is not None:
+        return ORJSONResponse(cached, headers=headers)
+
+    today = date.today()
+    trend_start = today - timedelta(days=days - 1)
+    month_start = today.replace(day=1)
+
+    # Headcount and average salary by employee status
+    headcount = {}
+    average_salary = 0.0
+    for emp_status, count, avg_salary in (await db.execute(
+        select(Employee.status, func.count(Employee.id), func.avg(Employee.monthly_salary))
+        .filter(employee_filter)
+        .group_by(Employee.status)
+    )).all():
+        headcount[emp_status] = count
+        if emp_status == "active":
+            average_salary = round(float(avg_salary or 0.0), 2)
+
+    # Daily counts by attendance status over the trend window and this month, in one grouped query
+    window_start = min(trend_start, month_start)
+    by_day = {}
+    for day, att_status, count in (await db.execute(
+        select(AttendanceRecord.date, AttendanceRecord.status, func.count(AttendanceRecord.id))
+        .join(Employee, AttendanceRecord.employee_id == Employee.id)
+        .filter(employee_filter, AttendanceRecord.date >= window_start, AttendanceRecord.date <= today)
+        .group_by(AttendanceRecord.date, AttendanceRecord.status)
+    )).all():
+        by_day.setdefault(day, _empty_day(day))[STATUS_KEYS[AttendanceStatus(att_status)]] += count
+
+    trend = [by_day.get(trend_start + timedelta(days=i)) or _empty_day(trend_start + timedelta(days=i)) for i in range(days)]
+    today_counts = by_day.get(today) or _empty_day(today)
+    month_days = [counts for day, counts in by_day.items() if day >= month_start]
+    month_records = sum(c["present"] + c["absent"] + c["half_day"] for c in month_days)
+    month_attended = sum(c["present"] + c["half_day"] for c in month_days)
+
+    recent = (await db.execute(
+        select(
+            AttendanceRecord.id,
+            AttendanceRecord.date,
+            AttendanceRecord.status,
+            AttendanceRecord.employee_id,
+            Employee.name.label("employee_name"),
+            AttendanceRecord.manual_overtime_hours,
+            AttendanceRecord.late_hours,
+        )
+        .join(Employee, AttendanceRecord.employee_id == Employee.id)
+        .filter(employee_filter)
+        .order_by(AttendanceRecord.date.desc(), AttendanceRecord.id.desc())
+        .limit(RECENT_ENTRIES)
+    )).mappings().all()
+
+    # This month's counts per employee, ranked here: one row per employee with a record this month
+    month_employees = (await db.execute(
+        select(
+            AttendanceRecord.employee_id,
+            Employee.name,
+            Employee.position,
+            *(func.sum(case((AttendanceRecord.status == att_status, 1), else_=0)).label(key) for att_status, key in STATUS_KEYS.items()),
+        )
+        .join(Employee, AttendanceRecord.employee_id == Employee.id)
+        .filter(employee_filter, AttendanceRecord.date >= month_start, AttendanceRecord.date <= today)
+        .group_by(AttendanceRecord.employee_id, Employee.name, Employee.position)
+    )).mappings().all()
+    top_employees = sorted(month_employees, key=lambda e: (-_attendance_score(e), e["name"], e["employee_id"]))[:TOP_EMPLOYEES]
+
+    marked_today = today_counts["present"] + today_counts["absent"] + today_counts["half_day"]
+    summary = {
+        "as_of": today,
+        "headcount": headcount,
+        "total_employees": sum(headcount.values()),
+        "average_salary": average_salary,
+        "today": today_counts,
+        "not_marked_today": max(0, headcount.get("active", 0) - marked_today),
+        "month_attendance_rate": round(month_attended * 100 / month_records, 1) if month_records else 0.0,
+        "trend": trend,
+        "recent": [dict(r) for r in recent],
+        "top_employees": [dict(e) for e in top_employees],
+    }
+    _summary_cache.set(cache_key, summary)
+    return ORJSONResponse(summary, headers=headers)
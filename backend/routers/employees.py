@@ -1,10 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import select, tuple_
 from sqlalchemy.orm import Session
 from db import get_db
-from models.models import Employee, User
-from schemas.schemas import EmployeeCreate, EmployeeUpdate, EmployeeOut
+from models.models import Employee, User, SalaryHistory
+from schemas.schemas import EmployeeCreate, EmployeeUpdate, EmployeeOut, EmployeePage, SalaryHistoryOut
 from routers.auth import get_current_user, require_admin, get_effective_user_id
-from typing import List
+from utils.versions import EMPLOYEES, bump_version, not_modified, tenant_owner_id, version_headers
+from typing import List, Literal, Optional
+import base64
+import json
 import logging
 from datetime import datetime, date
 
@@ -13,9 +18,20 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/employees", tags=["employees"])
 
+# Upsert the salary_history row for (employee, effective_from) with the employee's current salary
+def record_salary_change(db: Session, emp: Employee, effective_from: date):
+    entry = db.query(SalaryHistory).filter(
+        SalaryHistory.employee_id == emp.id,
+        SalaryHistory.effective_from == effective_from
+    ).first()
+    if entry:
+        entry.monthly_salary = emp.monthly_salary
+    else:
+        db.add(SalaryHistory(employee_id=emp.id, effective_from=effective_from, monthly_salary=emp.monthly_salary))
+
 @router.post("/", response_model=EmployeeOut)
 def create_employee(payload: EmployeeCreate, db: Session = Depends(get_db), current_admin_user: User = Depends(require_admin), effective_user_id: User = Depends(get_effective_user_id)):
-    logger.info(f"Effective user ID {effective_user_id.id} received employee creation payload: {payload.model_dump()}")
+    logger.debug("User %s creating employee", effective_user_id.id)
     try:
         emp = Employee(
             name=payload.name,
@@ -27,34 +43,131 @@ def create_employee(payload: EmployeeCreate, db: Session = Depends(get_db), curr
             user_id=None, # Initially unlinked to a staff user
             last_updated_by=current_admin_user.id # Admin who created this employee
         )
-        logger.info(f"Employee object before add: monthly_salary={emp.monthly_salary}, date_of_joining={emp.date_of_joining}, bank_account={emp.bank_account}")
         db.add(emp)
         db.flush() # Flush to get default values from DB before commit and refresh
+        record_salary_change(db, emp, payload.salary_effective_from or payload.date_of_joining or date.today())
+        bump_version(db, current_admin_user.id, EMPLOYEES)
         db.commit()
         db.refresh(emp)
-        logger.info(f"Employee object after refresh: monthly_salary={emp.monthly_salary}, date_of_joining={emp.date_of_joining}, bank_account={emp.bank_account}")
-        logger.info(f"Successfully created employee with ID: {emp.id}")
+        logger.debug("Created employee %s", emp.id)
         return emp
     except Exception as e:
         db.rollback()
-        logger.error(f"Failed to create employee: {e}", exc_info=True)
+        logger.error("Failed to create employee: %s", e, exc_info=True)
         raise HTTPException(status_code=500, detail=f"Failed to create employee: {e}")
 
-@router.get("/", response_model=List[EmployeeOut])
-def list_employees(db: Session = Depends(get_db), effective_user_id: User = Depends(get_effective_user_id)):
+# Columns served by list_employees, selected as plain rows so large lists skip ORM identity
+# tracking and per-row pydantic validation.
+EMPLOYEE_LIST_COLUMNS = (
+    Employee.id,
+    Employee.user_id,
+    Employee.name,
+    Employee.position,
+    Employee.department,
+    Employee.monthly_salary,
+    Employee.date_of_joining,
+    Employee.bank_account,
+    Employee.status,
+    Employee.salary_effective_from,
+    Employee.shift_id,
+    Employee.created_at,
+    Employee.last_updated_at,
+    Employee.last_updated_at.label("updated_at"),
+)
+
+@router.get("/", response_model=List[EmployeeOut], response_class=ORJSONResponse)
+def list_employees(request: Request, db: Session = Depends(get_db), effective_user_id: User = Depends(get_effective_user_id)):
+    headers = version_headers(db, tenant_owner_id(effective_user_id), EMPLOYEES, effective_user_id.id)
+    cached = not_modified(request, headers)
+    if cached:
+        return cached
+
+    stmt = select(*EMPLOYEE_LIST_COLUMNS)
     if effective_user_id.is_admin():
         # Admins see all employees they created/manage (including unlinked ones)
-        employees = db.query(Employee).filter(Employee.last_updated_by == effective_user_id.id).all()
+        stmt = stmt.where(Employee.last_updated_by == effective_user_id.id)
     else:
         # Staff users only see their own employee record
-        employees = db.query(Employee).filter(Employee.user_id == effective_user_id.id).all()
-    
-    for emp in employees:
-        if emp.created_at is None:
-            emp.created_at = datetime.utcnow()
-        if emp.last_updated_at is None:
-            emp.last_updated_at = datetime.utcnow()
-    return employees
+        stmt = stmt.where(Employee.user_id == effective_user_id.id)
+
+    rows = db.execute(stmt).mappings().all()
+    # The rows already match EmployeeOut, so encode them directly with orjson
+    return ORJSONResponse([dict(r) for r in rows], headers=headers)
+
+# Sortable columns for /employees/search. Every sort is made unique by appending Employee.id,
+# which is what lets the cursor be a plain (value, id) pair.
+SEARCH_SORT_COLUMNS = {
+    "name": Employee.name,
+    "created_at": Employee.created_at,
+    "id": Employee.id,
+}
+
+def _encode_cursor(value, emp_id: int) -> str:
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = json.dumps([value, emp_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def _decode_cursor(cursor: str, sort: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        value, emp_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if sort == "created_at":
+            value = datetime.fromisoformat(value)
+        return value, int(emp_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+@router.get("/search", response_model=EmployeePage)
+def search_employees(
+    q: Optional[str] = Query(None, min_length=1, max_length=100, description="Case-insensitive substring of the name"),
+    department: Optional[str] = Query(None),
+    position: Optional[str] = Query(None),
+    status: Optional[Literal["active", "inactive"]] = Query(None),
+    sort: Literal["name", "created_at", "id"] = Query("name"),
+    order: Literal["asc", "desc"] = Query("asc"),
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    db: Session = Depends(get_db),
+    effective_user_id: User = Depends(get_effective_user_id),
+):
+    query = db.query(Employee)
+    if effective_user_id.is_admin():
+        query = query.filter(Employee.last_updated_by == effective_user_id.id)
+    else:
+        query = query.filter(Employee.user_id == effective_user_id.id)
+
+    if q:
+        # Same substring match on every database: the pg_trgm index on employees.name serves it
+        # on Postgres; elsewhere it only scans the tenant's rows found through last_updated_by
+        query = query.filter(Employee.name.icontains(q, autoescape=True))
+    if department:
+        query = query.filter(Employee.department == department)
+    if position:
+        query = query.filter(Employee.position == position)
+    if status:
+        query = query.filter(Employee.status == status)
+
+    sort_col = SEARCH_SORT_COLUMNS[sort]
+    key = tuple_(sort_col, Employee.id) if sort != "id" else Employee.id
+    if cursor:
+        value, last_id = _decode_cursor(cursor, sort)
+        bound = tuple_(value, last_id) if sort != "id" else last_id
+        query = query.filter(key > bound if order == "asc" else key < bound)
+
+    if order == "asc":
+        query = query.order_by(sort_col.asc(), Employee.id.asc())
+    else:
+        query = query.order_by(sort_col.desc(), Employee.id.desc())
+
+    # Fetch one extra row to know whether there is a next page
+    rows = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = _encode_cursor(getattr(last, sort), last.id)
+    return EmployeePage(items=rows, next_cursor=next_cursor)
 
 @router.put("/{emp_id}", response_model=EmployeeOut)
 def update_employee(emp_id: int, payload: EmployeeUpdate, db: Session = Depends(get_db), current_admin_user: User = Depends(require_admin), effective_user_id: User = Depends(get_effective_user_id)):
@@ -65,6 +178,7 @@ def update_employee(emp_id: int, payload: EmployeeUpdate, db: Session = Depends(
         raise HTTPException(status_code=404, detail="Employee not found or not associated with your data")
     if payload.name is not None:
         emp.name = payload.name
+    salary_changed = payload.monthly_salary is not None and payload.monthly_salary != emp.monthly_salary
     if payload.monthly_salary is not None:
         emp.monthly_salary = payload.monthly_salary
     if payload.date_of_joining is not None:
@@ -76,7 +190,11 @@ def update_employee(emp_id: int, payload: EmployeeUpdate, db: Session = Depends(
     if payload.department is not None:
         emp.department = payload.department
     if getattr(payload, "salary_effective_from", None) is not None:
+        salary_changed = salary_changed or payload.salary_effective_from != emp.salary_effective_from
         emp.salary_effective_from = payload.salary_effective_from
+    if salary_changed:
+        # Keep the old salary for the months before the change instead of overwriting it
+        record_salary_change(db, emp, payload.salary_effective_from or date.today())
     if getattr(payload, "status", None) is not None:
         # Track inactive_from when flipping to inactive
         prev_status = emp.status
@@ -87,43 +205,58 @@ def update_employee(emp_id: int, payload: EmployeeUpdate, db: Session = Depends(
             emp.inactive_from = None
     emp.last_updated_by = current_admin_user.id
     emp.last_updated_at = datetime.utcnow()
+    bump_version(db, current_admin_user.id, EMPLOYEES)
     db.commit(); db.refresh(emp); return emp
 
 @router.delete("/{emp_id}")
 def delete_employee(emp_id: int, db: Session = Depends(get_db), current_admin_user: User = Depends(require_admin), effective_user_id: User = Depends(get_effective_user_id)):
-    logger.info(f"Effective user ID {effective_user_id.id} attempting to delete employee with ID: {emp_id}")
+    logger.debug("User %s deleting employee %s", effective_user_id.id, emp_id)
     emp = db.get(Employee, emp_id)
     # Ensure the employee belongs to the effective user's data domain
     if not emp or emp.user_id != effective_user_id.id:
-        logger.warning(f"Backend: Employee with ID {emp_id} not found or not associated with effective user ID {effective_user_id.id} for deletion.")
+        logger.debug("Employee %s not found for user %s", emp_id, effective_user_id.id)
         raise HTTPException(status_code=404, detail="Employee not found or not associated with your data")
 # ... existing delete_employee endpoint ...
     try:
+        bump_version(db, emp.last_updated_by or current_admin_user.id, EMPLOYEES)
         db.delete(emp)
         db.commit()
-        logger.info(f"Backend: Successfully deleted employee with ID: {emp.id} by effective user ID {effective_user_id.id}")
+        logger.debug("Deleted employee %s", emp_id)
         return {"ok": True}
     except Exception as e:
         db.rollback()
-        logger.error(f"Backend: Failed to delete employee with ID {emp_id}: {e}", exc_info=True)
+        logger.error("Failed to delete employee %s: %s", emp_id, e, exc_info=True)
         raise HTTPException(status_code=500, detail=f"Failed to delete employee: {e}")
 
-from models.models import AdvanceSalary
-from schemas.schemas import AdvanceSalaryCreate, AdvanceSalaryOut
+@router.get("/{emp_id}/salary-history", response_model=List[SalaryHistoryOut])
+def get_salary_history(emp_id: int, db: Session = Depends(get_db), current_admin_user: User = Depends(require_admin), effective_user_id: User = Depends(get_effective_user_id)):
+    emp = db.get(Employee, emp_id)
+    if not emp or emp.last_updated_by != effective_user_id.id:
+        raise HTTPException(status_code=404, detail="Employee not found")
+    return db.query(SalaryHistory).filter(SalaryHistory.employee_id == emp_id).order_by(SalaryHistory.effective_from.desc()).all()
+
+from models.models import AdvanceSalary, AdvanceLedger
+from schemas.schemas import AdvanceSalaryCreate, AdvanceSalaryOut, AdvanceLedgerOut
+from utils.advances import apply_advance, installment_schedule, month_start
+from utils.closing import ensure_open_sync
 
 @router.post("/{emp_id}/advances", response_model=AdvanceSalaryOut)
 def create_advance_salary(emp_id: int, payload: AdvanceSalaryCreate, db: Session = Depends(get_db), current_admin_user: User = Depends(require_admin), effective_user_id: User = Depends(get_effective_user_id)):
     emp = db.get(Employee, emp_id)
     if not emp or emp.last_updated_by != effective_user_id.id:
         raise HTTPException(status_code=404, detail="Employee not found")
-    adv = AdvanceSalary(employee_id=emp_id, amount=payload.amount, date=payload.date, reason=payload.reason)
+    # The advance and each of its installments must fall in open payroll months
+    schedule = installment_schedule(payload.amount, payload.date, payload.installments)
+    ensure_open_sync(db, effective_user_id.id, payload.date, schedule[-1][0])
+    adv = AdvanceSalary(employee_id=emp_id, amount=payload.amount, date=payload.date, reason=payload.reason, installments=payload.installments)
     db.add(adv)
+    apply_advance(db, adv)
     db.commit()
     db.refresh(adv)
     return adv
 
-@router.get("/{emp_id}/advances", response_model=List[AdvanceSalaryOut])
-def get_advance_salaries(emp_id: int, db: Session = Depends(get_db), effective_user_id: User = Depends(get_effective_user_id)):
+# Shared access check for reading an employee's advances (admin owner or the linked staff user)
+def _get_employee_for_advances(db: Session, emp_id: int, effective_user_id: User) -> Employee:
     emp = db.get(Employee, emp_id)
     if not emp:
         raise HTTPException(status_code=404, detail="Employee not found")
@@ -136,9 +269,51 @@ def get_advance_salaries(emp_id: int, db: Session = Depends(get_db), effective_u
         staff_emp = db.query(Employee).filter(Employee.user_id == effective_user_id.id).first()
         if not staff_emp or staff_emp.id != emp_id:
             raise HTTPException(status_code=403, detail="Not authorized")
-    
-    advances = db.query(AdvanceSalary).filter(AdvanceSalary.employee_id == emp_id).order_by(AdvanceSalary.date.desc()).all()
-    return advances
+    return emp
+
+@router.get("/{emp_id}/advances", response_model=List[AdvanceSalaryOut])
+def get_advance_salaries(
+    emp_id: int,
+    start_date: Optional[date] = Query(None, description="Only advances on or after this date"),
+    limit: Optional[int] = Query(None, ge=1, le=500, description="Most recent N advances"),
+    db: Session = Depends(get_db),
+    effective_user_id: User = Depends(get_effective_user_id),
+):
+    _get_employee_for_advances(db, emp_id, effective_user_id)
+    query = db.query(AdvanceSalary).filter(AdvanceSalary.employee_id == emp_id)
+    if start_date:
+        query = query.filter(AdvanceSalary.date >= start_date)
+    query = query.order_by(AdvanceSalary.date.desc(), AdvanceSalary.id.desc())
+    if limit:
+        query = query.limit(limit)
+    return query.all()
+
+@router.get("/{emp_id}/advances/ledger", response_model=AdvanceLedgerOut)
+def get_advance_ledger(
+    emp_id: int,
+    months: int = Query(12, ge=1, le=120, description="Number of most recent ledger months to return"),
+    db: Session = Depends(get_db),
+    effective_user_id: User = Depends(get_effective_user_id),
+):
+    _get_employee_for_advances(db, emp_id, effective_user_id)
+    rows = (
+        db.query(AdvanceLedger)
+        .filter(AdvanceLedger.employee_id == emp_id)
+        .order_by(AdvanceLedger.month.desc())
+        .limit(months)
+        .all()
+    )
+    # A month without a ledger row has no installment due and nothing outstanding
+    current = db.query(AdvanceLedger).filter(
+        AdvanceLedger.employee_id == emp_id,
+        AdvanceLedger.month == month_start(date.today())
+    ).first()
+    return AdvanceLedgerOut(
+        employee_id=emp_id,
+        due_this_month=current.deduction if current else 0.0,
+        outstanding_balance=current.balance if current else 0.0,
+        months=rows,
+    )
 
 @router.delete("/{emp_id}/advances/{adv_id}")
 def delete_advance_salary(emp_id: int, adv_id: int, db: Session = Depends(get_db), current_admin_user: User = Depends(require_admin), effective_user_id: User = Depends(get_effective_user_id)):
@@ -148,7 +323,9 @@ def delete_advance_salary(emp_id: int, adv_id: int, db: Session = Depends(get_db
     adv = db.get(AdvanceSalary, adv_id)
     if not adv or adv.employee_id != emp_id:
         raise HTTPException(status_code=404, detail="Advance not found")
-    
+    ensure_open_sync(db, effective_user_id.id, adv.date, installment_schedule(adv.amount, adv.date, adv.installments)[-1][0])
+
+    apply_advance(db, adv, sign=-1)
     db.delete(adv)
     db.commit()
     return {"ok": True}
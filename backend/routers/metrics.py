@@ -0,0 +1,56 @@
+import hmac
+import os
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from fastapi.responses import PlainTextResponse
+from db import pool_status
+from routers.auth import require_admin
+from utils.metrics import registry
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+# When set, GET /metrics requires "Authorization: Bearer <METRICS_TOKEN>" (the scraper's
+# credentials); unset leaves it open, e.g. behind a private network
+METRICS_TOKEN = os.getenv("METRICS_TOKEN") or None
+
+
+def require_metrics_token(authorization: Optional[str] = Header(None)):
+    if METRICS_TOKEN is None:
+        return
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token.encode(), METRICS_TOKEN.encode()):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid metrics token", headers={"WWW-Authenticate": "Bearer"}
+        )
+
+# Pool values from db.pool_status() exported as Prometheus gauges/counters
+POOL_METRICS = (
+    ("size", "db_pool_size", "gauge", "Configured pool size."),
+    ("checked_out", "db_pool_checked_out", "gauge", "Connections currently checked out."),
+    ("overflow", "db_pool_overflow", "gauge", "Connections open beyond pool_size."),
+    ("waits", "db_pool_checkouts_total", "counter", "Pool checkouts."),
+    ("wait_seconds_total", "db_pool_checkout_wait_seconds_total", "counter", "Time spent waiting for a pooled connection."),
+    ("timeouts", "db_pool_checkout_timeouts_total", "counter", "Checkouts that hit pool_timeout."),
+)
+
+@router.get("", response_class=PlainTextResponse, dependencies=[Depends(require_metrics_token)])
+def prometheus_metrics():
+    """Request latency, status and SQL statement metrics plus pool gauges, in the Prometheus text format."""
+    lines = registry.render()
+    pools = pool_status()
+    for key, name, kind, help_text in POOL_METRICS:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for engine_name, engine_status in sorted(pools.items()):
+            if key in engine_status:
+                lines.append(f'{name}{{engine="{engine_name}"}} {engine_status[key]}')
+    return PlainTextResponse("\n".join(lines) + "\n", media_type="text/plain; version=0.0.4")
+
+@router.get("/pool", dependencies=[Depends(require_admin)])
+def pool_metrics():
+    """
+    Connection pool gauges (size, checked out, overflow) and checkout wait counters
+    for each engine the process has created so far.
+    """
+    return pool_status()
@@ -0,0 +1,88 @@
+import os
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db import get_async_db
+from models.models import Employee, PunchEvent, User
+from routers.auth import require_admin
+from schemas.schemas import PunchIngestResult
+from utils.closing import closed_months_query
+from utils.punches import INSERT_CHUNK, insert_punches_statement, parse_punch_lines, touch_dirty_days_statement
+
+router = APIRouter(prefix="/punches", tags=["punches"])
+
+# Largest batch one ingest request may carry
+PUNCH_MAX_EVENTS = int(os.getenv("PUNCH_MAX_EVENTS", "20000"))
+MAX_REPORTED_ERRORS = 50
+
+
+@router.post("/ingest", response_model=PunchIngestResult)
+async def ingest_punches(request: Request, db: AsyncSession = Depends(get_async_db), current_admin_user: User = Depends(require_admin)):
+    """
+    Stores a batch of NDJSON punches (see utils/punches.py for the line format) for the caller's
+    employees. Punches already received are counted as duplicates and ignored, so devices can
+    safely resend. Only employee-days that received new punches are queued; their attendance is
+    re-derived by the aggregate_punches job.
+    Punches in closed payroll months are rejected.
+    """
+    events, errors, received = parse_punch_lines(await request.body())
+    if received > PUNCH_MAX_EVENTS:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=f"At most {PUNCH_MAX_EVENTS} events per request.")
+
+    employee_ids = {e["employee_id"] for e in events}
+    owned = set((await db.execute(select(Employee.id).filter(
+        Employee.id.in_(employee_ids), Employee.last_updated_by == current_admin_user.id
+    ))).scalars()) if employee_ids else set()
+
+    closed = set((await db.execute(closed_months_query(
+        current_admin_user.id, min(e["punched_at"] for e in events).date(), max(e["punched_at"] for e in events).date()
+    ))).scalars()) if owned else set()
+
+    accepted, seen, duplicates = [], set(), 0
+    for event in events:
+        if event["employee_id"] not in owned:
+            errors.append(f"employee {event['employee_id']} not found")
+            continue
+        if event["punched_at"].date().replace(day=1) in closed:
+            errors.append(f"employee {event['employee_id']}: payroll for {event['punched_at']:%Y-%m} is closed")
+            continue
+        key = (event["device_id"], event["employee_id"], event["punched_at"])
+        if key in seen:
+            duplicates += 1
+            continue
+        seen.add(key)
+        accepted.append(event)
+
+    if accepted:
+        # Punches stored by earlier batches count as duplicates and queue nothing; one range query
+        # on (employee_id, punched_at). A batch racing this one is still deduplicated by the insert.
+        stored = set((await db.execute(select(PunchEvent.device_id, PunchEvent.employee_id, PunchEvent.punched_at).filter(
+            PunchEvent.employee_id.in_({e["employee_id"] for e in accepted}),
+            PunchEvent.punched_at >= min(e["punched_at"] for e in accepted),
+            PunchEvent.punched_at <= max(e["punched_at"] for e in accepted),
+        ))).tuples())
+        if stored:
+            new = [e for e in accepted if (e["device_id"], e["employee_id"], e["punched_at"]) not in stored]
+            duplicates += len(accepted) - len(new)
+            accepted = new
+
+    dialect = db.bind.dialect.name
+    dirty_days = sorted({(e["employee_id"], e["punched_at"].date()) for e in accepted})
+    # Executemany in chunks; ON CONFLICT DO NOTHING drops punches stored by an earlier batch
+    for i in range(0, len(accepted), INSERT_CHUNK):
+        await db.execute(insert_punches_statement(dialect), accepted[i:i + INSERT_CHUNK])
+    for i in range(0, len(dirty_days), INSERT_CHUNK):
+        await db.execute(touch_dirty_days_statement(dialect),
+                         [{"employee_id": e, "date": d, "version": 1} for e, d in dirty_days[i:i + INSERT_CHUNK]])
+    await db.commit()
+
+    return PunchIngestResult(
+        received=received,
+        accepted=len(accepted),
+        duplicates=duplicates,
+        rejected=received - len(accepted) - duplicates,
+        days_queued=len(dirty_days),
+        errors=errors[:MAX_REPORTED_ERRORS],
+    )
@@ -1,17 +1,22 @@
 from fastapi import APIRouter, Depends, Response, Query, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import delete, func, insert, or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import date, datetime, timedelta
 from calendar import monthrange
-from db import get_db
-from models.models import Employee, AttendanceRecord, Settings, Holiday, User, AdvanceSalary # Added AdvanceSalary
-from schemas.schemas import SalaryRow
-from routers.auth import get_current_user, get_effective_user_id # Import get_effective_user_id
-from typing import List, Optional
+from db import get_async_db
+from models.models import AttendanceArchive, Employee, AttendanceRecord, Settings, Holiday, User, AdvanceLedger, PayrollMonth, SalarySnapshot
+from schemas.schemas import PayrollMonthOut, SalaryRollup, SalaryRow
+from routers.auth import get_current_user, get_effective_user_id, require_admin # Import get_effective_user_id
+from utils.payroll import load_salary_segments, daily_salaries
+from utils.payrules import PayRules
+from typing import List, Literal, Optional, Tuple, Union
 import csv
 import io
-from fastapi.responses import Response
+from fastapi.responses import ORJSONResponse, Response
 from io import StringIO
 import calendar
+from collections import defaultdict
 
 router = APIRouter(prefix="/reports", tags=["reports"])
 
@@ -20,28 +25,32 @@ def month_dates(year: int, month: int):
     return [date(year, month, d) for d in range(1, days+1)]
 
 # Helper to get the employee_id from user_id (if user is linked to an employee)
-def get_employee_id_from_user_id(db: Session, user_id: int) -> Optional[int]:
-    employee = db.query(Employee).filter(Employee.user_id == user_id).first()
-    return employee.id if employee else None
+async def get_employee_id_from_user_id(db: AsyncSession, user_id: int) -> Optional[int]:
+    return (await db.execute(select(Employee.id).filter(Employee.user_id == user_id))).scalars().first()
 
-@router.get("/salary", response_model=List[SalaryRow])
-def salary_report(
+@router.get("/salary", response_model=List[SalaryRow], response_class=ORJSONResponse)
+async def salary_report(
     month: str = Query(..., description="YYYY-MM"),
     employee_id: Optional[int] = Query(None, description="Filter by a specific Employee ID"), # New optional parameter
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_effective_user_id), # Can be admin or staff user ID
 ):
+    return [row for _, row in await salary_rows(month, employee_id, db, current_user)]
+
+# The payroll computation behind /salary, /salary.csv and /rollup: (employee, row) per employee employed in the month.
+# For a closed month the rows come from salary_snapshots, paired with the snapshot instead of the employee.
+async def salary_rows(month: str, employee_id: Optional[int], db: AsyncSession, current_user: User) -> List[Tuple[Union[Employee, SalarySnapshot], SalaryRow]]:
     year, month_num = map(int, month.split("-"))
     num_days_in_month = calendar.monthrange(year, month_num)[1]
     first_day_of_month = date(year, month_num, 1)
     last_day_of_month = date(year, month_num, num_days_in_month)
 
     # Base query for employees
-    query = db.query(Employee)
+    query = select(Employee)
 
     # If the current_user is a staff member, restrict to their employee_id
     if current_user.role == "staff":
-        staff_employee_id = get_employee_id_from_user_id(db, current_user.id)
+        staff_employee_id = await get_employee_id_from_user_id(db, current_user.id)
         if not staff_employee_id:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Staff user not linked to an employee.")
         query = query.filter(Employee.id == staff_employee_id)
@@ -50,7 +59,8 @@ def salary_report(
         if employee_id: # Only apply employee_id filter for admin if provided
             query = query.filter(Employee.id == employee_id)
 
-    employees = query.filter(Employee.status == "active").all()
+    # Active employees, and those who left during the month (paid up to inactive_from)
+    query = query.filter(or_(Employee.status == "active", Employee.inactive_from > first_day_of_month))
 
     # Determine the user ID to use for fetching company settings and holidays
     # If current_user is staff, use the ID of the admin who created them
@@ -60,77 +70,60 @@ def salary_report(
     if not effective_user_for_settings_holidays:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Could not determine effective user for settings/holidays.")
 
-    company_settings = db.query(Settings).filter(Settings.user_id == effective_user_for_settings_holidays).first()
-    std_hours = company_settings.standard_work_hours_per_day if company_settings else 8.0
+    # A closed month is served from its snapshot, never recomputed from attendance
+    if (await db.execute(select(PayrollMonth.month).filter(
+        PayrollMonth.user_id == effective_user_for_settings_holidays, PayrollMonth.month == first_day_of_month
+    ))).first():
+        snapshot_query = select(SalarySnapshot).filter(
+            SalarySnapshot.user_id == effective_user_for_settings_holidays, SalarySnapshot.month == first_day_of_month
+        ).order_by(SalarySnapshot.id)
+        if current_user.role == "staff":
+            snapshot_query = snapshot_query.filter(SalarySnapshot.employee_id == staff_employee_id)
+        elif employee_id:
+            snapshot_query = snapshot_query.filter(SalarySnapshot.employee_id == employee_id)
+        return [(snap, SalaryRow(**snap.salary_row)) for snap in (await db.execute(snapshot_query)).scalars()]
+
+    employees = (await db.execute(query)).scalars().all()
+    # The per-employee lookups below filter on this subquery instead of a bound list of ids
+    employee_ids = query.with_only_columns(Employee.id)
+
+    # The tenant's pay rules, compiled once for all employees of the month
+    rules = PayRules.compile((await db.execute(select(Settings).filter(Settings.user_id == effective_user_for_settings_holidays))).scalars().first())
     dates = month_dates(year, month_num)
     total_calendar_days_in_month = monthrange(year, month_num)[1]
     # Load holidays for the effective user within the month
     month_start = date(year, month_num, 1)
     month_end = date(year, month_num, total_calendar_days_in_month)
-    holiday_dates = set(h.date for h in db.query(Holiday).filter(Holiday.user_id == effective_user_for_settings_holidays, Holiday.date >= month_start, Holiday.date <= month_end).all())
+    holiday_dates = set((await db.execute(select(Holiday.date).filter(Holiday.user_id == effective_user_for_settings_holidays, Holiday.date >= month_start, Holiday.date <= month_end))).scalars().all())
 
-    out: List[SalaryRow] = []
+    # Salary segments for every employee in one query; pay is prorated by the salary in effect each day
+    salary_segments = await load_salary_segments(db, employee_ids, first_day_of_month, last_day_of_month)
+    # Advance installments due this month: one precomputed ledger row per employee
+    advance_deductions = dict((await db.execute(select(AdvanceLedger.employee_id, AdvanceLedger.deduction).filter(
+        AdvanceLedger.employee_id.in_(employee_ids),
+        AdvanceLedger.month == first_day_of_month
+    ))).all())
+
+    # Attendance in month for every employee in one query
+    recs_by_employee = defaultdict(list)
+    for r in (await db.execute(select(AttendanceRecord).filter(AttendanceRecord.employee_id.in_(employee_ids), AttendanceRecord.date >= dates[0], AttendanceRecord.date <= dates[-1]))).scalars():
+        recs_by_employee[r.employee_id].append(r)
+
+    out: List[Tuple[Union[Employee, SalarySnapshot], SalaryRow]] = []
     for e in employees:
-        # Attendance in month
-        recs = db.query(AttendanceRecord).filter(AttendanceRecord.employee_id == e.id, AttendanceRecord.date >= dates[0], AttendanceRecord.date <= dates[-1]).all()
-        
-        normal_present_days = 0
-        holiday_present_days_with_presence = 0
-        
-        for r in recs:
-            if r.status.value == "Present":
-                if r.date in holiday_dates:
-                    holiday_present_days_with_presence += 1
-                else:
-                    normal_present_days += 1
-        
-        half_days = sum(1 for r in recs if r.status.value == "Half-day")
-        total_ot = sum((r.manual_overtime_hours or 0.0) for r in recs)
-        total_late = sum((r.late_hours or 0.0) for r in recs) # Sum late hours
-        # Compute paid holidays on/after employee's joining date and before inactive_from if set
-        # Ensure we don't double count holidays where employee was explicitly present
-        actual_paid_holidays = {d for d in holiday_dates if 
-                               (e.date_of_joining is None or d >= e.date_of_joining) and 
-                               (e.inactive_from is None or d <= e.inactive_from) and 
-                               d not in {r.date for r in recs if r.status.value == "Present"}} # Exclude holidays where employee was present
-
-        paid_holiday_days = float(len(actual_paid_holidays)) + float(holiday_present_days_with_presence)
-        work_days = float(normal_present_days) + 0.5 * float(half_days)
-        total_paid_days = work_days + paid_holiday_days
-        # Hourly rate based on full month capacity: total month days * standard hours
-        hourly_rate = (e.monthly_salary or 0.0) / max(1.0, total_calendar_days_in_month * std_hours)
-        # Regular hours calculation now uses distinct normal present days and paid holiday days
-        regular_hours = (normal_present_days * std_hours) + (half_days * (std_hours / 2.0)) + (paid_holiday_days * std_hours)
-        total_hours_worked = regular_hours + total_ot - total_late # Deduct late hours
-        total_payable = hourly_rate * total_hours_worked
-        
-        advances = db.query(AdvanceSalary).filter(
-            AdvanceSalary.employee_id == e.id,
-            AdvanceSalary.date >= first_day_of_month,
-            AdvanceSalary.date <= last_day_of_month
-        ).all()
-        advance_deduction = sum(adv.amount for adv in advances)
-        total_payable -= advance_deduction
-
-        out.append(SalaryRow(
-            employee_id=e.id, name=e.name, base_monthly_salary=e.monthly_salary,
-            days_present=normal_present_days, half_days=half_days, # Use normal_present_days
-            work_days=round(work_days,2), paid_holiday_days=round(paid_holiday_days,2), total_paid_days=round(total_paid_days,2),
-            total_overtime_hours=round(total_ot,2), total_late_hours=round(total_late,2), hourly_rate=round(hourly_rate,2),
-            total_hours_worked=round(total_hours_worked,2), 
-            advance_deduction=round(advance_deduction, 2),
-            total_payable_salary=round(total_payable,2),
-        ))
+        salary_by_day = daily_salaries(salary_segments.get(e.id, []), dates, e.monthly_salary)
+        out.append((e, rules.salary_row(e, recs_by_employee.get(e.id, []), dates, salary_by_day,
+                                        holiday_dates, advance_deductions.get(e.id, 0.0))))
     return out
 
 @router.get("/salary.csv")
-def salary_report_csv(
+async def salary_report_csv(
     month: str,
     employee_id: Optional[int] = Query(None, description="Filter by a specific Employee ID for CSV export"), # New optional parameter
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_effective_user_id), # Can be admin or staff user ID
 ):
-    data = salary_report(month, employee_id, db, current_user) # Pass employee_id and current_user
+    data = await salary_report(month, employee_id, db, current_user) # Pass employee_id and current_user
     output = StringIO()
     writer = csv.writer(output)
     writer.writerow(["Employee ID","Name","Base Monthly Salary","Days Present","Half Days","Work Days","Paid Holidays","Total Paid Days","Total OT (h)","Total Late (h)","Hourly Rate","Total Hours Worked","Advances Deducted","Total Payable Salary"])
@@ -138,3 +131,108 @@ def salary_report_csv(
         writer.writerow([row.employee_id, row.name, row.base_monthly_salary, row.days_present, row.half_days, row.work_days, row.paid_holiday_days, row.total_paid_days, row.total_overtime_hours, row.total_late_hours, row.hourly_rate, row.total_hours_worked, row.advance_deduction, row.total_payable_salary])
     csv_bytes = output.getvalue().encode("utf-8")
     return Response(content=csv_bytes, media_type="text/csv", headers={"Content-Disposition": f"attachment; filename=salary_{month}.csv"})
+
+ROLLUP_MEASURES = ("days_present", "half_days", "total_paid_days", "total_overtime_hours", "total_late_hours",
+                   "advance_deduction", "total_payable_salary")
+
+@router.get("/rollup", response_model=SalaryRollup, response_class=ORJSONResponse)
+async def salary_rollup(
+    month: str = Query(..., description="YYYY-MM"),
+    by: Literal["department", "position"] = Query("department", description="Employee field to group by"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_effective_user_id),
+):
+    # Paid days and payable come out of the per-employee payroll above (salary history proration,
+    # paid holidays, advance ledger), which has no SQL equivalent, so its rows are grouped here
+    # rather than re-deriving the pay rules in a GROUP BY ROLLUP query
+    groups = {}
+    total = {"group": None, "headcount": 0, **{m: 0 for m in ROLLUP_MEASURES}}
+    for employee, row in await salary_rows(month, None, db, current_user):
+        key = getattr(employee, by) or None
+        group = groups.setdefault(key, {"group": key, "headcount": 0, **{m: 0 for m in ROLLUP_MEASURES}})
+        for acc in (group, total):
+            acc["headcount"] += 1
+            for m in ROLLUP_MEASURES:
+                acc[m] += getattr(row, m)
+
+    # Named groups alphabetically, employees without a value last
+    ordered = sorted(groups.values(), key=lambda g: (g["group"] is None, g["group"] or ""))
+    for acc in (*ordered, total):
+        for m in ROLLUP_MEASURES:
+            acc[m] = round(acc[m], 2)
+    return ORJSONResponse({"month": month, "by": by, "groups": ordered, "total": total})
+
+def _month_bounds(month: str) -> Tuple[date, date]:
+    try:
+        year, month_num = map(int, month.split("-"))
+        return date(year, month_num, 1), date(year, month_num, monthrange(year, month_num)[1])
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="month must be YYYY-MM.")
+
+@router.get("/closed", response_model=List[PayrollMonthOut])
+async def list_closed_months(db: AsyncSession = Depends(get_async_db), current_admin_user: User = Depends(require_admin)):
+    rows = (await db.execute(
+        select(PayrollMonth.month, PayrollMonth.closed_at, PayrollMonth.closed_by, func.count(SalarySnapshot.id).label("employees"))
+        .outerjoin(SalarySnapshot, (SalarySnapshot.user_id == PayrollMonth.user_id) & (SalarySnapshot.month == PayrollMonth.month))
+        .filter(PayrollMonth.user_id == current_admin_user.id)
+        .group_by(PayrollMonth.month, PayrollMonth.closed_at, PayrollMonth.closed_by)
+        .order_by(PayrollMonth.month.desc())
+    )).mappings().all()
+    return [PayrollMonthOut(**r) for r in rows]
+
+@router.post("/close", response_model=PayrollMonthOut, status_code=status.HTTP_201_CREATED)
+async def close_month(
+    month: str = Query(..., description="YYYY-MM"),
+    db: AsyncSession = Depends(get_async_db),
+    current_admin_user: User = Depends(require_admin),
+):
+    """
+    Finalizes the month's payroll: its salary rows are frozen into salary_snapshots and served
+    from there, and attendance, advance and holiday writes in the month are rejected from now on.
+    """
+    first_day, last_day = _month_bounds(month)
+    if first_day > date.today():
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="A month that has not started cannot be closed.")
+    if (await db.execute(select(PayrollMonth.month).filter(
+        PayrollMonth.user_id == current_admin_user.id, PayrollMonth.month == first_day
+    ))).first():
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Payroll for {month} is already closed.")
+    rows = await salary_rows(month, None, db, current_admin_user)
+
+    closed_at = datetime.utcnow()
+    try:
+        await db.execute(insert(PayrollMonth).values(
+            user_id=current_admin_user.id, month=first_day, month_end=last_day, closed_at=closed_at, closed_by=current_admin_user.id,
+        ))
+        if rows:
+            await db.execute(insert(SalarySnapshot), [
+                {"user_id": current_admin_user.id, "month": first_day, "employee_id": row.employee_id,
+                 "department": e.department, "position": e.position, "salary_row": row.model_dump()}
+                for e, row in rows
+            ])
+        await db.commit()
+    except IntegrityError:
+        # Closed concurrently
+        await db.rollback()
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Payroll for {month} is already closed.")
+    return PayrollMonthOut(month=first_day, closed_at=closed_at, closed_by=current_admin_user.id, employees=len(rows))
+
+@router.delete("/close", status_code=status.HTTP_204_NO_CONTENT)
+async def reopen_month(
+    month: str = Query(..., description="YYYY-MM"),
+    db: AsyncSession = Depends(get_async_db),
+    current_admin_user: User = Depends(require_admin),
+):
+    """Reopens a closed month: the snapshot is dropped and the month is computed from attendance again."""
+    first_day, _ = _month_bounds(month)
+    if (await db.execute(select(AttendanceArchive.month).filter(
+        AttendanceArchive.user_id == current_admin_user.id, AttendanceArchive.month == first_day
+    ))).first():
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT,
+                            detail=f"Attendance for {month} is archived; restore it (tools.archive --restore) before reopening.")
+    await db.execute(delete(SalarySnapshot).where(SalarySnapshot.user_id == current_admin_user.id, SalarySnapshot.month == first_day))
+    result = await db.execute(delete(PayrollMonth).where(PayrollMonth.user_id == current_admin_user.id, PayrollMonth.month == first_day))
+    if not result.rowcount:
+        await db.rollback()
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Payroll for {month} is not closed.")
+    await db.commit()
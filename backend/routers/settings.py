@@ -1,11 +1,12 @@
 import logging
 import os
-from datetime import date, timedelta, datetime
+from datetime import date, datetime
 from typing import List, Optional
 
 import cloudinary
 import cloudinary.uploader
-from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile, Query
+from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile, Query, Request, Response
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
 
 # Make sure all necessary imports are present
@@ -13,6 +14,10 @@ from db import get_db
 from models.models import Holiday, Settings, User, Employee, AttendanceRecord, AttendanceStatus # Changed CompanySettings to Settings, added Employee, AttendanceRecord, AttendanceStatus
 from routers.auth import get_effective_user_id, require_admin
 from schemas.schemas import HolidayOut, SettingsOut, HolidayCreate
+from utils.closing import ensure_open_sync
+from utils.holidays import add_sunday_holidays
+from utils.payrules import LATE_DEDUCTION_POLICIES
+from utils.versions import COMPANY, HOLIDAYS, bump_version, not_modified, version_headers
 
 # --- Cloudinary Configuration ---
 # Uses the environment variables from your Render dashboard
@@ -30,16 +35,9 @@ logger = logging.getLogger(__name__)
 
 # --- Helper Function (Unchanged) ---
 def generate_sunday_holidays(db: Session, effective_user_id: User):
+    # This year and next; the extend_sunday_holidays job keeps pushing the horizon forward
     today = date.today()
-    start_date = date(today.year, 1, 1)
-    end_date = date(today.year + 1, 12, 31)
-    current_date = start_date
-    while current_date <= end_date:
-        if current_date.weekday() == 6:
-            existing = db.query(Holiday).filter(Holiday.user_id == effective_user_id.id, Holiday.date == current_date).first()
-            if not existing:
-                db.add(Holiday(date=current_date, name="Sunday Holiday", user_id=effective_user_id.id))
-        current_date += timedelta(days=1)
+    add_sunday_holidays(db, effective_user_id.id, date(today.year, 1, 1), date(today.year + 1, 12, 31))
     db.commit()
 
 # --- Holiday Endpoints (Unchanged) ---
@@ -56,6 +54,7 @@ def add_holiday(
         holiday_date = datetime.strptime(date_str, "%Y-%m-%d").date()
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid date format. Expected YYYY-MM-DD.")
+    ensure_open_sync(db, effective_user_id.id, holiday_date)
     
     override_past_attendance = (
         override_past_attendance_str is not None and 
@@ -78,12 +77,16 @@ def add_holiday(
 
     # 4. Prepare Attendance Records (Simplified for clarity, using the atomic logic)
     attendance_records_to_process = []
+    # Existing attendance on the holiday for all eligible employees in one query
+    existing_by_employee = {
+        rec.employee_id: rec for rec in db.query(AttendanceRecord).filter(
+            AttendanceRecord.employee_id.in_([emp.id for emp in eligible_employees]),
+            AttendanceRecord.date == holiday_date
+        )
+    } if eligible_employees else {}
     
     for emp in eligible_employees:
-        existing_attendance = db.query(AttendanceRecord).filter(
-            AttendanceRecord.employee_id == emp.id,
-            AttendanceRecord.date == holiday_date
-        ).first()
+        existing_attendance = existing_by_employee.get(emp.id)
 
         create_record = False
         update_record = False
@@ -120,17 +123,18 @@ def add_holiday(
         db.add_all(attendance_records_to_process)
     
     try:
+        bump_version(db, effective_user_id.id, HOLIDAYS)
         db.commit() 
         db.refresh(hol)
         return hol
     except Exception as e:
         db.rollback()
-        logger.error(f"Failed to add holiday and/or attendance records: {e}", exc_info=True)
+        logger.error("Failed to add holiday and/or attendance records: %s", e, exc_info=True)
         # The 422 error is gone, now this will handle any remaining DB errors
         raise HTTPException(status_code=500, detail="An internal error occurred while processing the holiday and attendance records.")
 
-@router.get("/holidays", response_model=List[HolidayOut])
-def list_holidays(db: Session = Depends(get_db), effective_user_id: User = Depends(get_effective_user_id)):
+@router.get("/holidays", response_model=List[HolidayOut], response_class=ORJSONResponse)
+def list_holidays(request: Request, response: Response, db: Session = Depends(get_db), effective_user_id: User = Depends(get_effective_user_id)):
     # Determine the user ID to use for fetching holidays
     # If effective_user_id is staff, use the ID of the admin who created them
     # Otherwise, use effective_user_id.id (for admins)
@@ -141,6 +145,11 @@ def list_holidays(db: Session = Depends(get_db), effective_user_id: User = Depen
         # but good for safety.
         raise HTTPException(status_code=400, detail="Could not determine user for fetching holidays.")
 
+    headers = version_headers(db, user_id_for_holidays, HOLIDAYS, effective_user_id.id)
+    cached = not_modified(request, headers)
+    if cached:
+        return cached
+    response.headers.update(headers)
     return db.query(Holiday).filter(Holiday.user_id == user_id_for_holidays).order_by(Holiday.date.asc()).all()
 
 @router.delete("/holidays/{holiday_id}")
@@ -153,6 +162,7 @@ def delete_holiday(
     hol = db.get(Holiday, holiday_id)
     if not hol or hol.user_id != effective_user_id.id:
         raise HTTPException(status_code=404, detail="Holiday not found")
+    ensure_open_sync(db, effective_user_id.id, hol.date)
 
     if revert_attendance:
         # Find and delete attendance records that were automatically generated for this holiday
@@ -169,21 +179,28 @@ def delete_holiday(
             AttendanceRecord.late_hours == 0.0,
         ).delete(synchronize_session=False)
 
-    db.delete(hol); db.commit(); return {"ok": True}
+    db.delete(hol); bump_version(db, effective_user_id.id, HOLIDAYS); db.commit(); return {"ok": True}
 
 # --- Company Settings Endpoints (Corrected and Final) ---
 
 @router.get("/company", response_model=SettingsOut)
-def get_settings(db: Session = Depends(get_db), effective_user_id: User = Depends(get_effective_user_id)):
+def get_settings(request: Request, response: Response, db: Session = Depends(get_db), effective_user_id: User = Depends(get_effective_user_id)):
     """
     Fetches the company settings. The URL from the database is now the
     full, permanent Cloudinary URL, so we can return it directly.
     """
+    headers = version_headers(db, effective_user_id.id, COMPANY, effective_user_id.id)
+    cached = not_modified(request, headers)
+    if cached:
+        return cached
+    response.headers.update(headers)
     settings = db.query(Settings).filter(Settings.user_id == effective_user_id.id).first()
     if not settings:
-        settings = Settings(user_id=effective_user_id.id)
-        db.add(settings); db.commit(); db.refresh(settings)
-    
+        # Defaults without writing from a GET; the row is created on the first POST /company
+        return SettingsOut(user_id=effective_user_id.id, standard_work_hours_per_day=8.0, currency="INR",
+                           overtime_multiplier=1.5, mark_sundays_as_holiday=False, auto_mark_absent=False,
+                           holiday_work_multiplier=1.0, late_deduction_policy="hourly")
+
     # We can return the ORM object directly, FastAPI handles the conversion to SettingsOut
     return settings
 
@@ -199,9 +216,16 @@ def set_settings(
     currency: str = Form(...),
     overtime_multiplier: float = Form(...),
     mark_sundays_as_holiday: bool = Form(...),
+    auto_mark_absent: Optional[bool] = Form(None), # Left unchanged when the form omits it
+    holiday_work_multiplier: Optional[float] = Form(None), # Likewise
+    late_deduction_policy: Optional[str] = Form(None), # Likewise
     company_logo: Optional[UploadFile] = File(None)
 ):
-    logger.info(f"Effective user ID {effective_user_id.id} received set_settings payload.")
+    logger.debug("User %s updating company settings", effective_user_id.id)
+    if late_deduction_policy is not None and late_deduction_policy not in LATE_DEDUCTION_POLICIES:
+        raise HTTPException(status_code=400, detail=f"late_deduction_policy must be one of {', '.join(LATE_DEDUCTION_POLICIES)}.")
+    if holiday_work_multiplier is not None and holiday_work_multiplier < 0:
+        raise HTTPException(status_code=400, detail="holiday_work_multiplier must not be negative.")
     try:
         s = db.query(Settings).filter(Settings.user_id == effective_user_id.id).first()
         if not s:
@@ -217,6 +241,12 @@ def set_settings(
         if mark_sundays_as_holiday and not s.mark_sundays_as_holiday:
             generate_sunday_holidays(db, effective_user_id)
         s.mark_sundays_as_holiday = mark_sundays_as_holiday
+        if auto_mark_absent is not None:
+            s.auto_mark_absent = auto_mark_absent
+        if holiday_work_multiplier is not None:
+            s.holiday_work_multiplier = holiday_work_multiplier
+        if late_deduction_policy is not None:
+            s.late_deduction_policy = late_deduction_policy
 
         # If a new logo is provided, upload it to Cloudinary
         if company_logo:
@@ -227,6 +257,7 @@ def set_settings(
             )
             s.company_logo_url = upload_result.get("secure_url")
 
+        bump_version(db, effective_user_id.id, COMPANY)
         db.commit()
         db.refresh(s)
 
@@ -239,10 +270,13 @@ def set_settings(
             company_name=s.company_name,
             overtime_multiplier=s.overtime_multiplier,
             mark_sundays_as_holiday=s.mark_sundays_as_holiday,
+            auto_mark_absent=s.auto_mark_absent,
+            holiday_work_multiplier=s.holiday_work_multiplier,
+            late_deduction_policy=s.late_deduction_policy,
             company_logo_url=s.company_logo_url
         )
 
     except Exception as e:
         db.rollback()
-        logger.error(f"Error in set_settings for user {effective_user_id.id}: {e}", exc_info=True)
+        logger.error("Error in set_settings for user %s: %s", effective_user_id.id, e, exc_info=True)
         raise HTTPException(status_code=500, detail="Failed to save settings.")
@@ -0,0 +1,131 @@
+from datetime import date
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, selectinload
+
+from db import get_db
+from models.models import Employee, Shift, ShiftWeekday, User
+from routers.auth import get_effective_user_id, require_admin
+from schemas.schemas import ShiftAssignment, ShiftAssignmentResult, ShiftIn, ShiftOut, TimingRecomputeResult
+from utils.shifts import MAX_RECOMPUTE_DAYS, recompute_timings
+from utils.versions import EMPLOYEES, bump_version, tenant_owner_id
+
+router = APIRouter(prefix="/shifts", tags=["shifts"])
+
+
+def _validate(payload: ShiftIn):
+    if payload.start_time == payload.end_time:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="A shift cannot start and end at the same time.")
+    weekdays = [w.weekday for w in payload.weekdays]
+    if len(weekdays) != len(set(weekdays)):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Each weekday can be overridden once.")
+    for w in payload.weekdays:
+        if not w.day_off and (w.start_time is None or w.end_time is None or w.start_time == w.end_time):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                                detail=f"Weekday {w.weekday} needs a start_time and a different end_time unless it is a day off.")
+
+
+def _weekdays(payload: ShiftIn) -> List[ShiftWeekday]:
+    return [ShiftWeekday(weekday=w.weekday, day_off=w.day_off,
+                         start_time=None if w.day_off else w.start_time, end_time=None if w.day_off else w.end_time)
+            for w in payload.weekdays]
+
+
+def _get_shift(db: Session, shift_id: int, owner_id: int) -> Shift:
+    shift = db.query(Shift).options(selectinload(Shift.weekdays)).filter(Shift.id == shift_id, Shift.user_id == owner_id).first()
+    if not shift:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Shift not found")
+    return shift
+
+
+def _commit(db: Session):
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="A shift with this name already exists.")
+
+
+@router.get("/", response_model=List[ShiftOut])
+def list_shifts(db: Session = Depends(get_db), current_user: User = Depends(get_effective_user_id)):
+    return (db.query(Shift).options(selectinload(Shift.weekdays))
+            .filter(Shift.user_id == tenant_owner_id(current_user)).order_by(Shift.name).all())
+
+
+@router.post("/", response_model=ShiftOut, status_code=status.HTTP_201_CREATED)
+def create_shift(payload: ShiftIn, db: Session = Depends(get_db), current_admin_user: User = Depends(require_admin)):
+    _validate(payload)
+    shift = Shift(user_id=current_admin_user.id, name=payload.name, start_time=payload.start_time,
+                  end_time=payload.end_time, grace_minutes=payload.grace_minutes, weekdays=_weekdays(payload))
+    db.add(shift)
+    _commit(db)
+    return _get_shift(db, shift.id, current_admin_user.id)
+
+
+@router.put("/{shift_id}", response_model=ShiftOut)
+def update_shift(shift_id: int, payload: ShiftIn, db: Session = Depends(get_db), current_admin_user: User = Depends(require_admin)):
+    """Replaces the shift and its weekday overrides. Recorded hours are not recomputed; see /shifts/recompute."""
+    _validate(payload)
+    shift = _get_shift(db, shift_id, current_admin_user.id)
+    shift.name, shift.start_time, shift.end_time = payload.name, payload.start_time, payload.end_time
+    shift.grace_minutes = payload.grace_minutes
+    shift.weekdays = []
+    db.flush() # Delete the old overrides before inserting rows with the same keys
+    shift.weekdays = _weekdays(payload)
+    _commit(db)
+    return _get_shift(db, shift_id, current_admin_user.id)
+
+
+@router.delete("/{shift_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_shift(shift_id: int, db: Session = Depends(get_db), current_admin_user: User = Depends(require_admin)):
+    """Deletes the shift; its employees fall back to the standard hours."""
+    shift = _get_shift(db, shift_id, current_admin_user.id)
+    # Explicitly, as SQLite does not enforce ON DELETE SET NULL without foreign_keys=ON
+    db.execute(update(Employee).where(Employee.shift_id == shift_id).values(shift_id=None)
+               .execution_options(synchronize_session=False))
+    db.delete(shift)
+    # Employee rows carry shift_id, so cached employee lists are stale now
+    bump_version(db, current_admin_user.id, EMPLOYEES)
+    db.commit()
+
+
+@router.post("/assign", response_model=ShiftAssignmentResult)
+def assign_shift(payload: ShiftAssignment, db: Session = Depends(get_db), current_admin_user: User = Depends(require_admin)):
+    """Moves the listed employees onto the shift. Recorded hours are not recomputed; see /shifts/recompute."""
+    if payload.shift_id is not None:
+        _get_shift(db, payload.shift_id, current_admin_user.id)
+    assigned = db.execute(
+        update(Employee)
+        .where(Employee.id.in_(payload.employee_ids), Employee.last_updated_by == current_admin_user.id)
+        .values(shift_id=payload.shift_id)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    bump_version(db, current_admin_user.id, EMPLOYEES)
+    db.commit()
+    return ShiftAssignmentResult(shift_id=payload.shift_id, assigned=assigned)
+
+
+@router.post("/recompute", response_model=TimingRecomputeResult)
+def recompute(
+    start_date: date = Query(..., description="First day to recompute (YYYY-MM-DD)"),
+    end_date: date = Query(None, description="Last day to recompute (default: start_date)"),
+    employee_id: int = Query(None, description="Only this employee"),
+    db: Session = Depends(get_db),
+    current_admin_user: User = Depends(require_admin),
+):
+    """
+    Recomputes late and overtime hours of the range (a day or a month of the whole tenant, typically)
+    from punches or entered check-in times against the current shifts. Only changed records are written.
+    """
+    end_date = end_date or start_date
+    if end_date < start_date:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="end_date must not be before start_date.")
+    if (end_date - start_date).days + 1 > MAX_RECOMPUTE_DAYS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"At most {MAX_RECOMPUTE_DAYS} days can be recomputed at once.")
+    result = recompute_timings(db, current_admin_user.id, start_date, end_date,
+                               employee_ids=[employee_id] if employee_id is not None else None)
+    db.commit()
+    return TimingRecomputeResult(start_date=start_date, end_date=end_date, **result)
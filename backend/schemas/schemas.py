@@ -1,6 +1,6 @@
-from pydantic import BaseModel, EmailStr
-from datetime import date, datetime
-from typing import Optional, List, Literal
+from pydantic import BaseModel, EmailStr, Field, AliasChoices
+from datetime import date, datetime, time
+from typing import Dict, Optional, List, Literal
 from fastapi import UploadFile # Added for file uploads
 from models.models import AttendanceStatus # Import AttendanceStatus
 
@@ -82,18 +82,26 @@ class EmployeeOut(BaseModel):
     bank_account: Optional[str] = None
     status: Literal["active", "inactive"]
     salary_effective_from: Optional[date] = None
-    created_at: datetime = datetime.utcnow()
-    updated_at: datetime = datetime.utcnow()
+    shift_id: Optional[int] = None # Assigned through /shifts/assign
+    created_at: Optional[datetime] = None
+    last_updated_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = Field(default=None, validation_alias=AliasChoices("updated_at", "last_updated_at")) # Kept for older clients
 
     class Config:
         from_attributes = True
 
+class EmployeePage(BaseModel):
+    items: List[EmployeeOut]
+    next_cursor: Optional[str] = None # Opaque keyset cursor, None on the last page
+
 # Attendance
 class AttendanceBase(BaseModel):
     date: date
     status: AttendanceStatus
     manual_overtime_hours: float = 0.0
     late_hours: Optional[float] = 0.0 # Added late_hours field
+    check_in: Optional[time] = None # When set, late and overtime hours are computed against the shift
+    check_out: Optional[time] = None
 
 class AttendanceCreate(AttendanceBase):
     employee_id: int # employee_id should be here
@@ -106,6 +114,69 @@ class AttendanceOut(AttendanceBase):
     class Config:
         from_attributes = True
 
+# Attendance counts aggregated per day / per employee
+class AttendanceDayCounts(BaseModel):
+    date: date
+    present: int = 0
+    absent: int = 0
+    half_day: int = 0
+
+class AttendanceEmployeeCounts(BaseModel):
+    employee_id: int
+    name: str
+    present: int = 0
+    absent: int = 0
+    half_day: int = 0
+
+class AbsentFillResult(BaseModel):
+    start_date: date
+    end_date: date
+    inserted: int
+
+class AttendanceSummary(BaseModel):
+    start_date: date
+    end_date: date
+    days: List[AttendanceDayCounts] # One entry per day of the window, zero filled
+    employees: List[AttendanceEmployeeCounts] # Employees with at least one record in the window
+
+# Shifts
+class ShiftWeekdayIn(BaseModel):
+    weekday: int = Field(..., ge=0, le=6) # 0 = Monday
+    start_time: Optional[time] = None # Required unless day_off
+    end_time: Optional[time] = None
+    day_off: bool = False
+
+class ShiftWeekdayOut(ShiftWeekdayIn):
+    class Config:
+        from_attributes = True
+
+class ShiftIn(BaseModel):
+    name: str
+    start_time: time
+    end_time: time # At or before start_time for a shift ending the next day
+    grace_minutes: int = Field(0, ge=0, le=240)
+    weekdays: List[ShiftWeekdayIn] = [] # Overrides; other weekdays use start_time and end_time
+
+class ShiftOut(ShiftIn):
+    id: int
+    weekdays: List[ShiftWeekdayOut] = []
+    class Config:
+        from_attributes = True
+
+class ShiftAssignment(BaseModel):
+    shift_id: Optional[int] = None # None moves the employees back to the standard hours
+    employee_ids: List[int]
+
+class ShiftAssignmentResult(BaseModel):
+    shift_id: Optional[int] = None
+    assigned: int
+
+class TimingRecomputeResult(BaseModel):
+    start_date: date
+    end_date: date
+    records: int # Non-absent records in the range
+    updated: int # Records whose late or overtime hours changed
+
 # Holiday
 class HolidayBase(BaseModel):
     date: date
@@ -126,6 +197,9 @@ class SettingsIn(BaseModel):
     company_name: Optional[str] = None # Added company_name field
     overtime_multiplier: Optional[float] = None # Added overtime_multiplier field
     mark_sundays_as_holiday: Optional[bool] = False # Added mark_sundays_as_holiday field
+    auto_mark_absent: Optional[bool] = False # Mark unmarked working days Absent at the end of each day
+    holiday_work_multiplier: Optional[float] = 1.0 # Pay factor for a day worked on a holiday
+    late_deduction_policy: Optional[Literal["hourly", "none", "half_day"]] = "hourly"
 
 class SettingsOut(SettingsIn):
     user_id: int
@@ -142,6 +216,7 @@ class AdvanceSalaryCreate(BaseModel):
     amount: float
     date: date
     reason: Optional[str] = None
+    installments: int = Field(1, ge=1, le=60) # Spread the repayment over this many months
 
 class AdvanceSalaryOut(BaseModel):
     id: int
@@ -149,15 +224,43 @@ class AdvanceSalaryOut(BaseModel):
     amount: float
     date: date
     reason: Optional[str] = None
+    installments: int = 1
     
     class Config:
         from_attributes = True
 
+class AdvanceLedgerMonth(BaseModel):
+    month: date
+    advanced: float
+    deduction: float
+    balance: float
+
+    class Config:
+        from_attributes = True
+
+class AdvanceLedgerOut(BaseModel):
+    employee_id: int
+    due_this_month: float = 0.0
+    outstanding_balance: float = 0.0 # Still owed after this month's deduction
+    months: List[AdvanceLedgerMonth]
+
+# Salary History
+class SalaryHistoryOut(BaseModel):
+    id: int
+    employee_id: int
+    effective_from: date
+    monthly_salary: float
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
 # Reports
 class SalaryRow(BaseModel):
     employee_id: int
     name: str
     base_monthly_salary: float
+    effective_monthly_salary: Optional[float] = None # Salary prorated by day over the salary history segments in the month
     days_present: int
     half_days: int
     work_days: float
@@ -169,3 +272,60 @@ class SalaryRow(BaseModel):
     total_hours_worked: float
     advance_deduction: float = 0.0 # Added advance_deduction field
     total_payable_salary: float
+
+class PayrollMonthOut(BaseModel):
+    month: date # First day of the closed month
+    closed_at: datetime
+    closed_by: Optional[int] = None
+    employees: int # Salary rows frozen in the snapshot
+
+class SalaryRollupRow(BaseModel):
+    group: Optional[str] = None # Department or position; None for employees without one (and for the grand total)
+    headcount: int
+    days_present: int
+    half_days: int
+    total_paid_days: float
+    total_overtime_hours: float
+    total_late_hours: float
+    advance_deduction: float
+    total_payable_salary: float
+
+class SalaryRollup(BaseModel):
+    month: str
+    by: Literal["department", "position"]
+    groups: List[SalaryRollupRow]
+    total: SalaryRollupRow
+
+# Punches
+class PunchIngestResult(BaseModel):
+    received: int
+    accepted: int # New punches stored by this batch
+    duplicates: int # Repeated within this batch, or already stored by an earlier one
+    rejected: int
+    days_queued: int # Employee-days whose attendance will be re-derived
+    errors: List[str] # First few rejection reasons
+
+# Dashboard
+class DashboardRecentEntry(BaseModel):
+    id: int
+    date: date
+    status: AttendanceStatus
+    employee_id: int
+    employee_name: str
+    manual_overtime_hours: float = 0.0
+    late_hours: Optional[float] = 0.0
+
+class DashboardEmployeeEntry(AttendanceEmployeeCounts):
+    position: Optional[str] = None
+
+class DashboardSummary(BaseModel):
+    as_of: date
+    headcount: Dict[str, int] # Employees by status (active, inactive, ...)
+    total_employees: int
+    average_salary: float # Over active employees
+    today: AttendanceDayCounts
+    not_marked_today: int # Active employees without an attendance record today
+    month_attendance_rate: float # Present and half days as a percentage of this month's records
+    trend: List[AttendanceDayCounts] # One entry per day, oldest first, zero filled
+    recent: List[DashboardRecentEntry]
+    top_employees: List[DashboardEmployeeEntry] # Best attendance this month, a half day counting as half
@@ -0,0 +1,167 @@
+"""
+The money math of the salary report (utils/payrules.py, utils/payroll.py) and the advance
+ledger (utils/advances.py), checked against hand-computed amounts.
+
+April 2030 has 30 days; at 8 standard hours a 24000 salary is 24000 / (30 x 8) = 100 an hour
+and 800 a day, which keeps the expected values exact.
+"""
+from calendar import monthrange
+from datetime import date
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from models.models import AdvanceLedger, AdvanceSalary, AttendanceRecord, AttendanceStatus, Employee, Settings
+from utils.advances import apply_advance, expected_ledger, installment_schedule
+from utils.payroll import daily_salaries, group_salary_segments
+from utils.payrules import PayRules
+
+APRIL = [date(2030, 4, d) for d in range(1, monthrange(2030, 4)[1] + 1)]
+SALARY = 24000.0
+
+
+def employee(**kwargs) -> Employee:
+    return Employee(id=1, name="Asha", monthly_salary=SALARY, **kwargs)
+
+
+def record(d: date, status=AttendanceStatus.Present, overtime=0.0, late=0.0) -> AttendanceRecord:
+    return AttendanceRecord(employee_id=1, date=d, status=status, manual_overtime_hours=overtime, late_hours=late)
+
+
+def test_mid_month_raise_is_prorated_by_day():
+    rows = [(1, date(2029, 6, 1), 20000.0), (1, date(2030, 1, 1), SALARY), (1, date(2030, 4, 16), 36000.0)]
+    segments = group_salary_segments(rows, APRIL[0])[1]
+    # The 2029 salary is superseded before April and dropped
+    assert segments == [(date(2030, 1, 1), SALARY), (date(2030, 4, 16), 36000.0)]
+    salary_by_day = daily_salaries(segments, APRIL, fallback_salary=0.0)
+    assert salary_by_day == [SALARY] * 15 + [36000.0] * 15
+
+    row = PayRules().salary_row(employee(), [record(d) for d in APRIL], APRIL, salary_by_day, set(), 0.0)
+    # 15 days x 8h x 100 + 15 days x 8h x 150
+    assert row.total_payable_salary == 30000.0
+    assert row.effective_monthly_salary == 30000.0
+    assert row.hourly_rate == 125.0
+    assert row.days_present == 30
+    assert row.total_hours_worked == 240.0
+
+
+def test_employees_without_history_fall_back_to_monthly_salary():
+    assert daily_salaries([], APRIL[:3], fallback_salary=SALARY) == [SALARY] * 3
+
+
+def test_only_days_inside_the_employment_window_are_paid():
+    holidays = {date(2030, 4, 5), date(2030, 4, 15), date(2030, 4, 25)}
+    e = employee(date_of_joining=date(2030, 4, 11), inactive_from=date(2030, 4, 21))
+    recs = [record(d) for d in APRIL if d not in holidays]
+    row = PayRules().salary_row(e, recs, APRIL, [SALARY] * len(APRIL), holidays, 0.0)
+    # Employed 11-20 April: 9 days worked x 800 + the 15 April holiday (800); the holidays
+    # before joining and after leaving are not paid
+    assert row.days_present == 9
+    assert row.paid_holiday_days == 1.0
+    assert row.total_paid_days == 10.0
+    assert row.total_hours_worked == 80.0
+    assert row.total_payable_salary == 8000.0
+
+
+@pytest.mark.parametrize("policy, payable, hours_worked", [
+    ("hourly", 1450.0, 14.5),  # 1.5 late hours x 100 deducted
+    ("none", 1600.0, 16.0),
+    ("half_day", 1200.0, 12.0),  # Any lateness costs 4 hours x 100
+])
+def test_late_deduction_policies(policy, payable, hours_worked):
+    rules = PayRules.compile(Settings(standard_work_hours_per_day=8.0, overtime_multiplier=1.5,
+                                      holiday_work_multiplier=1.0, late_deduction_policy=policy))
+    recs = [record(APRIL[0], late=1.5), record(APRIL[1])]
+    row = rules.salary_row(employee(), recs, APRIL, [SALARY] * len(APRIL), set(), 0.0)
+    assert row.total_late_hours == 1.5
+    assert row.total_hours_worked == hours_worked
+    assert row.total_payable_salary == payable
+
+
+def test_holiday_work_and_overtime_multipliers():
+    rules = PayRules.compile(Settings(standard_work_hours_per_day=8.0, overtime_multiplier=1.5,
+                                      holiday_work_multiplier=2.0, late_deduction_policy="hourly"))
+    holidays = {date(2030, 4, 7), date(2030, 4, 14)}
+    recs = [
+        record(date(2030, 4, 7), overtime=2.0),  # Worked holiday: 800 x 2 + 2h x 1.5 x 100 = 1900
+        record(date(2030, 4, 8), overtime=1.0),  # 800 + 1h x 1.5 x 100 = 950
+        record(date(2030, 4, 9), status=AttendanceStatus.HALF_DAY),  # 400
+        record(date(2030, 4, 10), status=AttendanceStatus.Absent),
+    ]
+    row = rules.salary_row(employee(), recs, APRIL, [SALARY] * len(APRIL), holidays, 0.0)
+    # Plus the 14 April holiday, not worked but paid: 800
+    assert row.total_payable_salary == 4050.0
+    assert row.days_present == 1
+    assert row.half_days == 1
+    assert row.paid_holiday_days == 2.0
+    assert row.total_paid_days == 3.5
+    assert row.total_overtime_hours == 3.0
+    # 8 + 4 + 2 holidays x 8, plus 3 overtime hours
+    assert row.total_hours_worked == 31.0
+
+
+def test_installment_schedule_puts_the_remainder_last():
+    assert installment_schedule(1000.0, date(2030, 4, 20), 3) == [
+        (date(2030, 4, 1), 333.33), (date(2030, 5, 1), 333.33), (date(2030, 6, 1), 333.34),
+    ]
+    assert installment_schedule(500.0, date(2030, 12, 5), 0) == [(date(2030, 12, 1), 500.0)]
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    AdvanceLedger.__table__.create(engine)
+    with Session(engine) as session:
+        yield session
+    engine.dispose()
+
+
+def ledger(db: Session):
+    return {
+        month: [advanced, deduction, balance]
+        for month, advanced, deduction, balance in db.execute(
+            select(AdvanceLedger.month, AdvanceLedger.advanced, AdvanceLedger.deduction, AdvanceLedger.balance)
+            .where(AdvanceLedger.employee_id == 1).order_by(AdvanceLedger.month)
+        )
+    }
+
+
+def test_advance_installments_and_ledger_balances(db):
+    first = AdvanceSalary(employee_id=1, amount=1000.0, date=date(2030, 4, 20), installments=3)
+    second = AdvanceSalary(employee_id=1, amount=600.0, date=date(2030, 5, 3), installments=2)
+    apply_advance(db, first)
+    db.flush()
+    assert ledger(db) == {
+        date(2030, 4, 1): [1000.0, 333.33, 666.67],
+        date(2030, 5, 1): [0.0, 333.33, 333.34],
+        date(2030, 6, 1): [0.0, 333.34, 0.0],
+    }
+
+    # Overlapping months add up
+    apply_advance(db, second)
+    db.flush()
+    both = {
+        date(2030, 4, 1): [1000.0, 333.33, 666.67],
+        date(2030, 5, 1): [600.0, 633.33, 633.34],
+        date(2030, 6, 1): [0.0, 633.34, 0.0],
+    }
+    assert ledger(db) == both
+    assert {month: values for (_, month), values in expected_ledger([
+        (1, 1000.0, date(2030, 4, 20), 3), (1, 600.0, date(2030, 5, 3), 2),
+    ]).items()} == both
+
+    # April's installment comes off April's pay: 30 days x 800 - 333.33
+    row = PayRules().salary_row(employee(), [record(d) for d in APRIL], APRIL, [SALARY] * len(APRIL),
+                                set(), ledger(db)[date(2030, 4, 1)][1])
+    assert row.advance_deduction == 333.33
+    assert row.total_payable_salary == 23666.67
+
+    # Removing an advance restores the balances it changed
+    apply_advance(db, second, sign=-1)
+    db.flush()
+    assert ledger(db) == {
+        date(2030, 4, 1): [1000.0, 333.33, 666.67],
+        date(2030, 5, 1): [0.0, 333.33, 333.34],
+        date(2030, 6, 1): [0.0, 333.34, 0.0],
+    }
@@ -0,0 +1,29 @@
+"""
+The query budgets of tools/query_budget.py as pytest cases: every case in CASES at every
+tenant size in TENANT_SIZES, against the same freshly seeded SQLite database.
+
+Cases run in the order of CASES, as in the tool: some build on the state an earlier case
+left, so select them with -k by endpoint rather than by a single id.
+"""
+import pytest
+from fastapi.testclient import TestClient
+
+# Configures DATABASE_URL before the app is imported
+from tools import query_budget
+from main import app
+
+
+@pytest.fixture(scope="module")
+def client_and_tenants():
+    tenants = {tenant["size"]: tenant for tenant in query_budget.seed_tenants()}
+    with TestClient(app) as client:
+        yield client, tenants
+
+
+@pytest.mark.parametrize("case, size", [
+    pytest.param(case, size, id=f"{case[1]}-{size}") for case in query_budget.CASES for size in query_budget.TENANT_SIZES
+])
+def test_query_budget(client_and_tenants, case, size):
+    client, tenants = client_and_tenants
+    ok, report = query_budget.check_case(client, case, tenants[size])
+    assert ok, report
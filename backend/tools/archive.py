@@ -0,0 +1,178 @@
+"""
+Moves old attendance out of attendance_records into compressed files.
+
+Every closed payroll month (POST /reports/close) that ended before the retention window is
+exported per tenant to one NDJSON file under ARCHIVE_DIR, recorded in attendance_archives,
+and then deleted from attendance_records in batches, each its own short transaction.
+The weekly summary, and list_attendance when given a start_date, read archived months back
+from the files; the salary report of a closed month is served from its snapshot and never
+needed the records. Open months are left alone however old they are: close them first.
+
+    cd backend && python -m tools.archive [--retention-months 24] [--owner ID] [--dry-run]
+    cd backend && python -m tools.archive --restore 2023-01 --owner ID
+
+Files are zstd compressed when the zstandard package is installed and gzip otherwise. A run
+that is interrupted between the export and the last delete batch is finished by the next run.
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import date, datetime, time as dt_time
+from typing import List
+
+from sqlalchemy import delete, func, insert, select
+
+import db
+from models.models import AttendanceArchive, AttendanceRecord, AttendanceStatus, Employee, PayrollMonth
+from utils.archive import (
+    ARCHIVE_COLUMNS, ARCHIVE_RETENTION_MONTHS, archive_file, file_sha256, read_archive, remove_archive, write_archive,
+)
+
+# Columns exported, in ARCHIVE_COLUMNS order
+EXPORT_COLUMNS = tuple(getattr(AttendanceRecord, name) for name in ARCHIVE_COLUMNS)
+
+
+def retention_cutoff(today: date, months: int) -> date:
+    """First day of the oldest month kept: months whose last day is before it are archived."""
+    index = today.year * 12 + (today.month - 1) - months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _month_records(owner_id: int, month: date, month_end: date):
+    return (
+        select(*EXPORT_COLUMNS)
+        .join(Employee, Employee.id == AttendanceRecord.employee_id)
+        .where(Employee.last_updated_by == owner_id, AttendanceRecord.date >= month, AttendanceRecord.date <= month_end)
+    )
+
+
+def _purge(engine, owner_id: int, month: date, month_end: date, batch_size: int) -> int:
+    """Deletes the tenant-month from attendance_records, batch_size ids per transaction."""
+    deleted = 0
+    table = AttendanceRecord.__table__
+    ids_query = _month_records(owner_id, month, month_end).with_only_columns(AttendanceRecord.id).limit(batch_size)
+    while True:
+        with engine.begin() as conn:
+            ids = conn.execute(ids_query).scalars().all()
+            if not ids:
+                return deleted
+            conn.execute(delete(table).where(table.c.id.in_(ids)))
+        deleted += len(ids)
+
+
+def archive_months(engine, cutoff: date, owner_id: int = None, batch_size: int = 5000, dry_run: bool = False) -> List[dict]:
+    months_query = (
+        select(PayrollMonth.user_id, PayrollMonth.month, PayrollMonth.month_end, AttendanceArchive.path)
+        .outerjoin(AttendanceArchive, (AttendanceArchive.user_id == PayrollMonth.user_id) & (AttendanceArchive.month == PayrollMonth.month))
+        .where(PayrollMonth.month_end < cutoff)
+        .order_by(PayrollMonth.user_id, PayrollMonth.month)
+    )
+    if owner_id is not None:
+        months_query = months_query.where(PayrollMonth.user_id == owner_id)
+    with engine.connect() as conn:
+        months = conn.execute(months_query).all()
+
+    report = []
+    for owner, month, month_end, archived_path in months:
+        started = time.perf_counter()
+        if dry_run:
+            with engine.connect() as conn:
+                rows = conn.execute(_month_records(owner, month, month_end).with_only_columns(func.count())).scalar()
+            if rows or archived_path is None:
+                report.append({"owner": owner, "month": month, "rows": rows, "action": "resume" if archived_path else "archive"})
+            continue
+
+        if archived_path is None:
+            path = archive_file(owner, month)
+            with engine.connect() as conn:
+                # Streamed, so a large tenant-month is not held in memory
+                result = conn.execution_options(stream_results=True, yield_per=batch_size).execute(_month_records(owner, month, month_end))
+                rows, sha256 = write_archive(path, result)
+            with engine.begin() as conn:
+                conn.execute(insert(AttendanceArchive).values(
+                    user_id=owner, month=month, month_end=month_end, path=path, row_count=rows, sha256=sha256,
+                    archived_at=datetime.utcnow(),
+                ))
+            action = "archive"
+        else:
+            # Exported by an earlier run that stopped before deleting everything
+            path, rows, action = archived_path, None, "resume"
+        deleted = _purge(engine, owner, month, month_end, batch_size)
+        if action == "resume" and not deleted:
+            continue
+        report.append({"owner": owner, "month": month, "rows": rows if rows is not None else deleted, "deleted": deleted,
+                       "action": action, "path": path, "seconds": round(time.perf_counter() - started, 2)})
+    return report
+
+
+def restore_month(engine, owner_id: int, month: date, batch_size: int = 5000) -> int:
+    """Puts an archived tenant-month back into attendance_records and drops its catalog row and file."""
+    with engine.connect() as conn:
+        archive = conn.execute(select(AttendanceArchive).where(
+            AttendanceArchive.user_id == owner_id, AttendanceArchive.month == month)).first()
+    if archive is None:
+        raise SystemExit(f"{month:%Y-%m} of owner {owner_id} is not archived.")
+    if file_sha256(archive.path) != archive.sha256:
+        raise SystemExit(f"{archive.path} does not match its recorded checksum; not restoring.")
+
+    rows = [
+        {**r, "date": date.fromisoformat(r["date"]), "status": AttendanceStatus(r["status"]),
+         "check_in": r["check_in"] and dt_time.fromisoformat(r["check_in"]),
+         "check_out": r["check_out"] and dt_time.fromisoformat(r["check_out"])}
+        for r in read_archive(archive.path)
+    ]
+    with engine.begin() as conn:
+        # Rows of an interrupted archive run may still be in the table
+        present = set(conn.execute(_month_records(owner_id, month, archive.month_end).with_only_columns(AttendanceRecord.id)).scalars())
+        missing = [r for r in rows if r["id"] not in present]
+        for start in range(0, len(missing), batch_size):
+            conn.execute(insert(AttendanceRecord.__table__), missing[start:start + batch_size])
+        conn.execute(delete(AttendanceArchive).where(AttendanceArchive.user_id == owner_id, AttendanceArchive.month == month))
+    remove_archive(archive.path)
+    return len(missing)
+
+
+def _parse_month(value: str) -> date:
+    try:
+        return datetime.strptime(value, "%Y-%m").date()
+    except ValueError:
+        raise argparse.ArgumentTypeError("expected YYYY-MM")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--retention-months", type=int, default=ARCHIVE_RETENTION_MONTHS,
+                        help=f"whole months kept in attendance_records (default {ARCHIVE_RETENTION_MONTHS}, ARCHIVE_RETENTION_MONTHS)")
+    parser.add_argument("--owner", type=int, help="only this tenant (admin user id)")
+    parser.add_argument("--batch-size", type=int, default=5000, help="rows deleted or restored per transaction")
+    parser.add_argument("--dry-run", action="store_true", help="list what would be archived, change nothing")
+    parser.add_argument("--restore", type=_parse_month, metavar="YYYY-MM", help="restore this archived month of --owner")
+    parser.add_argument("--database-url", help="overrides DATABASE_URL")
+    args = parser.parse_args(argv)
+
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+        db.dispose_engines()
+    engine = db.get_engine()
+
+    if args.restore:
+        if args.owner is None:
+            parser.error("--restore needs --owner")
+        restored = restore_month(engine, args.owner, args.restore, args.batch_size)
+        print(f"restored {restored:,} records of {args.restore:%Y-%m} for owner {args.owner}")
+        return 0
+
+    cutoff = retention_cutoff(date.today(), args.retention_months)
+    started = time.perf_counter()
+    report = archive_months(engine, cutoff, args.owner, args.batch_size, args.dry_run)
+    for entry in report:
+        print(f"owner {entry['owner']:>6} {entry['month']:%Y-%m}  {entry['action']:8} {entry['rows']:>10,} rows"
+              + (f"  {entry['path']} in {entry['seconds']}s" if "path" in entry else ""))
+    print(f"{len(report)} tenant-months before {cutoff:%Y-%m} {'would be ' if args.dry_run else ''}archived"
+          f" in {time.perf_counter() - started:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
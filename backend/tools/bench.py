@@ -0,0 +1,269 @@
+"""
+Benchmark driver for the hot endpoints.
+
+Drives signin, upsert_attendance, list_attendance, list_employees, salary_report,
+salary_report.csv and add_holiday with concurrent httpx clients, for every seeded tenant
+given with --tenant. It reports p50/p95/p99 latency, throughput, errors and peak RSS per
+scenario, and the mean bytes on the wire per response (compressed unless --no-compression).
+Results can be saved as a JSON baseline and compared against a later run.
+
+    cd backend
+    python -m tools.seed --database-url sqlite:///bench.db --create-schema --prefix small --admins 1 --employees 20
+    python -m tools.seed --database-url sqlite:///bench.db --prefix large --admins 1 --employees 2000
+    DATABASE_URL=sqlite:///bench.db python -m tools.bench --in-process --tenant small --tenant large --save baseline.json
+    DATABASE_URL=sqlite:///bench.db python -m tools.bench --in-process --tenant small --tenant large --compare baseline.json
+
+Without --in-process it targets --base-url. Pass --server-pid to report that server's peak
+RSS instead of this process's. upsert_attendance and add_holiday write to the database, so
+reseed before you compare runs.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+from datetime import date, datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+SCENARIOS = ["signin", "upsert_attendance", "list_attendance", "list_employees", "salary_report", "salary_report_csv", "add_holiday"]
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def peak_rss_mb(pid: Optional[int]) -> float:
+    """Peak resident set size: VmHWM of another process, or ru_maxrss of this one."""
+    if pid:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+        return 0.0
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return maxrss / (1024 * 1024) if sys.platform == "darwin" else maxrss / 1024
+
+
+class Tenant:
+    def __init__(self, prefix: str, password: str):
+        self.prefix = prefix
+        self.email = f"{prefix}-admin0@example.com"
+        self.password = password
+        self.headers: Dict[str, str] = {}
+        self.employee_ids: List[int] = []
+
+    async def login(self, client: httpx.AsyncClient):
+        response = await client.post("/auth/signin", json={"email": self.email, "password": self.password})
+        response.raise_for_status()
+        self.headers = {"Authorization": f"Bearer {response.json()['token']}"}
+        response = await client.get("/employees/", headers=self.headers)
+        response.raise_for_status()
+        self.employee_ids = [e["id"] for e in response.json() if e.get("status", "active") == "active"]
+        if not self.employee_ids:
+            raise SystemExit(f"tenant {self.prefix!r} has no active employees; seed it with tools.seed first")
+
+
+def build_request(name: str, tenant: Tenant, month: str, rng: random.Random) -> Callable[[httpx.AsyncClient], Awaitable[httpx.Response]]:
+    year, mon = (int(p) for p in month.split("-"))
+    month_start = date(year, mon, 1)
+    month_end = (month_start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+
+    if name == "signin":
+        return lambda c: c.post("/auth/signin", json={"email": tenant.email, "password": tenant.password})
+    if name == "upsert_attendance":
+        def upsert(c):
+            payload = {
+                "employee_id": rng.choice(tenant.employee_ids),
+                "date": (month_start + timedelta(days=rng.randrange(month_end.day))).isoformat(),
+                "status": rng.choice(("Present", "Present", "Present", "Half-day", "Absent")),
+                "manual_overtime_hours": rng.choice((0.0, 0.0, 1.0)),
+                "late_hours": 0.0,
+            }
+            return c.post("/attendance/", json=payload, headers=tenant.headers)
+        return upsert
+    if name == "list_attendance":
+        return lambda c: c.get("/attendance/", params={"start_date": month_start.isoformat(), "end_date": month_end.isoformat()},
+                               headers=tenant.headers)
+    if name == "list_employees":
+        return lambda c: c.get("/employees/", headers=tenant.headers)
+    if name == "salary_report":
+        return lambda c: c.get("/reports/salary", params={"month": month}, headers=tenant.headers)
+    if name == "salary_report_csv":
+        return lambda c: c.get("/reports/salary.csv", params={"month": month}, headers=tenant.headers)
+    if name == "add_holiday":
+        def add_holiday(c):
+            day = month_start + timedelta(days=rng.randrange(month_end.day))
+            return c.post("/settings/holidays", headers=tenant.headers,
+                          data={"name": "Bench Holiday", "date": day.isoformat(), "override_past_attendance": "false"})
+        return add_holiday
+    raise ValueError(f"unknown scenario {name!r}")
+
+
+async def run_scenario(client: httpx.AsyncClient, send, requests: int, concurrency: int, warmup: int) -> dict:
+    for _ in range(warmup):
+        await send(client)
+
+    latencies: List[float] = []
+    wire_bytes = 0
+    errors = 0
+    remaining = requests
+
+    async def worker():
+        nonlocal remaining, errors, wire_bytes
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            try:
+                response = await send(client)
+                wire_bytes += response.num_bytes_downloaded
+                if response.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "bytes_per_response": round(wire_bytes / len(latencies)) if latencies else 0,
+    }
+
+
+def _client(args) -> httpx.AsyncClient:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    headers = {"Accept-Encoding": "identity"} if args.no_compression else None
+    if args.in_process:
+        from main import app  # Imported lazily: needs DATABASE_URL and the backend on sys.path
+        # Unhandled app exceptions come back as 500s, as from a server, and count as errors
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        return httpx.AsyncClient(transport=transport, base_url="http://bench", limits=limits,
+                                 timeout=args.timeout, headers=headers)
+    return httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=args.timeout, headers=headers)
+
+
+async def run(args) -> dict:
+    results: Dict[str, dict] = {}
+    async with _client(args) as client:
+        for prefix in args.tenant:
+            tenant = Tenant(prefix, args.password)
+            await tenant.login(client)
+            for name in args.scenario:
+                rng = random.Random(f"{args.seed}:{prefix}:{name}")
+                requests = args.signin_requests if name == "signin" else args.requests
+                result = await run_scenario(client, build_request(name, tenant, args.month, rng), requests, args.concurrency, args.warmup)
+                result["employees"] = len(tenant.employee_ids)
+                result["peak_rss_mb"] = round(peak_rss_mb(args.server_pid), 1)
+                key = f"{prefix}/{name}"
+                results[key] = result
+                print(f"{key:32} n={result['requests']:<5} err={result['errors']:<3} p50={result['p50_ms']:>8.2f}ms "
+                      f"p95={result['p95_ms']:>8.2f}ms p99={result['p99_ms']:>8.2f}ms {result['throughput_rps']:>8.1f} req/s "
+                      f"{result['bytes_per_response']:>9,}B rss={result['peak_rss_mb']:.0f}MB", flush=True)
+    if args.in_process:
+        import db
+        # Pooled aiosqlite connections run on non-daemon threads; close them or the process never exits
+        await db.get_async_engine().dispose()
+        db.dispose_engines()
+    return results
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> int:
+    """Prints per-scenario latency/throughput deltas; returns the number of regressions beyond threshold."""
+    regressions = 0
+    for key, now in current["results"].items():
+        before = baseline.get("results", {}).get(key)
+        if not before:
+            print(f"{key:32} (not in baseline)")
+            continue
+        deltas = []
+        for metric, higher_is_worse in (("p50_ms", True), ("p95_ms", True), ("p99_ms", True), ("throughput_rps", False)):
+            old, new = before[metric], now[metric]
+            change = (new - old) / old if old else 0.0
+            worse = change > threshold if higher_is_worse else change < -threshold
+            regressions += worse
+            deltas.append(f"{metric}={new} ({change:+.0%}{' REGRESSION' if worse else ''})")
+        print(f"{key:32} " + "  ".join(deltas))
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tenant", action="append", help="seed prefix of a tenant to benchmark (repeatable; default: seed)")
+    parser.add_argument("--scenario", action="append", choices=SCENARIOS, help="scenario to run (repeatable; default: all)")
+    parser.add_argument("--password", default="password123")
+    parser.add_argument("--month", default=f"{date.today().year - 1}-06", help="YYYY-MM used by the attendance and report scenarios")
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario (default 200)")
+    parser.add_argument("--signin-requests", type=int, default=50, help="signin is argon2 bound, so it gets its own count")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--in-process", action="store_true", help="run the app in this process through httpx.ASGITransport")
+    parser.add_argument("--no-compression", action="store_true", help="send Accept-Encoding: identity")
+    parser.add_argument("--server-pid", type=int, help="report peak RSS of this (server) process")
+    parser.add_argument("--save", help="write results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON to diff against")
+    parser.add_argument("--regression-threshold", type=float, default=0.2, help="relative change counted as a regression (default 0.2)")
+    args = parser.parse_args(argv)
+    args.tenant = args.tenant or ["seed"]
+    args.scenario = args.scenario or SCENARIOS
+
+    results = asyncio.run(run(args))
+    report = {
+        "meta": {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "database": os.getenv("DATABASE_URL", "").split("://")[0] if args.in_process else None,
+            "target": "in-process" if args.in_process else args.base_url,
+            "month": args.month,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "compression": not args.no_compression,
+            # Logging config changes request cost; record it so runs are compared like for like
+            "log_level": os.getenv("LOG_LEVEL", "INFO"),
+            "log_format": os.getenv("LOG_FORMAT", "json"),
+        },
+        "results": results,
+    }
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print(f"saved {args.save}")
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), report, args.regression_threshold)
+        if regressions:
+            print(f"{regressions} metric(s) regressed by more than {args.regression_threshold:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+"""
+Checks the monthly partitioning of attendance_records on a Postgres database.
+
+Verifies that attendance_records is partitioned, that partitions exist from this month through
+ATTENDANCE_PARTITIONS_AHEAD months ahead, and reports rows stranded in the default partition, by
+month. Then EXPLAINs the month-bounded attendance queries of the salary report, list_attendance and
+the weekly summary for a month and fails when a plan touches any partition outside that month.
+
+    cd backend && python -m tools.check_partitions [--month 2025-06] [--owner ID] [--create-missing]
+
+Exits non-zero on any failure. Plans are built with the month's bounds inlined, which is what
+plan-time pruning sees; with bound parameters Postgres prunes the same partitions at executor
+startup instead ("Subplans Removed" in EXPLAIN ANALYZE).
+"""
+import argparse
+import json
+import os
+import sys
+from calendar import monthrange
+from datetime import date, datetime
+from typing import Iterator, List, Set
+
+from sqlalchemy import case, func, select, text
+
+import db
+from models.models import AttendanceRecord, Employee
+from routers.attendance import ATTENDANCE_LIST_COLUMNS, STATUS_KEYS
+from utils.partitions import (
+    ATTENDANCE_PARTITIONS_AHEAD, DEFAULT_PARTITION, PARENT, add_months, ensure_future_partitions, existing_partitions,
+    is_partitioned, partition_name,
+)
+
+
+def month_queries(owner_id: int, first: date, last: date) -> dict:
+    """The attendance statements of the month-bounded endpoints, as the routers build them."""
+    in_month = (AttendanceRecord.date >= first, AttendanceRecord.date <= last)
+    employee_ids = select(Employee.id).filter(Employee.last_updated_by == owner_id)
+    tenant_rows = (
+        AttendanceRecord.__table__.join(Employee.__table__, AttendanceRecord.employee_id == Employee.id)
+    )
+    return {
+        "salary_report": select(AttendanceRecord).filter(AttendanceRecord.employee_id.in_(employee_ids), *in_month),
+        "list_attendance": select(*ATTENDANCE_LIST_COLUMNS).select_from(tenant_rows)
+        .filter(Employee.last_updated_by == owner_id, *in_month),
+        "weekly_summary_days": select(AttendanceRecord.date, AttendanceRecord.status, func.count(AttendanceRecord.id))
+        .select_from(tenant_rows).filter(Employee.last_updated_by == owner_id, *in_month)
+        .group_by(AttendanceRecord.date, AttendanceRecord.status),
+        "weekly_summary_employees": select(
+            AttendanceRecord.employee_id, Employee.name,
+            *(func.sum(case((AttendanceRecord.status == status, 1), else_=0)).label(key) for status, key in STATUS_KEYS.items()),
+        ).select_from(tenant_rows).filter(Employee.last_updated_by == owner_id, *in_month)
+        .group_by(AttendanceRecord.employee_id, Employee.name),
+    }
+
+
+def _relations(plan: dict) -> Iterator[str]:
+    if "Relation Name" in plan:
+        yield plan["Relation Name"]
+    for child in plan.get("Plans", []):
+        yield from _relations(child)
+
+
+def scanned_partitions(conn, statement) -> Set[str]:
+    sql = str(statement.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+    plan = conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return {name for name in _relations(plan[0]["Plan"]) if name.startswith(PARENT + "_")}
+
+
+def _parse_month(value: str) -> date:
+    try:
+        return datetime.strptime(value, "%Y-%m").date()
+    except ValueError:
+        raise argparse.ArgumentTypeError("expected YYYY-MM")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--month", type=_parse_month, default=date.today().replace(day=1), help="month to EXPLAIN (default this month)")
+    parser.add_argument("--owner", type=int, default=1, help="tenant (admin user id) the queries filter on (default 1)")
+    parser.add_argument("--create-missing", action="store_true", help="create missing future partitions first, like the scheduler job")
+    parser.add_argument("--database-url", help="overrides DATABASE_URL")
+    args = parser.parse_args(argv)
+
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+        db.dispose_engines()
+
+    failures: List[str] = []
+    with db.SessionLocal() as session:
+        if not is_partitioned(session):
+            print(f"{PARENT} is not a partitioned Postgres table (run alembic upgrade head on Postgres)")
+            return 1
+        if args.create_missing:
+            created = ensure_future_partitions(session)["created"]
+            session.commit()
+            print(f"created {len(created)} partitions {' '.join(created)}")
+
+        partitions = existing_partitions(session)
+        this_month = date.today().replace(day=1)
+        missing = [partition_name(add_months(this_month, n)) for n in range(ATTENDANCE_PARTITIONS_AHEAD + 1)
+                   if partition_name(add_months(this_month, n)) not in partitions]
+        print(f"{len(partitions)} partitions, {len(missing)} missing ahead" + (f": {' '.join(missing)}" if missing else ""))
+        if missing:
+            failures.append("missing future partitions")
+        stranded = session.execute(text(
+            f"SELECT to_char(date, 'YYYY-MM') AS month, count(*) FROM {DEFAULT_PARTITION} GROUP BY month ORDER BY month"
+        )).all()
+        print(f"{sum(count for _, count in stranded):,} rows in {DEFAULT_PARTITION}"
+              + (f": {', '.join(f'{month} {count:,}' for month, count in stranded)}" if stranded else ""))
+
+        first = args.month
+        last = date(first.year, first.month, monthrange(first.year, first.month)[1])
+        expected = {partition_name(first)}
+        conn = session.connection()
+        for name, statement in month_queries(args.owner, first, last).items():
+            scanned = scanned_partitions(conn, statement)
+            extra = scanned - expected
+            verdict = "ok" if not extra else "NOT PRUNED"
+            print(f"{name:26} {verdict:10} scans {', '.join(sorted(scanned)) or '(no partition)'}")
+            if extra:
+                failures.append(name)
+
+    db.dispose_engines()
+    if failures:
+        print(f"FAILED: {', '.join(failures)}")
+        return 1
+    print("partitions ok, every query pruned to one month")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,243 @@
+"""
+Query-budget check for the API.
+
+Runs each endpoint against a freshly seeded SQLite database at two tenant sizes and fails
+when a request issues more SQL statements than its declared budget. Because the budget has
+to hold at both sizes, a query inside a per-employee loop (N+1) fails the check even when
+the small tenant happens to fit.
+
+    cd backend && python -m tools.query_budget [--verbose]
+
+A case also fails when the response status is not the expected one (an endpoint that starts
+answering 401 or 422 issues fewer statements and would otherwise pass), or when a request runs
+the same statement more than QUERY_REPEAT_WARN_THRESHOLD (default 2) times.
+
+Exits non-zero when any case fails. Needs httpx for FastAPI's TestClient. tests/test_query_budget.py
+runs the same cases under pytest.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import warnings
+from datetime import date, timedelta
+from typing import List, Tuple
+
+# The database has to be configured before the app (and db.py) is imported
+_tmpdir = tempfile.mkdtemp(prefix="query_budget_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir, 'budget.db')}"
+# Same statement more than twice in one request is a loop over rows; RepeatedQueryWarning fails the case
+os.environ.setdefault("QUERY_REPEAT_WARN_THRESHOLD", "2")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ.setdefault("SCHEDULER_ENABLED", "false")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import db  # noqa: E402
+from main import app  # noqa: E402
+from models.models import (  # noqa: E402
+    AdvanceLedger, AdvanceSalary, AttendanceRecord, AttendanceStatus, Base, Employee, Holiday,
+    SalaryHistory, Settings, User, UserRole,
+)
+from routers.auth import create_access_token  # noqa: E402
+from utils.auth import hash_password  # noqa: E402
+from utils.metrics import registry  # noqa: E402
+from utils.versions import EMPLOYEES, version_headers  # noqa: E402
+
+PASSWORD = "budget-password"
+MONTH = date(2026, 3, 1)
+TENANT_SIZES = (3, 30)
+
+
+def seed_tenant(session, index: int, employees: int, password_hash: str) -> dict:
+    """One admin with a staff user, `employees` employees and a month of attendance, holidays and advances."""
+    admin = User(name=f"Admin {index}", email=f"admin{index}@example.com", password_hash=password_hash, role=UserRole.admin)
+    session.add(admin)
+    session.flush()
+    session.add(Settings(user_id=admin.id, company_name=f"Company {index}"))
+    staff = User(name=f"Staff {index}", email=f"staff{index}@example.com", password_hash=password_hash,
+                 role=UserRole.staff, created_by_admin_id=admin.id)
+    session.add(staff)
+    session.flush()
+
+    emps = []
+    for i in range(employees):
+        emp = Employee(name=f"Employee {index}-{i}", monthly_salary=30000 + i, date_of_joining=date(2025, 1, 1),
+                       department=f"Dept {i % 3}", position=f"Role {i % 2}", last_updated_by=admin.id,
+                       user_id=staff.id if i == 0 else None)
+        session.add(emp)
+        emps.append(emp)
+    session.flush()
+
+    days = [MONTH + timedelta(days=d) for d in range(28)]
+    session.add_all(SalaryHistory(employee_id=e.id, effective_from=date(2025, 1, 1), monthly_salary=e.monthly_salary) for e in emps)
+    session.add_all(
+        AttendanceRecord(date=d, status=AttendanceStatus.Present if (e.id + d.day) % 5 else AttendanceStatus.HALF_DAY,
+                         manual_overtime_hours=1.0 if d.day % 7 == 0 else 0.0, late_hours=0.0,
+                         employee_id=e.id, user_id=admin.id)
+        for e in emps for d in days
+    )
+    session.add_all(Holiday(date=d, name="Sunday Holiday", user_id=admin.id) for d in days if d.weekday() == 6)
+    for e in emps[:2]:
+        session.add(AdvanceSalary(employee_id=e.id, amount=1000.0, date=MONTH, installments=1))
+        session.add(AdvanceLedger(employee_id=e.id, month=MONTH, advanced=1000.0, deduction=1000.0, balance=0.0))
+    session.flush()
+
+    return {
+        "admin": admin.id,
+        "staff": staff.id,
+        "employee": emps[-1].id,
+        "attendance": session.query(AttendanceRecord.id).filter(AttendanceRecord.employee_id == emps[-1].id).first()[0],
+        "admin_headers": _headers(admin, None),
+        "staff_headers": _headers(staff, emps[0].id),
+    }
+
+
+def _headers(user: User, employee_id) -> dict:
+    token = create_access_token({"sub": user.email, "id": user.id, "name": user.name,
+                                 "admin": user.role == UserRole.admin, "employee_id": employee_id})
+    return {"Authorization": f"Bearer {token}"}
+
+
+def _employees_etag(tenant: dict) -> str:
+    with db.SessionLocal() as session:
+        return version_headers(session, tenant["admin"], EMPLOYEES, tenant["admin"])["ETag"]
+
+
+def _shift_assignment(tenant: dict) -> dict:
+    """Request kwargs for /shifts/assign; remembers the employee list's ETag from before it."""
+    tenant["employees_etag"] = _employees_etag(tenant)
+    return {"headers": tenant["admin_headers"], "json": {"shift_id": None, "employee_ids": [tenant["employee"]]}}
+
+
+# (method, route template, path builder, request kwargs builder, statement budget, expected status)
+# Budgets are per request and must hold for every tenant size in TENANT_SIZES.
+CASES = [
+    ("POST", "/auth/signin", lambda t: "/auth/signin",
+     lambda t: {"json": {"email": f"admin{t['index']}@example.com", "password": PASSWORD}}, 4, 200),
+    ("GET", "/employees/", lambda t: "/employees/", lambda t: {"headers": t["admin_headers"]}, 3, 200),
+    ("GET", "/employees/ (304)", lambda t: "/employees/", lambda t: {"headers": {**t["admin_headers"], "If-None-Match": "*"}}, 2, 304),
+    ("GET", "/employees/search", lambda t: "/employees/search?q=Emp&department=Dept%200&limit=10",
+     lambda t: {"headers": t["admin_headers"]}, 2, 200),
+    ("POST", "/employees/", lambda t: "/employees/",
+     lambda t: {"headers": t["admin_headers"], "json": {"name": "New hire", "monthly_salary": 25000}}, 6, 200),
+    ("PUT", "/employees/{emp_id}", lambda t: f"/employees/{t['employee']}",
+     lambda t: {"headers": t["admin_headers"], "json": {"name": "Renamed", "monthly_salary": 40000}}, 7, 200),
+    ("GET", "/employees/{emp_id}/salary-history", lambda t: f"/employees/{t['employee']}/salary-history",
+     lambda t: {"headers": t["admin_headers"]}, 3, 200),
+    ("GET", "/employees/{emp_id}/advances", lambda t: f"/employees/{t['employee']}/advances",
+     lambda t: {"headers": t["admin_headers"]}, 3, 200),
+    ("GET", "/employees/{emp_id}/advances/ledger", lambda t: f"/employees/{t['employee']}/advances/ledger",
+     lambda t: {"headers": t["admin_headers"]}, 5, 200),
+    ("POST", "/employees/{emp_id}/advances", lambda t: f"/employees/{t['employee']}/advances",
+     lambda t: {"headers": t["admin_headers"], "json": {"amount": 1200, "date": "2026-03-10", "installments": 3}}, 9, 200),
+    ("POST", "/attendance/", lambda t: "/attendance/",
+     lambda t: {"headers": t["admin_headers"], "json": {"employee_id": t["employee"], "date": "2026-03-30", "status": "Present"}}, 6, 201),
+    ("GET", "/attendance/", lambda t: "/attendance/?start_date=2026-03-01&end_date=2026-03-31",
+     lambda t: {"headers": t["admin_headers"]}, 3, 200),
+    # Without start_date the archive catalog is not consulted
+    ("GET", "/attendance/ (unbounded)", lambda t: "/attendance/", lambda t: {"headers": t["admin_headers"]}, 2, 200),
+    ("POST", "/attendance/ (check-in)", lambda t: "/attendance/",
+     lambda t: {"headers": t["admin_headers"], "json": {"employee_id": t["employee"], "date": "2026-03-31", "status": "Present",
+                                                         "check_in": "09:20", "check_out": "18:30"}}, 10, 201),
+    ("POST", "/attendance/fill-absent", lambda t: "/attendance/fill-absent?start_date=2026-03-01&end_date=2026-03-31",
+     lambda t: {"headers": t["admin_headers"]}, 3, 200),
+    ("GET", "/attendance/weekly_summary", lambda t: "/attendance/weekly_summary?start_date=2026-03-01&end_date=2026-03-31",
+     lambda t: {"headers": t["admin_headers"]}, 5, 200),
+    ("GET", "/attendance/{attendance_id}", lambda t: f"/attendance/{t['attendance']}",
+     lambda t: {"headers": t["admin_headers"]}, 2, 200),
+    ("PUT", "/attendance/{attendance_id}", lambda t: f"/attendance/{t['attendance']}",
+     lambda t: {"headers": t["admin_headers"], "json": {"employee_id": t["employee"], "date": "2026-03-01", "status": "Half-day"}}, 5, 200),
+    ("GET", "/reports/salary", lambda t: "/reports/salary?month=2026-03", lambda t: {"headers": t["admin_headers"]}, 8, 200),
+    ("GET", "/reports/salary (staff)", lambda t: "/reports/salary?month=2026-03", lambda t: {"headers": t["staff_headers"]}, 9, 200),
+    ("GET", "/reports/salary.csv", lambda t: "/reports/salary.csv?month=2026-03", lambda t: {"headers": t["admin_headers"]}, 8, 200),
+    ("GET", "/reports/rollup", lambda t: "/reports/rollup?month=2026-03&by=department", lambda t: {"headers": t["admin_headers"]}, 8, 200),
+    ("GET", "/reports/closed", lambda t: "/reports/closed", lambda t: {"headers": t["admin_headers"]}, 2, 200),
+    ("POST", "/settings/holidays", lambda t: "/settings/holidays",
+     lambda t: {"headers": t["admin_headers"], "data": {"name": "Festival", "date": "2026-03-20", "override_past_attendance": "true"}}, 8, 200),
+    ("GET", "/settings/holidays", lambda t: "/settings/holidays", lambda t: {"headers": t["admin_headers"]}, 3, 200),
+    ("GET", "/settings/holidays (304)", lambda t: "/settings/holidays", lambda t: {"headers": {**t["admin_headers"], "If-None-Match": "*"}}, 2, 304),
+    ("GET", "/settings/company", lambda t: "/settings/company", lambda t: {"headers": t["admin_headers"]}, 3, 200),
+    ("GET", "/settings/company (304)", lambda t: "/settings/company", lambda t: {"headers": {**t["admin_headers"], "If-None-Match": "*"}}, 2, 304),
+    ("POST", "/settings/company", lambda t: "/settings/company",
+     lambda t: {"headers": t["admin_headers"], "data": {"company_name": "Co", "standard_work_hours_per_day": "8", "currency": "INR",
+                                                         "overtime_multiplier": "1.5", "mark_sundays_as_holiday": "true"}}, 11, 200),
+    ("POST", "/punches/ingest", lambda t: "/punches/ingest",
+     lambda t: {"headers": {**t["admin_headers"], "Content-Type": "application/x-ndjson"}, "content": "\n".join(
+         f'{{"device_id": "gate-1", "employee_id": {t["employee"]}, "punched_at": "2026-03-25T{h}:00:00"}}' for h in ("09", "18"))}, 6, 200),
+    # The same punches again: all duplicates, nothing inserted or queued
+    ("POST", "/punches/ingest (resend)", lambda t: "/punches/ingest",
+     lambda t: {"headers": {**t["admin_headers"], "Content-Type": "application/x-ndjson"}, "content": "\n".join(
+         f'{{"device_id": "gate-1", "employee_id": {t["employee"]}, "punched_at": "2026-03-25T{h}:00:00"}}' for h in ("09", "18"))}, 4, 200),
+    ("GET", "/shifts/", lambda t: "/shifts/", lambda t: {"headers": t["admin_headers"]}, 3, 200),
+    ("POST", "/shifts/assign", lambda t: "/shifts/assign", _shift_assignment, 3, 200),
+    # The list's ETag from before the assignment must no longer match, since rows carry shift_id
+    ("GET", "/employees/ (stale ETag)", lambda t: "/employees/",
+     lambda t: {"headers": {**t["admin_headers"], "If-None-Match": t["employees_etag"]}}, 3, 200),
+    ("POST", "/shifts/recompute", lambda t: "/shifts/recompute?start_date=2026-03-01&end_date=2026-03-31",
+     lambda t: {"headers": t["admin_headers"]}, 6, 200),
+    ("GET", "/dashboard/summary", lambda t: "/dashboard/summary", lambda t: {"headers": t["admin_headers"]}, 5, 200),
+    ("GET", "/dashboard/summary (staff)", lambda t: "/dashboard/summary", lambda t: {"headers": t["staff_headers"]}, 6, 200),
+    ("GET", "/admin/staff", lambda t: "/admin/staff", lambda t: {"headers": t["admin_headers"]}, 2, 200),
+    ("GET", "/admin/employees/available", lambda t: "/admin/employees/available", lambda t: {"headers": t["admin_headers"]}, 2, 200),
+    ("GET", "/health-check", lambda t: "/health-check", lambda t: {}, 1, 200),
+]
+
+
+def _statement_total(method: str, route: str) -> float:
+    hist = registry.sql_count.get((method, route))
+    return hist.sum if hist else 0.0
+
+
+def seed_tenants() -> List[dict]:
+    """Creates the schema and one tenant per size in TENANT_SIZES."""
+    Base.metadata.create_all(db.get_engine())
+    password_hash = hash_password(PASSWORD)
+    tenants = []
+    with db.SessionLocal() as session:
+        for index, size in enumerate(TENANT_SIZES):
+            tenant = seed_tenant(session, index, size, password_hash)
+            tenant.update(index=index, size=size)
+            tenants.append(tenant)
+        session.commit()
+    return tenants
+
+
+def check_case(client: TestClient, case: tuple, tenant: dict) -> Tuple[bool, str]:
+    """Sends one case's request for a tenant; returns whether it held and a report line."""
+    method, label, path, kwargs, budget, expected_status = case
+    route = label.split(" ")[0]
+    before = _statement_total(method, route)
+    with warnings.catch_warnings(record=True) as caught:
+        # Warnings raised while serving the request (RepeatedQueryWarning above all) fail the case
+        warnings.simplefilter("always")
+        response = client.request(method, path(tenant), **kwargs(tenant))
+    used = int(_statement_total(method, route) - before)
+    warned = [f"{w.category.__name__}: {w.message}" for w in caught]
+    ok = used <= budget and response.status_code == expected_status and not warned
+    report = (f"{'ok  ' if ok else 'FAIL'} {method:6} {label:45} employees={tenant['size']:<4} "
+              f"status={response.status_code}/{expected_status} statements={used}/{budget}")
+    return ok, "\n".join([report] + [f"     {message}" for message in warned])
+
+
+def run(verbose: bool = False) -> int:
+    tenants = seed_tenants()
+    failures = []
+    with TestClient(app) as client:
+        # Cases run in order: some build on the state an earlier one left (see /shifts/assign)
+        for case in CASES:
+            for tenant in tenants:
+                ok, report = check_case(client, case, tenant)
+                if verbose or not ok:
+                    print(report)
+                if not ok:
+                    failures.append(case[1])
+
+    print(f"{len(CASES) - len(set(failures))}/{len(CASES)} endpoints within their query budget")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--verbose", action="store_true", help="print every request, not only failures")
+    sys.exit(run(parser.parse_args().verbose))
@@ -0,0 +1,275 @@
+"""
+Synthetic tenant data for load and benchmark work.
+
+Generates N admins (tenants), each with M employees, linked staff users, company settings,
+salary history, a year of attendance with a realistic status mix and OT/late hours,
+holidays, advances and the matching advance ledger. Output is deterministic for a given
+--seed and --prefix.
+
+    cd backend && python -m tools.seed --admins 10 --employees 1000 --year 2025
+
+Rows are written with COPY on Postgres (psycopg2) and chunked executemany elsewhere, so
+large volumes load in minutes: 30 admins x 1000 employees x 1 year is ~10M attendance rows.
+The schema must exist already (alembic upgrade head); --create-schema runs create_all,
+which is only meant for a throwaway SQLite file.
+"""
+import argparse
+import csv
+import io
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple
+
+from sqlalchemy import select
+
+import db
+from models.models import (
+    AdvanceLedger, AdvanceSalary, AttendanceRecord, AttendanceStatus, Base, Employee, Holiday,
+    SalaryHistory, Settings, User, UserRole,
+)
+from utils.advances import expected_ledger
+from utils.auth import hash_password
+
+DEPARTMENTS = ["Operations", "Sales", "Finance", "Engineering", "Support", "Logistics", "HR"]
+POSITIONS = ["Associate", "Senior Associate", "Team Lead", "Manager", "Technician", "Driver", "Clerk"]
+FIRST_NAMES = ["Aarav", "Vivaan", "Aditya", "Ishaan", "Kavya", "Ananya", "Diya", "Saanvi", "Rohan", "Meera",
+               "Arjun", "Priya", "Rahul", "Sneha", "Karan", "Neha", "Vikram", "Pooja", "Siddharth", "Isha"]
+LAST_NAMES = ["Sharma", "Verma", "Iyer", "Reddy", "Nair", "Patel", "Gupta", "Singh", "Khan", "Das",
+              "Mehta", "Joshi", "Rao", "Bose", "Kulkarni", "Pillai", "Chopra", "Menon", "Shah", "Ghosh"]
+# (month, day, name) observed by every tenant, on top of Sundays and a few tenant-specific days off
+FIXED_HOLIDAYS = [(1, 26, "Republic Day"), (8, 15, "Independence Day"), (10, 2, "Gandhi Jayanti"), (12, 25, "Christmas")]
+
+ATTENDANCE_COLUMNS = ("date", "status", "manual_overtime_hours", "late_hours", "employee_id", "user_id")
+
+
+# --- Bulk writer ---
+
+def _copy_value(value):
+    if value is None:
+        return None
+    if isinstance(value, AttendanceStatus):
+        return value.value
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def bulk_insert(conn, table, columns: Sequence[str], rows: Iterable[tuple], chunk_size: int) -> int:
+    """
+    Inserts tuples of `columns` into `table` in chunks; COPY ... FROM STDIN on psycopg2,
+    one executemany per chunk otherwise. Returns the number of rows written.
+    """
+    use_copy = conn.dialect.name == "postgresql" and conn.dialect.driver == "psycopg2"
+    statement = table.insert()
+    written = 0
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return written
+        if use_copy:
+            buf = io.StringIO()
+            writer = csv.writer(buf)
+            for row in chunk:
+                # csv writes None as an empty unquoted field, which COPY reads as NULL
+                writer.writerow([_copy_value(v) for v in row])
+            buf.seek(0)
+            with conn.connection.dbapi_connection.cursor() as cursor:
+                cursor.copy_expert(f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buf)
+        else:
+            conn.execute(statement, [dict(zip(columns, row)) for row in chunk])
+        written += len(chunk)
+
+
+# --- Generators ---
+
+def tenant_holidays(rng: random.Random, year: int) -> Dict[date, str]:
+    holidays = {}
+    d = date(year, 1, 1)
+    d += timedelta(days=(6 - d.weekday()) % 7)
+    while d.year == year:
+        holidays[d] = "Sunday Holiday"
+        d += timedelta(days=7)
+    for month, day, name in FIXED_HOLIDAYS:
+        holidays[date(year, month, day)] = name
+    for i in range(3):
+        holidays.setdefault(date(year, 1, 1) + timedelta(days=rng.randrange(365)), f"Company Holiday {i + 1}")
+    return holidays
+
+
+def attendance_rows(rng: random.Random, employees: List[dict], admin_id: int, year: int,
+                    holidays: Dict[date, str]) -> Iterator[tuple]:
+    """
+    One row per working day for each employee, from joining (or Jan 1) until they became
+    inactive. Each employee gets a reliability factor so absences cluster on some people,
+    the way they do in practice.
+    """
+    days = [date(year, 1, 1) + timedelta(days=i) for i in range((date(year + 1, 1, 1) - date(year, 1, 1)).days)]
+    working_days = [d for d in days if d not in holidays]
+    for emp in employees:
+        absent_p = rng.uniform(0.01, 0.12)
+        half_p = rng.uniform(0.01, 0.06)
+        overtime_p = rng.uniform(0.0, 0.25)
+        late_p = rng.uniform(0.0, 0.15)
+        first = max(emp["date_of_joining"], days[0])
+        last = emp["inactive_from"] or days[-1]
+        for d in working_days:
+            if d < first or d > last:
+                continue
+            r = rng.random()
+            if r < absent_p:
+                yield (d, AttendanceStatus.Absent, 0.0, 0.0, emp["id"], admin_id)
+                continue
+            status = AttendanceStatus.HALF_DAY if r < absent_p + half_p else AttendanceStatus.Present
+            overtime = rng.choice((0.5, 1.0, 1.5, 2.0, 3.0)) if status == AttendanceStatus.Present and rng.random() < overtime_p else 0.0
+            late = rng.choice((0.25, 0.5, 1.0, 1.5)) if rng.random() < late_p else 0.0
+            yield (d, status, overtime, late, emp["id"], admin_id)
+
+
+def advance_rows(rng: random.Random, employees: List[dict], year: int) -> Tuple[List[tuple], List[tuple]]:
+    """Advances for roughly one employee in five, plus the ledger rows apply_advance would have produced."""
+    advances = []
+    for emp in employees:
+        if rng.random() >= 0.2:
+            continue
+        for _ in range(rng.randint(1, 3)):
+            amount = float(rng.randrange(1000, 20001, 500))
+            adv_date = max(emp["date_of_joining"], date(year, 1, 1)) + timedelta(days=rng.randrange(300))
+            if adv_date.year != year:
+                continue
+            installments = rng.choice((1, 1, 1, 2, 3, 6))
+            advances.append((emp["id"], amount, adv_date, rng.choice((None, "Medical", "Festival", "Travel", "Family")), installments))
+    ledger = expected_ledger((employee_id, amount, adv_date, installments) for employee_id, amount, adv_date, _, installments in advances)
+    ledger_rows = [(employee_id, month, a, d, b) for (employee_id, month), (a, d, b) in sorted(ledger.items())]
+    return advances, ledger_rows
+
+
+# --- Tenants ---
+
+def seed_tenant(conn, rng: random.Random, args, index: int, password_hash: str) -> Dict[str, int]:
+    counts: Dict[str, int] = defaultdict(int)
+    year = args.year
+    now = datetime(year, 1, 1)
+
+    admin_email = f"{args.prefix}-admin{index}@example.com"
+    conn.execute(User.__table__.insert(), {
+        "name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}", "email": admin_email,
+        "password_hash": password_hash, "role": UserRole.admin, "created_at": now,
+    })
+    admin_id = conn.execute(select(User.id).where(User.email == admin_email)).scalar_one()
+    conn.execute(Settings.__table__.insert(), {
+        "user_id": admin_id, "company_name": f"{args.prefix.title()} Company {index}", "currency": "INR",
+        "standard_work_hours_per_day": 8.0, "overtime_multiplier": 1.5, "mark_sundays_as_holiday": True,
+    })
+    counts["users"] += 1
+
+    staff_count = min(args.staff, args.employees)
+    if staff_count:
+        conn.execute(User.__table__.insert(), [{
+            "name": f"Staff {index}-{s}", "email": f"{args.prefix}-staff{index}-{s}@example.com",
+            "password_hash": password_hash, "role": UserRole.staff, "created_by_admin_id": admin_id, "created_at": now,
+        } for s in range(staff_count)])
+    staff_ids = conn.execute(
+        select(User.id).where(User.created_by_admin_id == admin_id).order_by(User.id)
+    ).scalars().all()
+    counts["users"] += len(staff_ids)
+
+    employee_rows = []
+    for i in range(args.employees):
+        joined = date(year, 1, 1) - timedelta(days=rng.randrange(-300, 1500))
+        inactive_from = None
+        if rng.random() < 0.05:
+            inactive_from = max(joined, date(year, 1, 1)) + timedelta(days=rng.randrange(30, 200))
+        employee_rows.append({
+            "user_id": staff_ids[i] if i < len(staff_ids) else None,
+            "name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {index}-{i}",
+            "monthly_salary": float(rng.randrange(15000, 120001, 500)),
+            "date_of_joining": joined,
+            "bank_account": f"{rng.randrange(10 ** 11, 10 ** 12)}",
+            "position": rng.choice(POSITIONS),
+            "department": rng.choice(DEPARTMENTS),
+            "status": "inactive" if inactive_from else "active",
+            "salary_effective_from": joined,
+            "inactive_from": inactive_from,
+            "last_updated_by": admin_id,
+            "created_at": datetime.combine(joined, datetime.min.time()),
+            "last_updated_at": now,
+        })
+    counts["employees"] += bulk_insert(conn, Employee.__table__, list(employee_rows[0]), (tuple(r.values()) for r in employee_rows), args.chunk_size)
+    ids = conn.execute(select(Employee.id).where(Employee.last_updated_by == admin_id).order_by(Employee.id)).scalars().all()
+    employees = [dict(row, id=emp_id) for row, emp_id in zip(employee_rows, ids)]
+
+    # Everyone starts on their joining salary; about a third get a raise during the year
+    history = []
+    for emp in employees:
+        start_salary = emp["monthly_salary"]
+        raise_on = date(year, 1, 1) + timedelta(days=rng.randrange(60, 330)) if rng.random() < 0.33 else None
+        if raise_on and raise_on > emp["date_of_joining"]:
+            start_salary = round(start_salary / rng.uniform(1.05, 1.2), -2)
+            history.append((emp["id"], raise_on, emp["monthly_salary"], now))
+        history.append((emp["id"], emp["date_of_joining"], start_salary, now))
+    counts["salary_history"] += bulk_insert(conn, SalaryHistory.__table__, ("employee_id", "effective_from", "monthly_salary", "created_at"), history, args.chunk_size)
+
+    holidays = tenant_holidays(rng, year)
+    counts["holidays"] += bulk_insert(conn, Holiday.__table__, ("date", "name", "user_id"),
+                                      ((d, name, admin_id) for d, name in sorted(holidays.items())), args.chunk_size)
+
+    advances, ledger = advance_rows(rng, employees, year)
+    counts["advances"] += bulk_insert(conn, AdvanceSalary.__table__, ("employee_id", "amount", "date", "reason", "installments"), advances, args.chunk_size)
+    counts["advance_ledger"] += bulk_insert(conn, AdvanceLedger.__table__, ("employee_id", "month", "advanced", "deduction", "balance"), ledger, args.chunk_size)
+
+    counts["attendance_records"] += bulk_insert(conn, AttendanceRecord.__table__, ATTENDANCE_COLUMNS,
+                                                attendance_rows(rng, employees, admin_id, year, holidays), args.chunk_size)
+    return counts
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--admins", type=int, default=3, help="tenants to create (default 3)")
+    parser.add_argument("--employees", type=int, default=100, help="employees per tenant (default 100)")
+    parser.add_argument("--staff", type=int, default=2, help="staff users per tenant, each linked to an employee (default 2)")
+    parser.add_argument("--year", type=int, default=date.today().year - 1, help="calendar year of attendance (default last year)")
+    parser.add_argument("--seed", type=int, default=42, help="random seed; same seed, same data")
+    parser.add_argument("--prefix", default="seed", help="email/company prefix, so several runs can share a database")
+    parser.add_argument("--password", default="password123", help="password for every generated user")
+    parser.add_argument("--chunk-size", type=int, default=10000, help="rows per COPY/executemany batch")
+    parser.add_argument("--database-url", help="overrides DATABASE_URL")
+    parser.add_argument("--create-schema", action="store_true", help="create tables with create_all (SQLite scratch databases)")
+    args = parser.parse_args(argv)
+
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+        db.dispose_engines()
+    engine = db.get_engine()
+    if args.create_schema:
+        Base.metadata.create_all(engine)
+
+    password_hash = hash_password(args.password)
+    totals: Dict[str, int] = defaultdict(int)
+    started = time.perf_counter()
+    for index in range(args.admins):
+        # Per-tenant generator, so tenant i is identical whatever --admins is
+        rng = random.Random(f"{args.seed}:{index}")
+        tenant_started = time.perf_counter()
+        with engine.begin() as conn:
+            counts = seed_tenant(conn, rng, args, index, password_hash)
+        for table, n in counts.items():
+            totals[table] += n
+        print(f"tenant {index + 1}/{args.admins}: {counts['employees']} employees, "
+              f"{counts['attendance_records']} attendance rows in {time.perf_counter() - tenant_started:.1f}s", flush=True)
+
+    elapsed = time.perf_counter() - started
+    for table, n in sorted(totals.items()):
+        print(f"{table:20} {n:>12,}")
+    print(f"done in {elapsed:.1f}s ({totals['attendance_records'] / max(elapsed, 1e-9):,.0f} attendance rows/s)")
+    print(f"sign in as {args.prefix}-admin0@example.com / {args.password}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
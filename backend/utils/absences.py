@@ -0,0 +1,70 @@
+from datetime import date, timedelta
+from typing import Optional
+
+from sqlalchemy import Date, Integer, and_, exists, insert, literal, or_, select, union_all
+
+from models.models import AttendanceRecord, AttendanceStatus, Employee, Holiday, Settings, ShiftWeekday
+from utils.closing import closed_on
+
+# Longest range one fill statement covers. The dates are a UNION ALL of literals, which keeps
+# the statement portable; SQLite caps a compound SELECT at 500 terms. Each date carries its Python
+# weekday (0 = Monday, as ShiftWeekday.weekday), so no dialect's weekday function is involved.
+MAX_FILL_DAYS = 366
+
+
+def _days(start_date: date, end_date: date):
+    days = [
+        select(literal(day, Date).label("d"), literal(day.weekday(), Integer).label("weekday"))
+        for day in (start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1))
+    ]
+    return (union_all(*days) if len(days) > 1 else days[0]).subquery("days")
+
+
+def absent_fill_statement(dialect: str, start_date: date, end_date: date, owner_id: Optional[int] = None):
+    """
+    One INSERT ... SELECT adding an Absent record for every (employee, date) in the range with no
+    attendance record, no holiday and no day off in the employee's shift (as ScheduleBook.for_day
+    reads it), between the employee's date_of_joining and inactive_from. Days in a closed payroll
+    month are skipped.
+    owner_id limits it to one tenant; None covers every tenant with auto_mark_absent enabled.
+    Records are attributed to the tenant's admin. Existing records are never touched.
+    """
+    days = _days(start_date, end_date)
+    employee_filter = [
+        # Active employees, and inactive ones up to the day before they left
+        or_(Employee.status == "active", Employee.inactive_from.is_not(None)),
+        or_(Employee.date_of_joining.is_(None), days.c.d >= Employee.date_of_joining),
+        or_(Employee.inactive_from.is_(None), days.c.d < Employee.inactive_from),
+        ~exists().where(AttendanceRecord.employee_id == Employee.id, AttendanceRecord.date == days.c.d),
+        ~exists().where(Holiday.user_id == Employee.last_updated_by, Holiday.date == days.c.d),
+        ~exists().where(ShiftWeekday.shift_id == Employee.shift_id, ShiftWeekday.weekday == days.c.weekday,
+                        ShiftWeekday.day_off.is_(True)),
+        ~closed_on(Employee.last_updated_by, days.c.d),
+    ]
+    if owner_id is not None:
+        employee_filter.append(Employee.last_updated_by == owner_id)
+    else:
+        employee_filter.append(exists().where(Settings.user_id == Employee.last_updated_by, Settings.auto_mark_absent.is_(True)))
+
+    rows = (
+        select(
+            days.c.d,
+            literal(AttendanceStatus.Absent, AttendanceRecord.status.type),
+            literal(0.0),
+            literal(0.0),
+            Employee.id,
+            Employee.last_updated_by,
+        )
+        .select_from(Employee)
+        .join(days, and_(*employee_filter))
+    )
+    columns = ["date", "status", "manual_overtime_hours", "late_hours", "employee_id", "user_id"]
+
+    # A record marked concurrently for the same (date, employee) wins over the fill
+    if dialect == "mysql":
+        return insert(AttendanceRecord).prefix_with("IGNORE").from_select(columns, rows)
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    return dialect_insert(AttendanceRecord).from_select(columns, rows).on_conflict_do_nothing()
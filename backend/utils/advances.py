@@ -0,0 +1,112 @@
+from collections import defaultdict
+from datetime import date
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.orm import Session
+
+from models.models import AdvanceLedger, AdvanceSalary
+
+
+def month_start(d: date) -> date:
+    return date(d.year, d.month, 1)
+
+
+def add_months(d: date, months: int) -> date:
+    index = d.year * 12 + (d.month - 1) + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def installment_schedule(amount: float, start: date, installments: int) -> List[Tuple[date, float]]:
+    """Splits an advance into monthly deductions; the last installment absorbs the rounding remainder."""
+    installments = max(1, installments or 1)
+    share = round(amount / installments, 2)
+    schedule = [(add_months(month_start(start), i), share) for i in range(installments - 1)]
+    schedule.append((add_months(month_start(start), installments - 1), round(amount - share * (installments - 1), 2)))
+    return schedule
+
+
+def apply_advance(db: Session, adv: AdvanceSalary, sign: int = 1):
+    """
+    Adds (sign=1) or removes (sign=-1) an advance from the employee's ledger. Only the months
+    inside its repayment schedule change: every other month's balance is unaffected by it.
+    """
+    schedule = installment_schedule(adv.amount, adv.date, adv.installments)
+    months = [m for m, _ in schedule]
+    rows = {
+        row.month: row
+        for row in db.query(AdvanceLedger).filter(
+            AdvanceLedger.employee_id == adv.employee_id,
+            AdvanceLedger.month >= months[0],
+            AdvanceLedger.month <= months[-1],
+        )
+    }
+    repaid = 0.0
+    new_rows = []
+    for i, (month, deduction) in enumerate(schedule):
+        repaid += deduction
+        advanced = sign * adv.amount if i == 0 else 0.0
+        row = rows.get(month)
+        if row is None:
+            # Months without a row yet are inserted together below
+            new_rows.append({"employee_id": adv.employee_id, "month": month, "advanced": round(advanced, 2),
+                             "deduction": round(sign * deduction, 2), "balance": round(sign * (adv.amount - repaid), 2)})
+            continue
+        row.advanced = round(row.advanced + advanced, 2)
+        row.deduction = round(row.deduction + sign * deduction, 2)
+        row.balance = round(row.balance + sign * (adv.amount - repaid), 2)
+        if sign < 0 and not (row.advanced or row.deduction or row.balance):
+            db.delete(row)
+    if new_rows:
+        # One executemany instead of an INSERT ... RETURNING per installment month
+        db.execute(insert(AdvanceLedger), new_rows)
+
+
+def expected_ledger(advances: Iterable[Tuple[int, float, date, int]]) -> Dict[Tuple[int, date], List[float]]:
+    """
+    The [advanced, deduction, balance] per (employee_id, month) that apply_advance produces for
+    (employee_id, amount, date, installments) advances, computed in one pass.
+    """
+    ledger: Dict[Tuple[int, date], List[float]] = defaultdict(lambda: [0.0, 0.0, 0.0])
+    for employee_id, amount, adv_date, installments in advances:
+        repaid = 0.0
+        for i, (month, deduction) in enumerate(installment_schedule(amount, adv_date, installments)):
+            row = ledger[(employee_id, month)]
+            repaid += deduction
+            if i == 0:
+                row[0] += amount
+            row[1] += deduction
+            row[2] += amount - repaid
+    return {key: [round(v, 2) for v in values] for key, values in ledger.items()}
+
+
+def rebuild_ledger(db: Session) -> dict:
+    """
+    Recomputes the advance ledger from advance_salaries and rewrites only the rows that drifted
+    (e.g. advances edited outside the API). Commits with the caller.
+    """
+    expected = expected_ledger(db.execute(select(
+        AdvanceSalary.employee_id, AdvanceSalary.amount, AdvanceSalary.date, AdvanceSalary.installments
+    )))
+    stale_ids, updates = [], []
+    for row_id, employee_id, month, advanced, deduction, balance in db.execute(select(
+        AdvanceLedger.id, AdvanceLedger.employee_id, AdvanceLedger.month,
+        AdvanceLedger.advanced, AdvanceLedger.deduction, AdvanceLedger.balance,
+    )):
+        want = expected.pop((employee_id, month), None)
+        if want is None:
+            stale_ids.append(row_id)
+        elif any(abs(have - w) > 0.005 for have, w in zip((advanced, deduction, balance), want)):
+            updates.append({"id": row_id, "advanced": want[0], "deduction": want[1], "balance": want[2]})
+    if stale_ids:
+        db.execute(delete(AdvanceLedger).where(AdvanceLedger.id.in_(stale_ids)))
+    if updates:
+        # ORM bulk UPDATE by primary key: one executemany
+        db.execute(update(AdvanceLedger), updates)
+    missing = [
+        {"employee_id": employee_id, "month": month, "advanced": a, "deduction": d, "balance": b}
+        for (employee_id, month), (a, d, b) in expected.items()
+    ]
+    if missing:
+        db.execute(insert(AdvanceLedger), missing)
+    return {"deleted": len(stale_ids), "updated": len(updates), "inserted": len(missing)}
@@ -0,0 +1,118 @@
+import gzip
+import hashlib
+import io
+import os
+from datetime import date
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import orjson
+from sqlalchemy import select
+
+from models.models import AttendanceArchive
+
+try:
+    import zstandard
+except ImportError:  # zstandard is optional; without it archives are written gzip compressed
+    zstandard = None
+
+# Cold storage of old attendance. tools/archive.py moves closed tenant-months past the retention
+# window out of attendance_records into one compressed NDJSON file each, recorded in
+# attendance_archives; list_attendance and the weekly summary read those months back from here.
+#   ARCHIVE_DIR               directory the files live under (default "archive")
+#   ARCHIVE_RETENTION_MONTHS  whole months kept in attendance_records (default 24)
+#   ARCHIVE_ZSTD_LEVEL        zstd level when zstandard is installed (default 10)
+
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "archive")
+ARCHIVE_RETENTION_MONTHS = int(os.getenv("ARCHIVE_RETENTION_MONTHS", "24"))
+ARCHIVE_ZSTD_LEVEL = int(os.getenv("ARCHIVE_ZSTD_LEVEL", "10"))
+
+# One JSON object per record; ids are kept so a restore puts back the same rows
+ARCHIVE_COLUMNS = ("id", "date", "status", "manual_overtime_hours", "late_hours", "check_in", "check_out", "employee_id", "user_id")
+
+
+def archive_file(owner_id: int, month: date) -> str:
+    """Path of a tenant-month's archive, relative to ARCHIVE_DIR."""
+    return f"{owner_id}/{month:%Y-%m}.ndjson.{'zst' if zstandard is not None else 'gz'}"
+
+
+def _full_path(path: str) -> str:
+    return os.path.join(ARCHIVE_DIR, path)
+
+
+def write_archive(path: str, rows: Iterable[Sequence]) -> Tuple[int, str]:
+    """
+    Writes rows (in ARCHIVE_COLUMNS order) to the archive file and returns the row count and
+    the SHA-256 of the file. The file is written next to its final name, synced, and renamed
+    into place, so a crash never leaves a truncated archive behind.
+    """
+    full = _full_path(path)
+    os.makedirs(os.path.dirname(full), exist_ok=True)
+    tmp = full + ".tmp"
+    count = 0
+    with open(tmp, "wb") as raw:
+        if path.endswith(".zst"):
+            out = zstandard.ZstdCompressor(level=ARCHIVE_ZSTD_LEVEL).stream_writer(raw, closefd=False)
+        else:
+            out = gzip.GzipFile(fileobj=raw, mode="wb", mtime=0)
+        with out:
+            for row in rows:
+                out.write(orjson.dumps(dict(zip(ARCHIVE_COLUMNS, row)), option=orjson.OPT_APPEND_NEWLINE))
+                count += 1
+        raw.flush()
+        os.fsync(raw.fileno())
+    os.replace(tmp, full)
+    return count, file_sha256(path)
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(_full_path(path), "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def remove_archive(path: str):
+    os.remove(_full_path(path))
+
+
+def read_archive(path: str) -> Iterator[dict]:
+    """Records of an archive file as dicts of JSON values (dates and times as ISO strings)."""
+    with open(_full_path(path), "rb") as raw:
+        if path.endswith(".zst"):
+            if zstandard is None:
+                raise RuntimeError(f"{path} is zstd compressed and the zstandard package is not installed.")
+            stream = io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(raw))
+        else:
+            stream = gzip.GzipFile(fileobj=raw, mode="rb")
+        with stream:
+            for line in stream:
+                yield orjson.loads(line)
+
+
+def archived_months_query(owner_id: int, first_day: date, last_day: Optional[date] = None):
+    """
+    (month, month_end, path) of the owner's archived months overlapping [first_day, last_day]
+    (open ended without last_day). There is deliberately no unbounded form: reading every archive
+    of a tenant is what the retention window exists to avoid.
+    """
+    query = select(AttendanceArchive.month, AttendanceArchive.month_end, AttendanceArchive.path).where(
+        AttendanceArchive.user_id == owner_id, AttendanceArchive.month_end >= first_day)
+    if last_day is not None:
+        query = query.where(AttendanceArchive.month <= last_day)
+    return query.order_by(AttendanceArchive.month)
+
+
+def archived_records(paths: List[str], first_day: Optional[date] = None, last_day: Optional[date] = None,
+                     employee_id: Optional[int] = None) -> List[dict]:
+    """
+    Records of the given archive files in [first_day, last_day], optionally of one employee.
+    Blocking file IO; async callers run it in a thread.
+    """
+    # ISO dates compare correctly as strings
+    low = first_day.isoformat() if first_day else ""
+    high = last_day.isoformat() if last_day else "9999-12-31"
+    return [
+        r for path in paths for r in read_archive(path)
+        if low <= r["date"] <= high and (employee_id is None or r["employee_id"] == employee_id)
+    ]
@@ -0,0 +1,44 @@
+from datetime import date
+from typing import List, Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import exists, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from models.models import PayrollMonth
+
+# Closed payroll months. Interactive writes into a closed tenant-month are rejected with 409;
+# bulk and background writers (absent fill, punch aggregation, shift recompute, Sunday
+# holidays) skip the closed days instead.
+
+
+def closed_months_query(owner_id: int, first_day: date, last_day: Optional[date] = None):
+    """First days of the owner's closed months overlapping [first_day, last_day]."""
+    return (
+        select(PayrollMonth.month)
+        .where(PayrollMonth.user_id == owner_id, PayrollMonth.month <= (last_day or first_day), PayrollMonth.month_end >= first_day)
+        .order_by(PayrollMonth.month)
+    )
+
+
+def closed_on(owner_id, day):
+    """SQL condition: the day is in a closed month of the owner (both may be columns)."""
+    return exists().where(PayrollMonth.user_id == owner_id, PayrollMonth.month <= day, PayrollMonth.month_end >= day)
+
+
+def reject_closed(months: List[date]):
+    if months:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Payroll for {', '.join(m.strftime('%Y-%m') for m in months)} is closed.",
+        )
+
+
+async def ensure_open(db: AsyncSession, owner_id: int, first_day: date, last_day: Optional[date] = None):
+    """Raises 409 when [first_day, last_day] touches a closed month of the owner."""
+    reject_closed((await db.execute(closed_months_query(owner_id, first_day, last_day))).scalars().all())
+
+
+def ensure_open_sync(db: Session, owner_id: int, first_day: date, last_day: Optional[date] = None):
+    reject_closed(db.execute(closed_months_query(owner_id, first_day, last_day)).scalars().all())
@@ -0,0 +1,122 @@
+import gzip
+import os
+from typing import List, Optional
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional; without it responses are gzip only
+    brotli = None
+
+# Response compression, negotiated from Accept-Encoding (brotli preferred when installed):
+#   COMPRESSION_MIN_SIZE       1024 bytes; smaller bodies are sent as is
+#   COMPRESSION_GZIP_LEVEL     6
+#   COMPRESSION_BROTLI_QUALITY 4 (higher is much slower to encode for little gain on JSON)
+#   COMPRESSION_TYPES          comma separated content-type prefixes that are worth compressing
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+COMPRESSION_TYPES = [
+    t.strip() for t in os.getenv(
+        "COMPRESSION_TYPES", "application/json,text/csv,text/plain,text/html,text/css,application/javascript"
+    ).split(",") if t.strip()
+]
+
+
+def _header(headers: List[tuple], name: bytes) -> Optional[bytes]:
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Picks br or gzip from an Accept-Encoding header, honouring q=0."""
+    accepted = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding.strip().lower()] = q
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", accepted.get("*", 0)) > 0:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=COMPRESSION_GZIP_LEVEL)
+
+
+class CompressionMiddleware:
+    """
+    Pure ASGI middleware compressing complete (non-streaming) responses whose content type is
+    in the allow-list and whose body is at least COMPRESSION_MIN_SIZE. Streaming responses,
+    already-encoded bodies and small payloads pass through untouched.
+    """
+
+    def __init__(self, app, minimum_size: int = None, content_types: List[str] = None):
+        self.app = app
+        self.minimum_size = COMPRESSION_MIN_SIZE if minimum_size is None else minimum_size
+        self.content_types = tuple(content_types or COMPRESSION_TYPES)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept = _header(scope["headers"], b"accept-encoding")
+        encoding = choose_encoding(accept.decode("latin-1")) if accept else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+            if message["type"] == "http.response.start":
+                headers = message.get("headers", [])
+                content_type = (_header(headers, b"content-type") or b"").decode("latin-1")
+                if (_header(headers, b"content-encoding") is not None
+                        or message["status"] < 200 or message["status"] in (204, 304)
+                        or not content_type.startswith(self.content_types)):
+                    passthrough = True
+                    await send(message)
+                else:
+                    # Hold the start message until the body shows whether compressing is worth it
+                    start_message = message
+                return
+
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            if start_message is not None and (message.get("more_body", False) or len(body) < self.minimum_size):
+                # Streaming or small: send what we held back unchanged and stop interfering
+                await send(start_message)
+                start_message = None
+                passthrough = True
+                await send(message)
+                return
+
+            compressed = compress(body, encoding)
+            headers = [(k, v) for k, v in start_message.get("headers", []) if k.lower() not in (b"content-length", b"vary")]
+            vary = _header(start_message.get("headers", []), b"vary")
+            headers += [
+                (b"content-encoding", encoding.encode()),
+                (b"content-length", str(len(compressed)).encode()),
+                (b"vary", vary + b", Accept-Encoding" if vary else b"Accept-Encoding"),
+            ]
+            await send({**start_message, "headers": headers})
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_wrapper)
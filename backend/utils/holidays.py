@@ -0,0 +1,33 @@
+from datetime import date, timedelta
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from models.models import Holiday
+from utils.closing import closed_months_query
+from utils.versions import HOLIDAYS, bump_version
+
+SUNDAY_HOLIDAY_NAME = "Sunday Holiday"
+
+
+def add_sunday_holidays(db: Session, owner_id: int, start_date: date, end_date: date) -> int:
+    """
+    Adds the Sundays in [start_date, end_date] the owner has no holiday on yet, outside closed
+    payroll months. Returns how many; commits with the caller.
+    """
+    # Existing holidays in the range in one query, then add only the missing Sundays
+    existing = {d for (d,) in db.query(Holiday.date).filter(
+        Holiday.user_id == owner_id, Holiday.date >= start_date, Holiday.date <= end_date
+    )}
+    closed = set(db.execute(closed_months_query(owner_id, start_date, end_date)).scalars())
+    current_date = start_date + timedelta(days=(6 - start_date.weekday()) % 7) # First Sunday
+    new_holidays = []
+    while current_date <= end_date:
+        if current_date not in existing and current_date.replace(day=1) not in closed:
+            new_holidays.append({"date": current_date, "name": SUNDAY_HOLIDAY_NAME, "user_id": owner_id})
+        current_date += timedelta(days=7)
+    if new_holidays:
+        # Core executemany: one round trip, where an ORM flush may insert row by row
+        db.execute(insert(Holiday), new_holidays)
+        bump_version(db, owner_id, HOLIDAYS)
+    return len(new_holidays)
@@ -0,0 +1,98 @@
+import json
+import os
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import delete, func, or_, select
+from sqlalchemy.orm import Session
+
+from models.models import Holiday, PasswordReset, ScheduledJob, Settings
+from utils.absences import absent_fill_statement
+from utils.advances import rebuild_ledger
+from utils.holidays import SUNDAY_HOLIDAY_NAME, add_sunday_holidays
+from utils.partitions import ensure_future_partitions
+from utils.punches import aggregate_punches
+from utils.scheduler import scheduler
+
+# Periodic maintenance jobs. Importing this module registers them with the scheduler.
+#   MARK_ABSENT_LOOKBACK_DAYS  furthest back mark_absent catches up after missed runs (default 7)
+
+DAY = 24 * 3600
+MARK_ABSENT_LOOKBACK_DAYS = int(os.getenv("MARK_ABSENT_LOOKBACK_DAYS", "7"))
+
+
+@scheduler.register("extend_sunday_holidays", interval_seconds=DAY)
+def extend_sunday_holidays(db: Session) -> dict:
+    """
+    Keeps Sunday holidays generated through the end of next year for tenants with
+    mark_sundays_as_holiday, so the horizon moves forward without anyone re-saving the settings.
+    Only Sundays after the tenant's latest generated one are added; earlier ones deleted by hand stay deleted.
+    """
+    today = date.today()
+    horizon = date(today.year + 1, 12, 31)
+    owners = select(Settings.user_id).where(Settings.mark_sundays_as_holiday.is_(True))
+    latest = dict(db.execute(
+        select(Holiday.user_id, func.max(Holiday.date))
+        .where(Holiday.user_id.in_(owners), Holiday.name == SUNDAY_HOLIDAY_NAME)
+        .group_by(Holiday.user_id)
+    ).all())
+    added = 0
+    tenants = db.execute(owners).scalars().all()
+    for owner_id in tenants:
+        start = max(today, latest[owner_id] + timedelta(days=1)) if owner_id in latest else today
+        if start <= horizon:
+            added += add_sunday_holidays(db, owner_id, start, horizon)
+    return {"tenants": len(tenants), "added": added}
+
+
+@scheduler.register("purge_password_resets", interval_seconds=3600)
+def purge_password_resets(db: Session) -> dict:
+    """Deletes reset tokens that were used or have expired; they can never be redeemed again."""
+    deleted = db.execute(
+        delete(PasswordReset)
+        .where(or_(PasswordReset.used.is_(True), PasswordReset.expires_at < datetime.now(timezone.utc)))
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    return {"deleted": deleted}
+
+
+@scheduler.register("refresh_advance_ledger", interval_seconds=DAY)
+def refresh_advance_ledger(db: Session) -> dict:
+    """Reconciles the precomputed advance ledger with advance_salaries."""
+    return rebuild_ledger(db)
+
+
+@scheduler.register("mark_absent", interval_seconds=DAY)
+def mark_absent(db: Session) -> dict:
+    """
+    End of day gap filling for tenants with auto_mark_absent: everyone without a record (and
+    not on holiday or a day off) is marked Absent, for all such tenants in one statement.
+    Fills from the day after the range of the last successful run through yesterday, so days
+    missed while the app was down are caught up, but at most MARK_ABSENT_LOOKBACK_DAYS back.
+    """
+    yesterday = date.today() - timedelta(days=1)
+    start = yesterday - timedelta(days=MARK_ABSENT_LOOKBACK_DAYS - 1)
+    # The scheduler keeps this job's previous summary on its row until the current run finishes
+    last = db.get(ScheduledJob, "mark_absent")
+    if last is not None and last.last_status == "ok" and last.last_result:
+        filled_through = json.loads(last.last_result).get("end")
+        if filled_through:
+            start = max(start, date.fromisoformat(filled_through) + timedelta(days=1))
+    if start > yesterday:
+        return {"start": None, "end": yesterday, "inserted": 0}
+    inserted = db.execute(absent_fill_statement(db.get_bind().dialect.name, start, yesterday)).rowcount
+    return {"start": start, "end": yesterday, "inserted": inserted}
+
+
+@scheduler.register("aggregate_punches", interval_seconds=60)
+def derive_punched_attendance(db: Session) -> dict:
+    """Turns the employee-days that received punches into attendance records."""
+    return aggregate_punches(db)
+
+
+@scheduler.register("create_attendance_partitions", interval_seconds=DAY)
+def create_attendance_partitions(db: Session) -> dict:
+    """
+    Keeps the monthly partitions of attendance_records (Postgres) created ATTENDANCE_PARTITIONS_AHEAD
+    months ahead, so new months never pile up in the default partition. Nothing to do elsewhere.
+    """
+    return ensure_future_partitions(db)
@@ -0,0 +1,245 @@
+import logging
+import os
+import re
+import threading
+import time
+import warnings
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# In-process request metrics, rendered in the Prometheus text format by GET /metrics.
+# Everything is aggregated in memory per worker process; nothing is pushed anywhere.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SQL_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+JOB_BUCKETS = (0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0)
+
+logger = logging.getLogger(__name__)
+
+# Development aid: warn when one request runs the same statement shape more than N times,
+# which is almost always a query inside a Python loop (N+1). Off unless configured; defaults
+# to 10 when APP_ENV=development.
+QUERY_REPEAT_WARN_THRESHOLD = int(os.getenv(
+    "QUERY_REPEAT_WARN_THRESHOLD", "10" if os.getenv("APP_ENV") == "development" else "0"
+))
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+class RepeatedQueryWarning(RuntimeWarning):
+    pass
+
+
+class RequestStats:
+    """SQL work done while serving one request. Mutated in place by the cursor event hooks."""
+
+    __slots__ = ("sql_count", "sql_seconds", "statement_counts", "statement_log")
+
+    def __init__(self, track_statements: bool = False):
+        self.sql_count = 0
+        self.sql_seconds = 0.0
+        # Statement text -> executions; only kept when the repeat detector is on
+        self.statement_counts: Optional[Dict[str, int]] = {} if track_statements else None
+        # (statement, seconds) in execution order; only kept while the request is being profiled
+        self.statement_log: Optional[List[Tuple[str, float]]] = None
+
+    def repeated_statements(self, threshold: int) -> List[Tuple[str, int]]:
+        if not self.statement_counts:
+            return []
+        return [(sql, n) for sql, n in self.statement_counts.items() if n > threshold]
+
+
+# Set by MetricsMiddleware for the lifetime of a request. Sync endpoints run in a threadpool
+# with a copy of the context, so they see (and mutate) the same RequestStats object.
+current_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("current_request_stats", default=None)
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.sum += value
+        self.count += 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latency: Dict[Tuple[str, str], Histogram] = {}
+        self.sql_count: Dict[Tuple[str, str], Histogram] = {}
+        self.sql_seconds: Dict[Tuple[str, str], float] = {}
+        self.requests: Dict[Tuple[str, str, str], int] = {}
+        self.job_seconds: Dict[Tuple[str, str], Histogram] = {}
+
+    def observe_request(self, method: str, route: str, status: int, seconds: float, stats: RequestStats):
+        key = (method, route)
+        with self._lock:
+            latency = self.latency.get(key)
+            if latency is None:
+                latency = self.latency[key] = Histogram(LATENCY_BUCKETS)
+                self.sql_count[key] = Histogram(SQL_COUNT_BUCKETS)
+                self.sql_seconds[key] = 0.0
+            latency.observe(seconds)
+            self.sql_count[key].observe(stats.sql_count)
+            self.sql_seconds[key] += stats.sql_seconds
+            status_key = (method, route, str(status))
+            self.requests[status_key] = self.requests.get(status_key, 0) + 1
+
+    def observe_job(self, name: str, status: str, seconds: float):
+        """Scheduled job runs (utils/scheduler.py), by job and outcome."""
+        key = (name, status)
+        with self._lock:
+            hist = self.job_seconds.get(key)
+            if hist is None:
+                hist = self.job_seconds[key] = Histogram(JOB_BUCKETS)
+            hist.observe(seconds)
+
+    def reset(self):
+        with self._lock:
+            self.job_seconds.clear()
+            self.latency.clear()
+            self.sql_count.clear()
+            self.sql_seconds.clear()
+            self.requests.clear()
+
+    def render(self) -> List[str]:
+        lines: List[str] = []
+        with self._lock:
+            lines.append("# HELP http_requests_total Requests served, by route and status code.")
+            lines.append("# TYPE http_requests_total counter")
+            for (method, route, status), value in sorted(self.requests.items()):
+                lines.append(f'http_requests_total{{{_labels(method=method, route=route, status=status)}}} {value}')
+            _render_histograms(lines, "http_request_duration_seconds", "Request latency in seconds.", self.latency)
+            _render_histograms(lines, "http_request_sql_statements", "SQL statements executed per request.", self.sql_count)
+            lines.append("# HELP http_request_sql_seconds_total Time spent executing SQL, summed over requests.")
+            lines.append("# TYPE http_request_sql_seconds_total counter")
+            for (method, route), value in sorted(self.sql_seconds.items()):
+                lines.append(f'http_request_sql_seconds_total{{{_labels(method=method, route=route)}}} {value:.6f}')
+            _render_histograms(lines, "scheduled_job_duration_seconds", "Scheduled job run time in seconds.",
+                               self.job_seconds, label_names=("job", "status"))
+        return lines
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(**labels) -> str:
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items())
+
+
+def _render_histograms(lines: List[str], name: str, help_text: str, histograms: Dict[Tuple[str, str], Histogram],
+                       label_names: Tuple[str, str] = ("method", "route")):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} histogram")
+    for key, hist in sorted(histograms.items()):
+        labels = _labels(**dict(zip(label_names, key)))
+        cumulative = 0
+        for bound, count in zip(hist.buckets, hist.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {hist.count}')
+        lines.append(f'{name}_sum{{{labels}}} {hist.sum:.6f}')
+        lines.append(f'{name}_count{{{labels}}} {hist.count}')
+
+
+registry = MetricsRegistry()
+
+
+# --- SQL hooks ---
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_request_stats.get() is not None:
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = current_request_stats.get()
+    if stats is None:
+        return
+    starts = conn.info.get("query_start_time")
+    elapsed = time.perf_counter() - starts.pop() if starts else 0.0
+    stats.sql_seconds += elapsed
+    stats.sql_count += 1
+    if stats.statement_counts is not None or stats.statement_log is not None:
+        # Statements are already parameterized, so the text is the statement's shape
+        shape = _WHITESPACE.sub(" ", statement).strip()
+        if stats.statement_counts is not None:
+            stats.statement_counts[shape] = stats.statement_counts.get(shape, 0) + 1
+        if stats.statement_log is not None:
+            stats.statement_log.append((shape, elapsed))
+
+
+_hooks_installed = False
+
+
+def install_sql_hooks():
+    """Counts and times statements on every engine (sync and async), for the request in progress."""
+    global _hooks_installed
+    if _hooks_installed:
+        return
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    _hooks_installed = True
+
+
+# --- ASGI middleware ---
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware (no BaseHTTPMiddleware task overhead) recording per-route latency,
+    status codes and the SQL statement count/time of each request.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        install_sql_hooks()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(track_statements=QUERY_REPEAT_WARN_THRESHOLD > 0)
+        token = current_request_stats.set(stats)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            current_request_stats.reset(token)
+            # FastAPI stores the matched route in the scope; use its template to keep label cardinality bounded
+            route = scope.get("route")
+            route_path = getattr(route, "path", "unmatched")
+            registry.observe_request(scope["method"], route_path, status_code, elapsed, stats)
+            if QUERY_REPEAT_WARN_THRESHOLD > 0:
+                warn_repeated_statements(scope["method"], route_path, stats)
+
+
+def warn_repeated_statements(method: str, route: str, stats: RequestStats, threshold: int = None):
+    threshold = threshold or QUERY_REPEAT_WARN_THRESHOLD
+    for sql, count in stats.repeated_statements(threshold):
+        message = f"{method} {route} ran the same statement {count} times (threshold {threshold}): {sql[:200]}"
+        logger.warning(message)
+        warnings.warn(message, RepeatedQueryWarning, stacklevel=2)
@@ -0,0 +1,85 @@
+import os
+from datetime import date
+from typing import List, Optional, Set
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+# Monthly range partitions of attendance_records on Postgres, set up by migration 8f2a6c4d1b97.
+# Month M lives in attendance_records_yYYYYmMM, covering [first day of M, first day of M + 1).
+# A record dated outside every partition lands in attendance_records_default, so an insert
+# never fails for a missing month; when that month's partition is created later, its rows are
+# moved out of the default first. Other databases keep one plain table and every function here
+# is a no-op on them.
+#   ATTENDANCE_PARTITIONS_AHEAD  months created ahead of the current one (default 3)
+
+PARENT = "attendance_records"
+DEFAULT_PARTITION = "attendance_records_default"
+ATTENDANCE_PARTITIONS_AHEAD = int(os.getenv("ATTENDANCE_PARTITIONS_AHEAD", "3"))
+
+
+def add_months(month: date, n: int) -> date:
+    index = month.year * 12 + (month.month - 1) + n
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARENT}_y{month.year:04d}m{month.month:02d}"
+
+
+def is_partitioned(db: Session) -> bool:
+    if db.get_bind().dialect.name != "postgresql":
+        return False
+    return bool(db.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:parent))"
+    ), {"parent": PARENT}).scalar())
+
+
+def existing_partitions(db: Session) -> Set[str]:
+    return set(db.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = to_regclass(:parent)"
+    ), {"parent": PARENT}).scalars())
+
+
+def create_partition(db: Session, month: date) -> None:
+    """
+    Creates the month's partition. Records of the month already sitting in the default partition
+    are moved into a new table that is then attached, since Postgres refuses to create a
+    partition whose range still has rows in the default one. Commits with the caller.
+    """
+    name, start, end = partition_name(month), month.isoformat(), add_months(month, 1).isoformat()
+    bounds = f"FOR VALUES FROM ('{start}') TO ('{end}')" # ISO dates from date objects, safe to inline in DDL
+    stranded = db.execute(text(
+        f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE date >= :start AND date < :end)"
+    ), {"start": start, "end": end}).scalar()
+    if not stranded:
+        db.execute(text(f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {PARENT} {bounds}"))
+        return
+    db.execute(text(f"CREATE TABLE {name} (LIKE {PARENT} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    db.execute(text(
+        f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE date >= :start AND date < :end RETURNING *) "
+        f"INSERT INTO {name} SELECT * FROM moved"
+    ), {"start": start, "end": end})
+    db.execute(text(f"ALTER TABLE {PARENT} ATTACH PARTITION {name} {bounds}"))
+
+
+def ensure_partitions(db: Session, first_month: date, last_month: date) -> List[str]:
+    """Creates the missing monthly partitions from first_month through last_month; returns their names."""
+    existing = existing_partitions(db)
+    created = []
+    month = first_month.replace(day=1)
+    while month <= last_month:
+        if partition_name(month) not in existing:
+            create_partition(db, month)
+            created.append(partition_name(month))
+        month = add_months(month, 1)
+    return created
+
+
+def ensure_future_partitions(db: Session, today: Optional[date] = None, ahead: int = ATTENDANCE_PARTITIONS_AHEAD) -> dict:
+    """Partitions from this month through `ahead` months from now, on a partitioned Postgres table only."""
+    if not is_partitioned(db):
+        return {"partitioned": False}
+    this_month = (today or date.today()).replace(day=1)
+    created = ensure_partitions(db, this_month, add_months(this_month, ahead))
+    return {"partitioned": True, "created": created}
@@ -0,0 +1,62 @@
+from collections import defaultdict
+from datetime import date
+from typing import Dict, List, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.models import SalaryHistory
+
+# (effective_from, monthly_salary) pairs, sorted by effective_from
+SalarySegments = List[Tuple[date, float]]
+
+
+def salary_history_query(employee_ids, month_end: date):
+    """
+    Every salary history row that can apply on or before month_end, for all employees at once.
+    employee_ids is a list of ids or a SELECT of Employee.id.
+    """
+    return (
+        select(SalaryHistory.employee_id, SalaryHistory.effective_from, SalaryHistory.monthly_salary)
+        .where(SalaryHistory.employee_id.in_(employee_ids), SalaryHistory.effective_from <= month_end)
+        .order_by(SalaryHistory.employee_id, SalaryHistory.effective_from)
+    )
+
+
+def group_salary_segments(rows, month_start: date) -> Dict[int, SalarySegments]:
+    """
+    Groups (employee_id, effective_from, monthly_salary) rows per employee and drops
+    segments fully superseded before month_start.
+    """
+    segments: Dict[int, SalarySegments] = defaultdict(list)
+    for employee_id, effective_from, monthly_salary in rows:
+        segs = segments[employee_id]
+        # Only the last change before the month matters; older ones are superseded
+        if segs and segs[-1][0] <= month_start and effective_from <= month_start:
+            segs[-1] = (effective_from, monthly_salary)
+        else:
+            segs.append((effective_from, monthly_salary))
+    return segments
+
+
+async def load_salary_segments(db: AsyncSession, employee_ids, month_start: date, month_end: date) -> Dict[int, SalarySegments]:
+    rows = (await db.execute(salary_history_query(employee_ids, month_end))).all()
+    return group_salary_segments(rows, month_start)
+
+
+def daily_salaries(segments: SalarySegments, dates: List[date], fallback_salary: float) -> List[float]:
+    """
+    Monthly salary in effect on each date. Days before the first recorded segment use that
+    segment's salary; employees without any history fall back to Employee.monthly_salary.
+    """
+    if not segments:
+        return [fallback_salary or 0.0] * len(dates)
+    out = []
+    idx = 0
+    current = segments[0][1]
+    for d in dates:
+        while idx < len(segments) and segments[idx][0] <= d:
+            current = segments[idx][1]
+            idx += 1
+        out.append(current or 0.0)
+    return out
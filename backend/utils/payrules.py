@@ -0,0 +1,105 @@
+from datetime import date
+from typing import Callable, Dict, List, Optional, Set
+
+from models.models import AttendanceRecord, AttendanceStatus, Employee, Settings
+from schemas.schemas import SalaryRow
+
+# The pay formula of a tenant, built from its Settings once per report request and then
+# evaluated for every employee of the month:
+#   - a Present day pays the standard hours, a Half-day half of them
+#   - work on a holiday is paid holiday_work_multiplier times that
+#   - overtime hours are paid overtime_multiplier times the hourly rate
+#   - late hours are deducted per late_deduction_policy
+#   - only days in the employment window [date_of_joining, inactive_from) count, paid
+#     holidays included
+# The hourly rate of a day is the monthly salary in effect that day over (days in month x standard hours).
+
+LATE_DEDUCTION_POLICIES = ("hourly", "none", "half_day")
+
+
+def _late_deduction(policy: str, std_hours: float) -> Callable[[float], float]:
+    """Hours deducted for a day with the given late hours."""
+    if policy == "none":
+        return lambda late_hours: 0.0
+    if policy == "half_day":
+        return lambda late_hours: std_hours / 2.0 if late_hours > 0 else 0.0
+    return lambda late_hours: late_hours
+
+
+class PayRules:
+    def __init__(self, std_hours: float = 8.0, overtime_multiplier: float = 1.5,
+                 holiday_work_multiplier: float = 1.0, late_deduction_policy: str = "hourly"):
+        self.std_hours = std_hours
+        self.overtime_multiplier = overtime_multiplier
+        self.holiday_work_multiplier = holiday_work_multiplier
+        self.late_deduction = _late_deduction(late_deduction_policy, std_hours)
+        # Paid hours per status, looked up per record instead of branching on the status
+        self.day_hours = {AttendanceStatus.Present: std_hours, AttendanceStatus.HALF_DAY: std_hours / 2.0, AttendanceStatus.Absent: 0.0}
+
+    @classmethod
+    def compile(cls, settings: Optional[Settings]) -> "PayRules":
+        if settings is None:
+            return cls()
+        return cls(
+            std_hours=settings.standard_work_hours_per_day or 8.0,
+            overtime_multiplier=settings.overtime_multiplier if settings.overtime_multiplier is not None else 1.5,
+            holiday_work_multiplier=settings.holiday_work_multiplier if settings.holiday_work_multiplier is not None else 1.0,
+            late_deduction_policy=settings.late_deduction_policy or "hourly",
+        )
+
+    def salary_row(self, e: Employee, recs: List[AttendanceRecord], dates: List[date], salary_by_day: List[float],
+                   holiday_dates: Set[date], advance_deduction: float) -> SalaryRow:
+        std_hours = self.std_hours
+        month_capacity_hours = max(1.0, len(dates) * std_hours)
+        rate_on: Dict[date, float] = {d: salary / month_capacity_hours for d, salary in zip(dates, salary_by_day)}
+
+        def employed(d: date) -> bool:
+            return (e.date_of_joining is None or d >= e.date_of_joining) and (e.inactive_from is None or d < e.inactive_from)
+
+        recs = [r for r in recs if employed(r.date)]
+        normal_present_days = holiday_present_days = half_days = 0
+        total_ot = total_late = late_deducted = 0.0
+        total_payable = 0.0
+        for r in recs:
+            rate = rate_on[r.date]
+            on_holiday = r.date in holiday_dates
+            if r.status == AttendanceStatus.Present:
+                if on_holiday:
+                    holiday_present_days += 1
+                else:
+                    normal_present_days += 1
+            elif r.status == AttendanceStatus.HALF_DAY:
+                half_days += 1
+            day_pay = self.day_hours[r.status] * rate
+            total_payable += day_pay * self.holiday_work_multiplier if on_holiday else day_pay
+            overtime, late = r.manual_overtime_hours or 0.0, r.late_hours or 0.0
+            total_ot += overtime
+            total_late += late
+            deducted = self.late_deduction(late)
+            late_deducted += deducted
+            total_payable += (overtime * self.overtime_multiplier - deducted) * rate
+
+        # Holidays are paid while employed, except the ones worked (already paid above)
+        present_dates = {r.date for r in recs if r.status == AttendanceStatus.Present}
+        paid_holidays = {d for d in holiday_dates if employed(d) and d not in present_dates}
+        total_payable += sum(std_hours * rate_on[d] for d in paid_holidays)
+        total_payable -= advance_deduction
+
+        paid_holiday_days = float(len(paid_holidays) + holiday_present_days)
+        work_days = normal_present_days + 0.5 * half_days
+        # Reported hourly rate is the day-weighted average over the month
+        effective_monthly_salary = sum(salary_by_day) / len(salary_by_day)
+        regular_hours = (normal_present_days * std_hours) + (half_days * (std_hours / 2.0)) + (paid_holiday_days * std_hours)
+
+        return SalaryRow(
+            employee_id=e.id, name=e.name, base_monthly_salary=e.monthly_salary,
+            effective_monthly_salary=round(effective_monthly_salary, 2),
+            days_present=normal_present_days, half_days=half_days,
+            work_days=round(work_days, 2), paid_holiday_days=round(paid_holiday_days, 2),
+            total_paid_days=round(work_days + paid_holiday_days, 2),
+            total_overtime_hours=round(total_ot, 2), total_late_hours=round(total_late, 2),
+            hourly_rate=round(effective_monthly_salary / month_capacity_hours, 2),
+            total_hours_worked=round(regular_hours + total_ot - late_deducted, 2),
+            advance_deduction=round(advance_deduction, 2),
+            total_payable_salary=round(total_payable, 2),
+        )
@@ -0,0 +1,221 @@
+import asyncio
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+from typing import Dict, List, Tuple
+from urllib.parse import parse_qs
+
+from jose import JWTError, jwt
+
+from utils.metrics import RequestStats, current_request_stats, install_sql_hooks
+
+# On-demand profiling of a single request, for reproducing one tenant's slow page.
+# The middleware is only installed when PROFILING_ENABLED is set, so it costs nothing otherwise:
+#   PROFILING_ENABLED            false
+#   PROFILE_DIR                  ./profiles
+#   PROFILE_SAMPLE_INTERVAL_MS   2
+# An admin asks for a profile with an "X-Profile: 1" header or a "profile=1" query parameter.
+# The response carries an X-Profile-Id header; PROFILE_DIR/<id>.speedscope.json opens in
+# https://www.speedscope.app and PROFILE_DIR/<id>.sql.json lists the statements and their timings.
+
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() in ("1", "true", "yes", "on")
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "2"))
+
+logger = logging.getLogger(__name__)
+
+# Leaf frames of threads that are parked (event loop waiting on I/O, idle pool workers);
+# samples ending in one of these say nothing about where the request spends time
+IDLE_LEAVES = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+}
+
+Frame = Tuple[str, str, int]  # (function, file, first line)
+
+
+class SamplingProfiler:
+    """
+    Samples the Python stacks of every thread at a fixed interval. Async endpoints run on the
+    event loop thread and sync ones in the threadpool, so all threads are sampled; concurrent
+    requests on the same worker show up too, which is why this is meant for quiet moments.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.samples: Dict[int, List[Tuple[float, Tuple[Frame, ...]]]] = {}
+        self.thread_names: Dict[int, str] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self.started_at = 0.0
+        self.stopped_at = 0.0
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.stopped_at = time.perf_counter()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                code = frame.f_code
+                if (os.path.basename(code.co_filename), code.co_name) in IDLE_LEAVES:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+                    frame = frame.f_back
+                stack.reverse()
+                self.samples.setdefault(thread_id, []).append((now, tuple(stack)))
+        self.thread_names = {t.ident: t.name for t in threading.enumerate()}
+
+    def to_speedscope(self, name: str) -> dict:
+        """Speedscope file format: one sampled profile per thread, weights in seconds."""
+        frame_index: Dict[Frame, int] = {}
+        frames = []
+        profiles = []
+        for thread_id, samples in self.samples.items():
+            stacks, weights = [], []
+            previous = self.started_at
+            for at, stack in samples:
+                indexes = []
+                for frame in stack:
+                    index = frame_index.get(frame)
+                    if index is None:
+                        index = frame_index[frame] = len(frames)
+                        frames.append({"name": frame[0], "file": frame[1], "line": frame[2]})
+                    indexes.append(index)
+                stacks.append(indexes)
+                weights.append(round(min(at - previous, self.interval * 2), 6))
+                previous = at
+            profiles.append({
+                "type": "sampled",
+                "name": self.thread_names.get(thread_id, str(thread_id)),
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": round(self.stopped_at - self.started_at, 6),
+                "samples": stacks,
+                "weights": weights,
+            })
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "attendance-manager request profiler",
+            "shared": {"frames": frames},
+            "profiles": profiles,
+        }
+
+
+def _profile_requested(scope) -> bool:
+    for key, value in scope["headers"]:
+        if key == b"x-profile" and value.lower() in (b"1", b"true", b"yes"):
+            return True
+    query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    return query.get("profile", [""])[0].lower() in ("1", "true", "yes")
+
+
+def _is_admin(scope) -> bool:
+    """Checks the bearer token's admin claim; the route's own dependencies still do the real authorization."""
+    for key, value in scope["headers"]:
+        if key == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() != "bearer":
+                return False
+            try:
+                payload = jwt.decode(token, os.getenv("SECRET_KEY", "super-secret-key"), algorithms=[os.getenv("ALGORITHM", "HS256")])
+            except JWTError:
+                return False
+            return bool(payload.get("admin"))
+    return False
+
+
+def _write_profile(profile_id: str, speedscope: dict, sql: dict):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    with open(os.path.join(PROFILE_DIR, f"{profile_id}.speedscope.json"), "w") as f:
+        json.dump(speedscope, f)
+    with open(os.path.join(PROFILE_DIR, f"{profile_id}.sql.json"), "w") as f:
+        json.dump(sql, f, indent=2)
+
+
+class ProfilingMiddleware:
+    """
+    Pure ASGI middleware profiling requests that ask for it, from admins only. Install it
+    inside MetricsMiddleware so both share the request's RequestStats.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        install_sql_hooks()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _profile_requested(scope) or not _is_admin(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = uuid.uuid4().hex[:12]
+        stats = current_request_stats.get()
+        token = None
+        if stats is None:
+            stats = RequestStats()
+            token = current_request_stats.set(stats)
+        stats.statement_log = []
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", profile_id.encode())]
+            await send(message)
+
+        profiler = SamplingProfiler(PROFILE_SAMPLE_INTERVAL_MS / 1000)
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profiler.stop()
+            if token is not None:
+                current_request_stats.reset(token)
+            statements = stats.statement_log
+            stats.statement_log = None
+
+            name = f"{scope['method']} {scope['path']}"
+            by_shape: Dict[str, List[float]] = {}
+            for sql, seconds in statements:
+                by_shape.setdefault(sql, []).append(seconds)
+            sql = {
+                "profile_id": profile_id,
+                "request": name,
+                "status": status_code,
+                "duration_seconds": round(profiler.stopped_at - profiler.started_at, 6),
+                "sql_count": len(statements),
+                "sql_seconds": round(sum(seconds for _, seconds in statements), 6),
+                # Slowest shapes first; "statements" keeps execution order
+                "by_statement": sorted(
+                    ({"sql": s, "count": len(t), "total_seconds": round(sum(t), 6), "max_seconds": round(max(t), 6)}
+                     for s, t in by_shape.items()),
+                    key=lambda row: row["total_seconds"], reverse=True,
+                ),
+                "statements": [{"sql": s, "seconds": round(t, 6)} for s, t in statements],
+            }
+            try:
+                await asyncio.to_thread(_write_profile, profile_id, profiler.to_speedscope(name), sql)
+                logger.info("Profiled %s as %s (%d statements)", name, profile_id, len(statements))
+            except OSError:
+                logger.exception("Could not write profile %s to %s", profile_id, PROFILE_DIR)
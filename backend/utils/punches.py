@@ -0,0 +1,153 @@
+from datetime import date, datetime
+from typing import List, Optional, Tuple
+
+import orjson
+from sqlalchemy import bindparam, delete, insert, select
+from sqlalchemy.orm import Session
+
+from models.models import AttendanceRecord, AttendanceStatus, Employee, PayrollMonth, PunchDirtyDay, PunchEvent
+from utils.shifts import DaySchedule, day_timings, load_schedule_book, punch_spans
+
+# Punch ingestion and the derived attendance. Devices post NDJSON, one punch per line:
+#   {"device_id": "gate-1", "employee_id": 12, "punched_at": "2026-03-02T09:04:11", "direction": "in"}
+# punched_at is the local wall-clock time; direction is optional. Every (employee, day) that
+# receives punches is queued in punch_dirty_days and re-derived by aggregate_punches() against
+# the employee's shift (see utils/shifts.py).
+
+INSERT_CHUNK = 1000
+# Share of the scheduled day that has to be worked between first in and last out to count as Present
+PRESENT_MIN_RATIO = 0.75
+
+
+def parse_punch_lines(body: bytes) -> Tuple[List[dict], List[str], int]:
+    """Valid events, per-line errors and the number of non-blank lines in an NDJSON body."""
+    events, errors, received = [], [], 0
+    for line_no, line in enumerate(body.splitlines(), start=1):
+        if not line.strip():
+            continue
+        received += 1
+        try:
+            raw = orjson.loads(line)
+            device_id = str(raw["device_id"]).strip()
+            employee_id = int(raw["employee_id"])
+            punched_at = datetime.fromisoformat(raw["punched_at"])
+            direction = raw.get("direction")
+        except (orjson.JSONDecodeError, KeyError, TypeError, ValueError, AttributeError) as e:
+            errors.append(f"line {line_no}: {type(e).__name__}: {e}")
+            continue
+        if not 0 < len(device_id) <= 64:
+            errors.append(f"line {line_no}: device_id must be 1-64 characters")
+        elif punched_at.tzinfo is not None:
+            errors.append(f"line {line_no}: punched_at must be local time without a UTC offset")
+        elif direction not in (None, "in", "out"):
+            errors.append(f"line {line_no}: direction must be 'in', 'out' or omitted")
+        else:
+            events.append({"device_id": device_id, "employee_id": employee_id, "punched_at": punched_at, "direction": direction})
+    return events, errors, received
+
+
+def insert_punches_statement(dialect: str):
+    """Executemany INSERT that skips punches already stored (same device, employee and time)."""
+    if dialect == "mysql":
+        return insert(PunchEvent).prefix_with("IGNORE")
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    return dialect_insert(PunchEvent).on_conflict_do_nothing(
+        index_elements=[PunchEvent.device_id, PunchEvent.employee_id, PunchEvent.punched_at]
+    )
+
+
+def touch_dirty_days_statement(dialect: str):
+    """Executemany upsert queueing (employee_id, date) for re-derivation, bumping version when already queued."""
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert as mysql_insert
+        return mysql_insert(PunchDirtyDay).on_duplicate_key_update(version=PunchDirtyDay.version + 1)
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    return dialect_insert(PunchDirtyDay).on_conflict_do_update(
+        index_elements=[PunchDirtyDay.employee_id, PunchDirtyDay.date],
+        set_={"version": PunchDirtyDay.version + 1},
+    )
+
+
+def _upsert_attendance_statement(dialect: str):
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert as mysql_insert
+        stmt = mysql_insert(AttendanceRecord)
+        return stmt.on_duplicate_key_update(
+            status=stmt.inserted.status, late_hours=stmt.inserted.late_hours, manual_overtime_hours=stmt.inserted.manual_overtime_hours,
+        )
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    stmt = dialect_insert(AttendanceRecord)
+    return stmt.on_conflict_do_update(
+        index_elements=[AttendanceRecord.date, AttendanceRecord.employee_id],
+        set_={"status": stmt.excluded.status, "late_hours": stmt.excluded.late_hours,
+              "manual_overtime_hours": stmt.excluded.manual_overtime_hours},
+    )
+
+
+def derive_day(day: date, first_in: datetime, last_out: datetime,
+               schedule: Optional[DaySchedule]) -> Tuple[AttendanceStatus, float, float]:
+    """
+    Status, late hours and overtime hours for one employee-day worked from first_in to
+    last_out. A lone punch counts as Present without overtime, since a missed punch-out is
+    the usual cause.
+    """
+    late, overtime, worked = day_timings(day, first_in, last_out, schedule)
+    if last_out <= first_in:
+        return AttendanceStatus.Present, late, 0.0
+    required = PRESENT_MIN_RATIO * schedule.hours if schedule else 0.0
+    return (AttendanceStatus.Present if worked >= required else AttendanceStatus.HALF_DAY), late, overtime
+
+
+def aggregate_punches(db: Session, batch_size: int = 1000, max_days: int = 50000) -> dict:
+    """
+    Re-derives the attendance record of every queued (employee, day) from all of its punches
+    and the employee's schedule, and clears the queue entries it saw. Only queued days are
+    read; nothing else is rescanned. Commits with the caller.
+    """
+    dialect = db.get_bind().dialect.name
+    upsert = _upsert_attendance_statement(dialect)
+    clear = delete(PunchDirtyDay.__table__).where(
+        PunchDirtyDay.employee_id == bindparam("e"), PunchDirtyDay.date == bindparam("d"), PunchDirtyDay.version == bindparam("v"),
+    )
+    days_done = written = 0
+    while days_done < max_days:
+        dirty = db.execute(
+            select(PunchDirtyDay.employee_id, PunchDirtyDay.date, PunchDirtyDay.version)
+            .order_by(PunchDirtyDay.date, PunchDirtyDay.employee_id)
+            .limit(batch_size)
+        ).all()
+        if not dirty:
+            break
+        employee_filter = Employee.id.in_({e for e, _, _ in dirty})
+        book = load_schedule_book(db, employee_filter)
+        first_day, last_day = min(d for _, d, _ in dirty), max(d for _, d, _ in dirty)
+        spans = punch_spans(db, employee_filter, first_day, last_day)
+        # Punches received before their month was closed do not change it any more
+        closed = set(db.execute(select(PayrollMonth.user_id, PayrollMonth.month).where(
+            PayrollMonth.user_id.in_(set(book.owners.values())), PayrollMonth.month <= last_day, PayrollMonth.month_end >= first_day,
+        )).all())
+
+        rows = []
+        for employee_id, day, _ in dirty:
+            span = spans.get((employee_id, day))
+            if span is None or employee_id not in book.owners or (book.owners[employee_id], day.replace(day=1)) in closed:
+                continue
+            status, late, overtime = derive_day(day, *span, book.for_day(employee_id, day))
+            rows.append({"date": day, "status": status, "late_hours": late, "manual_overtime_hours": overtime,
+                         "employee_id": employee_id, "user_id": book.owners[employee_id]})
+        if rows:
+            db.execute(upsert, rows)
+        # A day punched again meanwhile has a newer version and stays queued
+        db.execute(clear, [{"e": e, "d": d, "v": v} for e, d, v in dirty])
+        days_done += len(dirty)
+        written += len(rows)
+    return {"days": days_done, "records_written": written}
@@ -0,0 +1,148 @@
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional
+
+from sqlalchemy import or_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from db import SessionLocal
+from models.models import ScheduledJob
+from utils.metrics import registry
+
+# Periodic maintenance jobs run inside the app process, started and stopped by the FastAPI
+# lifespan. Every worker runs the loop; the scheduled_jobs row of a job is its lease, so each
+# due run happens on exactly one worker:
+#   SCHEDULER_ENABLED         true
+#   SCHEDULER_TICK_SECONDS    60 (how often due jobs are looked for)
+#   SCHEDULER_LEASE_SECONDS   900 (a run still holding its lease after this is presumed dead)
+
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "true").lower() in ("1", "true", "yes", "on")
+SCHEDULER_TICK_SECONDS = float(os.getenv("SCHEDULER_TICK_SECONDS", "60"))
+SCHEDULER_LEASE_SECONDS = float(os.getenv("SCHEDULER_LEASE_SECONDS", "900"))
+
+logger = logging.getLogger(__name__)
+
+# A job takes a sync Session, does its work without committing and returns a small JSON-able
+# summary; the scheduler commits on success and rolls back on error
+JobFunc = Callable[[Session], Optional[dict]]
+
+
+class Job:
+    def __init__(self, name: str, interval_seconds: float, func: JobFunc):
+        self.name = name
+        self.interval_seconds = interval_seconds
+        self.func = func
+
+
+class Scheduler:
+    def __init__(self, tick_seconds: float = None, lease_seconds: float = None):
+        self.tick_seconds = SCHEDULER_TICK_SECONDS if tick_seconds is None else tick_seconds
+        self.lease_seconds = SCHEDULER_LEASE_SECONDS if lease_seconds is None else lease_seconds
+        self.jobs: Dict[str, Job] = {}
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._task: Optional[asyncio.Task] = None
+
+    def register(self, name: str, interval_seconds: float):
+        """Decorator adding a job that runs every interval_seconds (measured from its last start)."""
+        def decorator(func: JobFunc) -> JobFunc:
+            self.jobs[name] = Job(name, interval_seconds, func)
+            return func
+        return decorator
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+            logger.info("Scheduler started with jobs %s", sorted(self.jobs))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            for job in list(self.jobs.values()):
+                try:
+                    # Jobs use the sync engine; keep them off the event loop
+                    await asyncio.to_thread(self.run_if_due, job)
+                except Exception:
+                    logger.exception("Scheduler failed to run %s", job.name)
+            await asyncio.sleep(self.tick_seconds)
+
+    def run_if_due(self, job: Job, force: bool = False) -> bool:
+        """Runs the job when it is due (or force is set) and this worker wins the lease. Returns whether it ran."""
+        with SessionLocal() as db:
+            started_at = datetime.utcnow()
+            if not self._claim(db, job, started_at, force):
+                return False
+
+            started = time.perf_counter()
+            try:
+                result = job.func(db) or {}
+                db.commit()
+                status, summary = "ok", json.dumps(result, default=str)
+            except Exception as e:
+                db.rollback()
+                status, summary = "error", repr(e)
+                logger.exception("Scheduled job %s failed", job.name)
+            seconds = time.perf_counter() - started
+
+            db.execute(
+                update(ScheduledJob)
+                .where(ScheduledJob.name == job.name, ScheduledJob.lease_owner == self.owner)
+                .values(
+                    lease_owner=None,
+                    lease_expires_at=None,
+                    next_run_at=started_at + timedelta(seconds=job.interval_seconds),
+                    last_finished_at=datetime.utcnow(),
+                    last_duration_ms=round(seconds * 1000, 1),
+                    last_status=status,
+                    last_result=summary[:1000],
+                    run_count=ScheduledJob.run_count + 1,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+        registry.observe_job(job.name, status, seconds)
+        logger.info("Scheduled job %s finished", job.name,
+                    extra={"job": job.name, "status": status, "duration_ms": round(seconds * 1000, 1), "result": summary[:1000]})
+        return True
+
+    def _claim(self, db: Session, job: Job, now: datetime, force: bool) -> bool:
+        if db.get(ScheduledJob, job.name) is None:
+            db.add(ScheduledJob(name=job.name, run_count=0))
+            try:
+                db.commit()
+            except IntegrityError:
+                # Another worker created it first
+                db.rollback()
+
+        # Conditional UPDATE: only one worker can move an unleased, due row to its own lease
+        conditions = [
+            ScheduledJob.name == job.name,
+            or_(ScheduledJob.lease_expires_at.is_(None), ScheduledJob.lease_expires_at < now),
+        ]
+        if not force:
+            conditions.append(or_(ScheduledJob.next_run_at.is_(None), ScheduledJob.next_run_at <= now))
+        claimed = db.execute(
+            update(ScheduledJob)
+            .where(*conditions)
+            .values(lease_owner=self.owner, lease_expires_at=now + timedelta(seconds=self.lease_seconds), last_started_at=now)
+            .execution_options(synchronize_session=False)
+        ).rowcount == 1
+        db.commit()
+        return claimed
+
+
+scheduler = Scheduler()
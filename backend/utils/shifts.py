@@ -0,0 +1,172 @@
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import and_, bindparam, select, update
+from sqlalchemy.orm import Session
+
+from models.models import AttendanceRecord, AttendanceStatus, Employee, PunchEvent, Settings, Shift, ShiftWeekday
+from utils.closing import closed_on
+
+# Work schedules and the late / overtime hours measured against them. An employee without a
+# shift works the tenant's standard_work_hours_per_day from DEFAULT_DAY_START. Work spans come
+# from punches when the day has any, otherwise from the record's entered check_in / check_out.
+# Punches are grouped by calendar day, so a shift crossing midnight is only measured correctly
+# from entered times.
+
+DEFAULT_DAY_START = time(9, 0)
+# Longest range one recompute covers
+MAX_RECOMPUTE_DAYS = 366
+
+
+class DaySchedule(NamedTuple):
+    start: time
+    hours: float # Scheduled length of the day
+    grace_minutes: int
+
+
+def shift_hours(start: time, end: time) -> float:
+    """Length of a shift in hours; an end at or before the start is on the next day."""
+    minutes = (end.hour * 60 + end.minute) - (start.hour * 60 + start.minute)
+    return (minutes % (24 * 60) or 24 * 60) / 60
+
+
+class ScheduleBook:
+    """
+    Schedules of a set of employees. Shifts are resolved into a (shift_id, weekday) table once,
+    so looking up an employee-day is two dict hits. A day off resolves to None.
+    """
+
+    def __init__(self, owners: Dict[int, int], employee_shift: Dict[int, Optional[int]],
+                 defaults: Dict[int, DaySchedule], table: Dict[Tuple[int, int], Optional[DaySchedule]]):
+        self.owners = owners
+        self.employee_shift = employee_shift
+        self.defaults = defaults
+        self.table = table
+
+    def for_day(self, employee_id: int, day: date) -> Optional[DaySchedule]:
+        shift_id = self.employee_shift.get(employee_id)
+        if shift_id is None:
+            return self.defaults.get(employee_id)
+        return self.table[(shift_id, day.weekday())]
+
+
+def load_schedule_book(db: Session, employee_filter) -> ScheduleBook:
+    """ScheduleBook of the employees matching employee_filter, in three queries."""
+    owners, employee_shift, defaults = {}, {}, {}
+    for employee_id, owner_id, shift_id, std_hours in db.execute(
+        select(Employee.id, Employee.last_updated_by, Employee.shift_id, Settings.standard_work_hours_per_day)
+        .outerjoin(Settings, Settings.user_id == Employee.last_updated_by)
+        .where(employee_filter)
+    ):
+        owners[employee_id] = owner_id
+        employee_shift[employee_id] = shift_id
+        defaults[employee_id] = DaySchedule(DEFAULT_DAY_START, std_hours or 8.0, 0)
+
+    table = {}
+    shift_ids = {s for s in employee_shift.values() if s is not None}
+    if shift_ids:
+        for shift_id, start, end, grace in db.execute(
+            select(Shift.id, Shift.start_time, Shift.end_time, Shift.grace_minutes).where(Shift.id.in_(shift_ids))
+        ):
+            for weekday in range(7):
+                table[(shift_id, weekday)] = DaySchedule(start, shift_hours(start, end), grace)
+        for shift_id, weekday, start, end, day_off in db.execute(
+            select(ShiftWeekday.shift_id, ShiftWeekday.weekday, ShiftWeekday.start_time, ShiftWeekday.end_time, ShiftWeekday.day_off)
+            .where(ShiftWeekday.shift_id.in_(shift_ids))
+        ):
+            base = table[(shift_id, weekday)]
+            table[(shift_id, weekday)] = None if day_off else DaySchedule(start, shift_hours(start, end), base.grace_minutes)
+    return ScheduleBook(owners, employee_shift, defaults, table)
+
+
+def punch_spans(db: Session, employee_filter, first_day: date, last_day: date) -> Dict[Tuple[int, date], Tuple[datetime, datetime]]:
+    """
+    First "in" (or first punch) and last "out" (or last punch) of every employee-day in the
+    range with punches, for the employees matching employee_filter. One query, one pass.
+    """
+    first_in, first_any, last_out, last_any = {}, {}, {}, {}
+    for employee_id, punched_at, direction in db.execute(
+        select(PunchEvent.employee_id, PunchEvent.punched_at, PunchEvent.direction)
+        .join(Employee, Employee.id == PunchEvent.employee_id)
+        .where(employee_filter,
+               PunchEvent.punched_at >= datetime.combine(first_day, time.min),
+               PunchEvent.punched_at < datetime.combine(last_day + timedelta(days=1), time.min))
+    ):
+        key = (employee_id, punched_at.date())
+        if punched_at < first_any.get(key, datetime.max):
+            first_any[key] = punched_at
+        if punched_at > last_any.get(key, datetime.min):
+            last_any[key] = punched_at
+        if direction != "out" and punched_at < first_in.get(key, datetime.max):
+            first_in[key] = punched_at
+        if direction != "in" and punched_at > last_out.get(key, datetime.min):
+            last_out[key] = punched_at
+    return {key: (first_in.get(key, start), last_out.get(key, last_any[key])) for key, start in first_any.items()}
+
+
+def entered_span(day: date, check_in: time, check_out: Optional[time]) -> Tuple[datetime, datetime]:
+    """Work span of entered times; a missing check_out gives an empty span."""
+    start = datetime.combine(day, check_in)
+    end = datetime.combine(day, check_out) if check_out else start
+    if end < start:
+        end += timedelta(days=1)
+    return start, end
+
+
+def day_timings(day: date, first_in: datetime, last_out: datetime, schedule: Optional[DaySchedule]) -> Tuple[float, float, float]:
+    """
+    Late hours, overtime hours and hours worked for one employee-day. Late counts from the
+    scheduled start once the arrival is past the grace period; overtime is the time worked
+    beyond the scheduled length. On a day off (schedule None) all of it is overtime.
+    """
+    worked = max(0.0, (last_out - first_in).total_seconds() / 3600)
+    if schedule is None:
+        return 0.0, round(worked, 2), worked
+    late_seconds = (first_in - datetime.combine(day, schedule.start)).total_seconds()
+    late = late_seconds / 3600 if late_seconds > schedule.grace_minutes * 60 else 0.0
+    return round(late, 2), round(max(0.0, worked - schedule.hours), 2), worked
+
+
+def recompute_timings(db: Session, owner_id: int, start_date: date, end_date: date,
+                      employee_ids: Optional[List[int]] = None) -> dict:
+    """
+    Recomputes late and overtime hours of the tenant's attendance records in the range (or of
+    the given employees only) from punches or entered check-in times, and updates just the
+    records whose values changed, in one executemany. Records with neither are left as typed,
+    and so are records in closed payroll months. Commits with the caller.
+    """
+    employee_filter = Employee.last_updated_by == owner_id
+    if employee_ids is not None:
+        employee_filter = and_(employee_filter, Employee.id.in_(employee_ids))
+
+    book = load_schedule_book(db, employee_filter)
+    spans = punch_spans(db, employee_filter, start_date, end_date)
+    records = db.execute(
+        select(AttendanceRecord.id, AttendanceRecord.employee_id, AttendanceRecord.date, AttendanceRecord.late_hours,
+               AttendanceRecord.manual_overtime_hours, AttendanceRecord.check_in, AttendanceRecord.check_out)
+        .join(Employee, Employee.id == AttendanceRecord.employee_id)
+        .where(employee_filter, AttendanceRecord.date >= start_date, AttendanceRecord.date <= end_date,
+               AttendanceRecord.status != AttendanceStatus.Absent,
+               ~closed_on(Employee.last_updated_by, AttendanceRecord.date))
+    ).all()
+
+    changed = []
+    for record_id, employee_id, day, late, overtime, check_in, check_out in records:
+        span = spans.get((employee_id, day))
+        if span is None and check_in is not None:
+            span = entered_span(day, check_in, check_out)
+        if span is None:
+            continue
+        new_late, new_overtime, _ = day_timings(day, *span, book.for_day(employee_id, day))
+        if new_late != (late or 0.0) or new_overtime != (overtime or 0.0):
+            changed.append({"record_id": record_id, "late": new_late, "overtime": new_overtime})
+
+    if changed:
+        # Core table update: an executemany keyed on a bound id, not the ORM bulk path
+        table = AttendanceRecord.__table__
+        db.execute(
+            update(table).where(table.c.id == bindparam("record_id"))
+            .values(late_hours=bindparam("late"), manual_overtime_hours=bindparam("overtime")),
+            changed,
+        )
+    return {"records": len(records), "updated": len(changed)}
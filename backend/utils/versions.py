@@ -0,0 +1,78 @@
+from datetime import datetime
+from typing import Dict
+
+from fastapi import Request, Response
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from models.models import ResourceVersion, User, UserRole
+
+# Per-tenant version counters for rarely-changing resources. Every write bumps the counter in
+# its own transaction; reads turn it into an ETag and answer a matching If-None-Match with 304
+# after a single primary-key lookup, without touching the resource's own tables.
+EMPLOYEES = "employees"
+HOLIDAYS = "holidays"
+COMPANY = "company"
+
+
+def tenant_owner_id(user: User) -> int:
+    """The admin whose employees and holidays this user sees."""
+    if user.role == UserRole.staff and user.created_by_admin_id:
+        return user.created_by_admin_id
+    return user.id
+
+
+def _upsert_statement(dialect: str, owner_id: int, resource: str, now: datetime):
+    values = {"user_id": owner_id, "resource": resource, "version": 1, "updated_at": now}
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert
+        return insert(ResourceVersion).values(**values).on_duplicate_key_update(
+            version=ResourceVersion.version + 1, updated_at=now
+        )
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(ResourceVersion).values(**values).on_conflict_do_update(
+        index_elements=[ResourceVersion.user_id, ResourceVersion.resource],
+        set_={"version": ResourceVersion.version + 1, "updated_at": now},
+    )
+
+
+def bump_version(db: Session, owner_id: int, resource: str):
+    """Increments the counter in one atomic upsert; commits with the caller's transaction."""
+    db.execute(_upsert_statement(db.get_bind().dialect.name, owner_id, resource, datetime.utcnow()))
+
+
+def version_headers(db: Session, owner_id: int, resource: str, viewer_id: int) -> Dict[str, str]:
+    """
+    ETag (and Last-Modified once the resource has been written) for the viewer's copy. The viewer
+    is part of the tag because staff and admins can get different representations.
+    """
+    row = db.execute(
+        select(ResourceVersion.version, ResourceVersion.updated_at)
+        .where(ResourceVersion.user_id == owner_id, ResourceVersion.resource == resource)
+    ).first()
+    version, updated_at = row if row else (0, None)
+    headers = {
+        "ETag": f'W/"{resource}-{owner_id}-{version}-{viewer_id}"',
+        # Let browsers store the response but always revalidate it
+        "Cache-Control": "private, no-cache",
+    }
+    if updated_at is not None:
+        # Stored as naive UTC
+        headers["Last-Modified"] = updated_at.strftime("%a, %d %b %Y %H:%M:%S GMT")
+    return headers
+
+
+def not_modified(request: Request, headers: Dict[str, str]):
+    """A 304 response when If-None-Match matches the ETag (weak comparison), else None."""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return None
+    etag = headers["ETag"].removeprefix("W/")
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return Response(status_code=304, headers=headers)
+    return None
@@ -1,6 +1,6 @@
 import React, { useState, useEffect, useCallback } from "react";
-import type { Employee, Attendance, CompanySettingsType } from "../entities/all";
-import { Employees, Attendances, CompanySettings } from "../entities/all"; // Import the entities with mapping logic
+import type { CompanySettingsType, DashboardSummaryType } from "../entities/all";
+import { DashboardSummary, CompanySettings } from "../entities/all"; // Import the entities with mapping logic
 import { format } from "date-fns";
 import { TrendingUp, TrendingDown, Users, Calendar, Clock, Eye, EyeOff, IndianRupee } from "lucide-react";
 import { motion } from "framer-motion";
@@ -22,8 +22,7 @@ export default function Dashboard({ onSignOut, theme }: DashboardProps) {
   const [myAdvances, setMyAdvances] = useState<any[]>([]);
 
   // ✅ renamed state variables to avoid collision with API clients
-  const [employeeList, setEmployeeList] = useState<Employee[]>([]);
-  const [attendanceList, setAttendanceList] = useState<Attendance[]>([]);
+  const [summary, setSummary] = useState<DashboardSummaryType | null>(null);
   const [settingsData, setSettingsData] = useState<CompanySettingsType | null>(null);
   const [loading, setLoading] = useState(true);
   const [chartToggles, setChartToggles] = useState({
@@ -40,14 +39,13 @@ export default function Dashboard({ onSignOut, theme }: DashboardProps) {
 
   const loadDashboardData = useCallback(async () => {
     try {
-      const [employeesFetched, attendanceFetched, settingsFetched] = await Promise.all([
-        Employees.list(),
-        Attendances.list(), // Fixed: use .list() instead of .getMonth()
+      // Counts come aggregated from /dashboard/summary instead of every employee and attendance row
+      const [summaryFetched, settingsFetched] = await Promise.all([
+        DashboardSummary.get(),
         CompanySettings.list(),
       ]);
 
-      setEmployeeList(employeesFetched);
-      setAttendanceList(attendanceFetched);
+      setSummary(summaryFetched);
       setSettingsData(
         settingsFetched[0] || { // Access the first item as CompanySettings.list returns an array
           standard_work_hours: 8,
@@ -55,7 +53,7 @@ export default function Dashboard({ onSignOut, theme }: DashboardProps) {
         }
       );
 
-      calculateStats(employeesFetched, attendanceFetched);
+      calculateStats(summaryFetched);
     } catch (error) {
       console.error("Error loading dashboard data:", error);
     } finally {
@@ -73,31 +71,12 @@ export default function Dashboard({ onSignOut, theme }: DashboardProps) {
     }
   }, [user]);
 
-  const calculateStats = (employeesFetched: Employee[], attendanceFetched: Attendance[]) => {
-    const today = format(new Date(), "yyyy-MM-dd");
-    const todayAttendance = attendanceFetched.filter((a) => a.date === today);
-    const presentToday = todayAttendance.filter(
-      (a) => a.status === "present" || a.status === "half_day"
-    ).length;
-
-    const thisMonth = format(new Date(), "yyyy-MM");
-    const monthAttendance = attendanceFetched.filter((a) => a.date.startsWith(thisMonth));
-    const totalWorkingDays = employeesFetched.length > 0 ? monthAttendance.length / employeesFetched.length : 1;
-    const presentDays = monthAttendance.filter(
-      (a) => a.status === "present" || a.status === "half_day"
-    ).length;
-    const attendanceRate =
-      totalWorkingDays > 0 ? (presentDays / (employeesFetched.length * totalWorkingDays)) * 100 : 0;
-
-    const averageSalary =
-      employeesFetched.reduce((sum, emp) => sum + (emp.base_salary || 0), 0) /
-      (employeesFetched.length || 1);
-
+  const calculateStats = (summaryFetched: DashboardSummaryType) => {
     const finalStats = {
-      totalEmployees: employeesFetched.length,
-      presentToday,
-      attendanceRate: Math.round(attendanceRate),
-      averageSalary: Math.round(averageSalary),
+      totalEmployees: summaryFetched.total_employees,
+      presentToday: summaryFetched.today.present + summaryFetched.today.half_day,
+      attendanceRate: Math.round(summaryFetched.month_attendance_rate),
+      averageSalary: Math.round(summaryFetched.average_salary),
     };
     setStats(finalStats);
   };
@@ -221,16 +200,16 @@ export default function Dashboard({ onSignOut, theme }: DashboardProps) {
       {/* Charts and Analytics */}
       <div className="grid grid-cols-1 lg:grid-cols-2 gap-8">
         {chartToggles.showAttendanceChart && (
-          <AttendanceChart attendanceData={attendanceList} employees={employeeList} theme={theme} />
+          <AttendanceChart trend={summary?.trend ?? []} totalEmployees={stats.totalEmployees} theme={theme} />
         )}
         {chartToggles.showEmployeeOverview && (
-          <EmployeeOverview employees={employeeList} attendanceData={attendanceList} />
+          <EmployeeOverview employees={summary?.top_employees ?? []} />
         )}
       </div>
 
       {/* Recent Activity */}
       {chartToggles.showRecentActivity && (
-        <RecentAttendance attendanceData={attendanceList} employees={employeeList} />
+        <RecentAttendance entries={summary?.recent ?? []} />
       )}
 
       {/* Staff Salary Advances */}
@@ -120,6 +120,15 @@ export const settings = {
     formData.append('currency', updates.currency);
     formData.append('overtime_multiplier', updates.overtime_multiplier);
     formData.append('mark_sundays_as_holiday', updates.mark_sundays_as_holiday);
+    if (updates.auto_mark_absent !== undefined) {
+      formData.append('auto_mark_absent', updates.auto_mark_absent);
+    }
+    if (updates.holiday_work_multiplier !== undefined) {
+      formData.append('holiday_work_multiplier', updates.holiday_work_multiplier);
+    }
+    if (updates.late_deduction_policy !== undefined) {
+      formData.append('late_deduction_policy', updates.late_deduction_policy);
+    }
 
     // If a new logo file is provided, append it to the form data
     if (logoFile) {
@@ -187,3 +196,11 @@ export const advances = {
     return res.data;
   }
 };
+
+// ===== DASHBOARD =====
+export const dashboard = {
+  async summary(days?: number): Promise<any> {
+    const res = await api.get("/dashboard/summary", { params: days ? { days } : undefined });
+    return res.data;
+  },
+};
@@ -3,20 +3,22 @@ import { BarChart, Bar, XAxis, YAxis, CartesianGrid, Tooltip, ResponsiveContaine
 import { format, startOfWeek, endOfWeek, eachDayOfInterval } from "date-fns";
 import { motion } from "framer-motion";
 
-export default function AttendanceChart({ attendanceData, employees, theme }) {
+export default function AttendanceChart({ trend, totalEmployees, theme }) {
   const generateWeeklyData = () => {
     const today = new Date();
     const weekStart = startOfWeek(today);
     const weekEnd = endOfWeek(today);
     const weekDays = eachDayOfInterval({ start: weekStart, end: weekEnd });
+    // Daily counts from the dashboard summary; days after today are not in it
+    const countsByDate = Object.fromEntries(trend.map(d => [d.date, d]));
 
     return weekDays.map(day => {
       const dateStr = format(day, "yyyy-MM-dd");
-      const dayAttendance = attendanceData.filter(a => a.date === dateStr);
-      
-      const present = dayAttendance.filter(a => a.status === "present").length;
-      const halfDay = dayAttendance.filter(a => a.status === "half_day").length;
-      const absent = dayAttendance.filter(a => a.status === "absent").length;
+      const counts = countsByDate[dateStr];
+
+      const present = counts?.present ?? 0;
+      const halfDay = counts?.half_day ?? 0;
+      const absent = counts?.absent ?? 0;
 
       return {
         day: format(day, "EEE"),
@@ -25,7 +27,7 @@ export default function AttendanceChart({ attendanceData, employees, theme }) {
         halfDay,
         absent,
         total: present + halfDay + absent,
-        percentage: employees.length > 0 ? Math.round(((present + halfDay * 0.5) / employees.length) * 100) : 0
+        percentage: totalEmployees > 0 ? Math.round(((present + halfDay * 0.5) / totalEmployees) * 100) : 0
       };
     });
   };
@@ -1,18 +1,14 @@
 import React from "react";
 import { motion } from "framer-motion";
 import { TrendingUp, TrendingDown } from "lucide-react";
-import { format } from "date-fns";
 
-export default function EmployeeOverview({ employees, attendanceData }) {
+export default function EmployeeOverview({ employees }) {
+  // This month's counts of the best attending employees, already ranked by the dashboard summary
   const calculateEmployeeStats = () => {
-    const thisMonth = format(new Date(), "yyyy-MM");
-    const monthAttendance = attendanceData.filter(a => a.date.startsWith(thisMonth));
-    
     return employees.map(employee => {
-      const empAttendance = monthAttendance.filter(a => a.employee_id === employee.employee_id);
-      const presentDays = empAttendance.filter(a => a.status === "present").length;
-      const halfDays = empAttendance.filter(a => a.status === "half_day").length;
-      const totalDays = empAttendance.length;
+      const presentDays = employee.present;
+      const halfDays = employee.half_day;
+      const totalDays = employee.present + employee.half_day + employee.absent;
       
       const attendanceRate = totalDays > 0 ? ((presentDays + halfDays * 0.5) / totalDays) * 100 : 0;
       
@@ -22,7 +18,7 @@ export default function EmployeeOverview({ employees, attendanceData }) {
         presentDays,
         totalDays
       };
-    }).sort((a, b) => b.attendanceRate - a.attendanceRate);
+    });
   };
 
   const employeeStats = calculateEmployeeStats();
@@ -41,7 +37,7 @@ export default function EmployeeOverview({ employees, attendanceData }) {
       <div className="space-y-4 max-h-80 overflow-y-auto">
         {employeeStats.slice(0, 5).map((employee, index) => (
           <motion.div
-            key={employee.id}
+            key={employee.employee_id}
             initial={{ opacity: 0, x: -20 }}
             animate={{ opacity: 1, x: 0 }}
             transition={{ delay: index * 0.1 }}
@@ -1,15 +1,11 @@
 import React from "react";
 import { motion } from "framer-motion";
-import { format } from "date-fns";
+import { format, parseISO } from "date-fns";
 import { Clock, CheckCircle, XCircle, AlertCircle } from "lucide-react";
 
-export default function RecentAttendance({ attendanceData, employees }) {
-  const recentAttendance = attendanceData.slice(0, 10);
-  
-  const getEmployeeName = (employeeId) => {
-    const employee = employees.find(emp => emp.employee_id === employeeId);
-    return employee?.name || "Unknown Employee";
-  };
+export default function RecentAttendance({ entries }) {
+  // The dashboard summary's latest records, newest first, with the employee's name
+  const recentAttendance = entries;
 
   const getStatusIcon = (status) => {
     switch (status) {
@@ -60,9 +56,9 @@ export default function RecentAttendance({ attendanceData, employees }) {
             <div className="flex items-center gap-3">
               {getStatusIcon(record.status)}
               <div>
-                <p className="font-medium text-slate-800 dark:text-white">{getEmployeeName(record.employee_id)}</p>
+                <p className="font-medium text-slate-800 dark:text-white">{record.employee_name}</p>
                 <p className="text-sm text-slate-500 dark:text-gray-400">
-                  {format(new Date(record.date), "MMM d, yyyy")}
+                  {format(parseISO(record.date), "MMM d, yyyy")}
                 </p>
               </div>
             </div>
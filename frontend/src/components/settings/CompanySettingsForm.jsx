@@ -5,6 +5,7 @@ import { Label } from "components/ui/label";
 import { motion } from "framer-motion";
 import { Save } from "lucide-react";
 import { Switch } from "components/ui/switch";
+import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from "components/ui/select";
 // Import the refactored CompanyLogoUploader
 import CompanyLogoUploader from "./CompanyLogoUploader"; 
 
@@ -16,6 +17,9 @@ export default function CompanySettingsForm({ initialData, onSave, loading }) {
     overtime_multiplier: 1.5,
     currency: "INR",
     mark_sundays_as_holiday: false,
+    auto_mark_absent: false,
+    holiday_work_multiplier: 1,
+    late_deduction_policy: "hourly",
     company_logo_url: null,
   });
   
@@ -32,6 +36,9 @@ export default function CompanySettingsForm({ initialData, onSave, loading }) {
         overtime_multiplier: initialData.overtime_multiplier || 1.5,
         currency: initialData.currency || "INR",
         mark_sundays_as_holiday: initialData.mark_sundays_as_holiday || false,
+        auto_mark_absent: initialData.auto_mark_absent || false,
+        holiday_work_multiplier: initialData.holiday_work_multiplier ?? 1,
+        late_deduction_policy: initialData.late_deduction_policy || "hourly",
         company_logo_url: initialData.company_logo_url || null,
       });
     }
@@ -50,6 +57,7 @@ export default function CompanySettingsForm({ initialData, onSave, loading }) {
       ...formData,
       standard_work_hours_per_day: parseFloat(formData.standard_work_hours_per_day),
       overtime_multiplier: parseFloat(formData.overtime_multiplier),
+      holiday_work_multiplier: parseFloat(formData.holiday_work_multiplier),
     };
 
     // UPDATED LOGIC: Call the onSave prop with both the text data and the logo file.
@@ -93,6 +101,23 @@ export default function CompanySettingsForm({ initialData, onSave, loading }) {
             <Label htmlFor="overtime_multiplier" className="dark:text-gray-300">Overtime Multiplier</Label>
             <Input id="overtime_multiplier" type="number" step="0.1" value={formData.overtime_multiplier || ""} onChange={e => handleChange('overtime_multiplier', e.target.value)} className="dark:bg-gray-700 dark:border-gray-600 dark:text-white" />
           </div>
+          <div className="space-y-2">
+            <Label htmlFor="holiday_work_multiplier" className="dark:text-gray-300">Holiday Work Multiplier</Label>
+            <Input id="holiday_work_multiplier" type="number" step="0.1" min="0" value={formData.holiday_work_multiplier ?? ""} onChange={e => handleChange('holiday_work_multiplier', e.target.value)} className="dark:bg-gray-700 dark:border-gray-600 dark:text-white" />
+          </div>
+          <div className="space-y-2">
+            <Label htmlFor="late_deduction_policy" className="dark:text-gray-300">Late Deduction</Label>
+            <Select value={formData.late_deduction_policy} onValueChange={value => handleChange('late_deduction_policy', value)}>
+              <SelectTrigger id="late_deduction_policy" className="w-full dark:bg-gray-700 dark:border-gray-600 dark:text-white">
+                <SelectValue />
+              </SelectTrigger>
+              <SelectContent className="dark:bg-slate-800 dark:border-slate-600">
+                <SelectItem value="hourly">Deduct late hours</SelectItem>
+                <SelectItem value="half_day">Deduct half a day when late</SelectItem>
+                <SelectItem value="none">No deduction</SelectItem>
+              </SelectContent>
+            </Select>
+          </div>
         </div>
         
         {/* --- Company Logo Uploader (Updated Props) --- */}
@@ -115,6 +140,14 @@ export default function CompanySettingsForm({ initialData, onSave, loading }) {
               onCheckedChange={checked => handleChange('mark_sundays_as_holiday', checked)}
             />
           </div>
+          <div className="flex items-center justify-between">
+            <Label htmlFor="auto_mark_absent" className="dark:text-gray-300">Mark unmarked employees Absent at the end of each day</Label>
+            <Switch
+              id="auto_mark_absent"
+              checked={formData.auto_mark_absent}
+              onCheckedChange={checked => handleChange('auto_mark_absent', checked)}
+            />
+          </div>
         </div>
 
         {/* --- Save Button (Unchanged) --- */}
@@ -6,6 +6,7 @@ import {
   reports as reportsApi,
   auth as authApi,
   advances as advancesApi,
+  dashboard as dashboardApi,
 } from "api/client";
 
 // --------------------
@@ -50,6 +51,9 @@ export interface ApiSettings {
   company_name?: string; // Added for company name
   overtime_multiplier?: number; // Added for overtime multiplier
   mark_sundays_as_holiday?: boolean; // Added for marking Sundays as holiday
+  auto_mark_absent?: boolean; // Nightly job marks unmarked employees Absent
+  holiday_work_multiplier?: number; // Pay factor for a day worked on a holiday
+  late_deduction_policy?: "hourly" | "none" | "half_day";
   company_logo_url?: string; // Added for company logo
 }
 
@@ -61,6 +65,39 @@ export interface ApiAdvance {
   reason?: string;
 }
 
+export interface ApiDayCounts {
+  date: string; // yyyy-MM-dd
+  present: number;
+  absent: number;
+  half_day: number;
+}
+
+export interface ApiDashboardRecentEntry extends Omit<ApiAttendance, "user_id"> {
+  employee_name: string;
+}
+
+export interface ApiDashboardEmployeeEntry {
+  employee_id: number;
+  name: string;
+  position?: string | null;
+  present: number;
+  absent: number;
+  half_day: number;
+}
+
+export interface ApiDashboardSummary {
+  as_of: string; // yyyy-MM-dd
+  headcount: Record<string, number>; // Employees by status
+  total_employees: number;
+  average_salary: number; // Over active employees
+  today: ApiDayCounts;
+  not_marked_today: number;
+  month_attendance_rate: number; // Percentage, present and half days over this month's records
+  trend: ApiDayCounts[]; // One entry per day ending today, oldest first
+  recent: ApiDashboardRecentEntry[];
+  top_employees: ApiDashboardEmployeeEntry[]; // Best attendance this month
+}
+
 // --------------------
 // UI (Front-end) shapes
 // --------------------
@@ -98,12 +135,19 @@ export interface UiCompanySettings {
   currency?: string; // client-only
   overtime_multiplier?: number; // overtime multiplier should not be client-only anymore
   mark_sundays_as_holiday?: boolean; // Added for marking Sundays as holiday
+  auto_mark_absent?: boolean; // Nightly job marks unmarked employees Absent
+  holiday_work_multiplier?: number; // Pay factor for a day worked on a holiday
+  late_deduction_policy?: "hourly" | "none" | "half_day";
   company_logo_url?: string; // Added for company logo
   standard_work_hours: number;
   // keep raw server payload if needed
   __server?: ApiSettings;
 }
 
+export interface UiDashboardSummary extends Omit<ApiDashboardSummary, "recent"> {
+  recent: Array<UiAttendance & { employee_name: string }>;
+}
+
 export interface UiAdvance {
   id: number;
   employee_id: number;
@@ -157,7 +201,7 @@ function toApiEmployee(e: Partial<UiEmployee>): Partial<ApiEmployee> {
   };
 }
 
-function toUiAttendance(a: ApiAttendance): UiAttendance {
+function toUiAttendance(a: Omit<ApiAttendance, "user_id">): UiAttendance {
   return {
     id: a.id,
     date: a.date,
@@ -188,6 +232,9 @@ function toUiSettings(s: ApiSettings): UiCompanySettings {
     currency: s.currency ?? "INR", // Get currency from server or use default
     overtime_multiplier: s.overtime_multiplier ?? 1.5, // Get overtime multiplier from server or use default
     mark_sundays_as_holiday: s.mark_sundays_as_holiday ?? false, // Get mark_sundays_as_holiday from server or use default
+    auto_mark_absent: s.auto_mark_absent ?? false,
+    holiday_work_multiplier: s.holiday_work_multiplier ?? 1,
+    late_deduction_policy: s.late_deduction_policy ?? "hourly",
     company_logo_url: s.company_logo_url, // Get company logo URL from server
     standard_work_hours: s.standard_work_hours_per_day ?? 8,
     __server: s,
@@ -202,6 +249,9 @@ function toApiSettings(ui: Partial<UiCompanySettings>): ApiSettings {
     company_name: ui.company_name, // Include company name from UI
     overtime_multiplier: ui.overtime_multiplier, // Include overtime multiplier from UI
     mark_sundays_as_holiday: ui.mark_sundays_as_holiday, // Include mark_sundays_as_holiday from UI
+    auto_mark_absent: ui.auto_mark_absent,
+    holiday_work_multiplier: ui.holiday_work_multiplier,
+    late_deduction_policy: ui.late_deduction_policy,
     company_logo_url: ui.company_logo_url, // Include company logo URL from UI
   };
 }
@@ -313,6 +363,17 @@ export const Advances = {
   }
 };
 
+// Dashboard: aggregated on the server, one request instead of every employee and attendance row
+export const DashboardSummary = {
+  async get(days?: number): Promise<UiDashboardSummary> {
+    const s: ApiDashboardSummary = await dashboardApi.summary(days);
+    return {
+      ...s,
+      recent: s.recent.map((r) => ({ ...toUiAttendance(r), employee_name: r.employee_name })),
+    };
+  },
+};
+
 // Auth passthrough
 export const Auth = {
   signIn: authApi.signIn,
@@ -330,6 +391,7 @@ export type {
   UiAttendance as Attendance,
   UiHoliday as Holiday,
   UiCompanySettings as CompanySettingsType,
+  UiDashboardSummary as DashboardSummaryType,
 };
 
 export const Reports = {
@@ -218,9 +218,18 @@ export const attendanceService = {
   // Get weekly attendance data for charts
   async getWeeklyAttendanceData(): Promise<Array<{ day: string; present: number; absent: number }>> {
     try {
+      // Counts are aggregated on the server: one entry per day of the current week
       const response = await api.get("/attendance/weekly_summary");
-      const weeklyData: Array<{ day: string; present: number; absent: number }> = response.data;
-      return weeklyData;
+      const days: Array<{ date: string; present: number; absent: number; half_day: number }> = response.data.days;
+      return days.map((d) => {
+        // "YYYY-MM-DD" alone parses as UTC midnight, the previous day west of UTC; build a local date
+        const [year, month, day] = d.date.split("-").map(Number);
+        return {
+          day: new Date(year, month - 1, day).toLocaleDateString("en-US", { weekday: "short" }),
+          present: d.present + d.half_day,
+          absent: d.absent,
+        };
+      });
     } catch (error) {
       console.error("Network error while fetching weekly attendance data:", error);
       return [];
@@ -9,6 +9,9 @@ export interface CompanySettings {
   currency: string;
   overtime_multiplier: number;
   mark_sundays_as_holiday: boolean;
+  auto_mark_absent?: boolean;
+  holiday_work_multiplier?: number;
+  late_deduction_policy?: "hourly" | "none" | "half_day";
   company_logo_url?: string;
 }
 